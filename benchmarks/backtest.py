@@ -0,0 +1,95 @@
+"""Throughput of the backtest of a (schedules x time-steps) matrix, streamed in chunks, against a Python loop per
+schedule
+
+Usage (from the root of the repository):
+
+    python -m benchmarks.backtest -i instances/example_bounds.toml -n 20000 --steps 1536
+"""
+import argparse
+import os
+import tempfile
+import time
+from dataclasses import fields
+
+import numpy as np
+
+from simulate import create_inputs
+from simulate.backtest import Backtester, read_schedule_matrix
+from simulate.core import Inputs
+
+
+def replay(
+        inputs: Inputs, schedule: np.ndarray, temperature_ambient: np.ndarray, cost_electricity: np.ndarray
+) -> tuple:
+    """Replays one schedule time-step by time-step, as a reference
+
+    Returns
+    -------
+    cost, violation_steps : tuple
+        realised cost and number of time-steps out of the temperature bounds
+    """
+    temperature_min, temperature_max = inputs.temperature_bounds
+    cost, violation_steps = 0.0, 0
+    for t, power in enumerate(schedule):
+        temperature = (
+            inputs.initial_temperature if t == 0 else
+            temperature_ambient[t] + inputs.coefficient_heat_div_cool * power
+        )
+        cost += cost_electricity[t] * power * inputs.step_size * inputs.conversion_factor
+        violation_steps += not temperature_min - 1e-6 <= temperature <= temperature_max + 1e-6
+
+    return cost, violation_steps
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Throughput of the vectorised backtest.")
+    parser.add_argument("-i", "--inputs", dest="inputs", required=True, help="TOML file with input data.")
+    parser.add_argument("-n", "--schedules", dest="n_schedules", type=int, default=20000, help="Number of schedules.")
+    parser.add_argument("--steps", dest="n_steps", type=int, default=1536, help="Number of time-steps.")
+    parser.add_argument("--loop", dest="n_loop", type=int, default=200, help="Schedules replayed by the loop.")
+    args = parser.parse_args()
+
+    base = create_inputs(args.inputs)
+    inputs = Inputs(**{
+        **{field.name: getattr(base, field.name) for field in fields(base) if field.init},
+        "cardinality_horizon": args.n_steps * base.step_size
+    })
+    rng = np.random.default_rng(0)
+    lower, upper = inputs.power_bounds
+    temperature_ambient = inputs.temperature_ambient + rng.normal(0, 0.5, args.n_steps)
+    cost_electricity = inputs.cost_electricity * rng.lognormal(0, 0.1, args.n_steps)
+    backtester = Backtester(inputs, temperature_ambient, cost_electricity)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "schedules.npy")
+        matrix = np.lib.format.open_memmap(path, mode="w+", shape=(args.n_schedules, args.n_steps))
+        for start in range(0, args.n_schedules, 1000):
+            stop = min(start + 1000, args.n_schedules)
+            matrix[start:stop] = rng.uniform(lower, upper, (stop - start, args.n_steps))
+        matrix.flush()
+        del matrix
+        size = args.n_schedules * args.n_steps * 8 / 2**20
+
+        start = time.perf_counter()
+        results = backtester(read_schedule_matrix(path))
+        chunked_time = time.perf_counter() - start
+
+        matrix = np.load(path, mmap_mode="r")
+        start = time.perf_counter()
+        reference = [
+            replay(inputs, row.tolist(), temperature_ambient, cost_electricity) for row in matrix[:args.n_loop]
+        ]
+        loop_time = (time.perf_counter() - start) * args.n_schedules / args.n_loop
+        costs, violation_steps = np.array(reference).T
+        assert np.allclose(costs, results.realised_cost[:args.n_loop])
+        assert np.array_equal(violation_steps, results.violation_steps[:args.n_loop])
+
+    print(
+        f"{args.n_schedules} schedules x {args.n_steps} steps ({size:.0f} MB) | chunked {chunked_time:6.2f} s "
+        f"({args.n_schedules / chunked_time:9.0f} schedules/s) | loop per schedule {loop_time:7.2f} s (extrapolated)"
+    )
+    print(results.summary())
+
+
+if __name__ == "__main__":
+    main()
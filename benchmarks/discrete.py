@@ -0,0 +1,86 @@
+"""Cost and run time of the discrete heater: rounding heuristic against the MILP solver with time limits
+
+Usage (from the root of the repository):
+
+    python -m benchmarks.discrete -i instances/example_bounds.toml --hours 96 960 --time-limits 0.1 1 10
+"""
+import argparse
+import time
+from dataclasses import fields
+
+import numpy as np
+
+from simulate import create_inputs
+from simulate.core import Inputs, Optimiser, Simulator
+from simulate.core.optimiser.discrete import RoundingHeuristic
+
+
+def discrete_inputs(base: Inputs, args: argparse.Namespace, hours: float) -> Inputs:
+    """Inputs with discrete modes over the given horizon, and noisy series so that the modes change often
+
+    Returns
+    -------
+    inputs : Inputs
+        inputs of the benchmark
+    """
+    inputs = Inputs(**{
+        **{field.name: getattr(base, field.name) for field in fields(base) if field.init},
+        "cardinality_horizon": hours,
+        "initial_temperature": args.initial_temperature,
+        "temperature_bounds": args.temperature_bounds,
+        "power_bounds": [min(args.levels), max(args.levels)],
+        "power_levels": args.levels,
+        "minimum_up_time": args.minimum_up_time,
+        "minimum_down_time": args.minimum_down_time
+    })
+    rng = np.random.default_rng(0)
+    n_steps = len(inputs.horizon)
+
+    return inputs.perturbed(
+        cost_electricity=inputs.cost_electricity * rng.lognormal(0, 0.3, n_steps),
+        temperature_ambient=inputs.temperature_ambient + rng.normal(0, 0.4, n_steps)
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cost and run time of the discrete heater.")
+    parser.add_argument("-i", "--inputs", dest="inputs", required=True, help="TOML file with input data.")
+    parser.add_argument("-s", "--solver", dest="solver", default="appsi_highs", help="MILP solver.")
+    parser.add_argument("--hours", dest="hours", type=float, nargs="+", default=[96, 960], help="Horizons in hours.")
+    parser.add_argument(
+        "--time-limits", dest="time_limits", type=float, nargs="+", default=[0.1, 1, 10],
+        help="Time limits in seconds."
+    )
+    parser.add_argument(
+        "--levels", dest="levels", type=float, nargs="+", default=[0, 1.5, 3, 5], help="Power levels."
+    )
+    parser.add_argument(
+        "--temperature-bounds", dest="temperature_bounds", type=float, nargs=2, default=[14, 19],
+        help="Temperature bounds."
+    )
+    parser.add_argument("--initial-temperature", dest="initial_temperature", type=float, default=17)
+    parser.add_argument("--minimum-up-time", dest="minimum_up_time", type=float, default=3)
+    parser.add_argument("--minimum-down-time", dest="minimum_down_time", type=float, default=2)
+    args = parser.parse_args()
+
+    base = create_inputs(args.inputs)
+    for hours in args.hours:
+        inputs = discrete_inputs(base, args, hours)
+        heuristic = RoundingHeuristic(inputs)
+        start = time.perf_counter()
+        schedule = heuristic()
+        heuristic_time = time.perf_counter() - start
+        heuristic_cost = "failed" if schedule is None else f"{schedule['objective_function']:.4f}"
+        print(f"{len(inputs.horizon):6d} steps | heuristic {heuristic_time:6.3f} s, cost {heuristic_cost}")
+        for time_limit in [*args.time_limits, None]:
+            optimiser = Optimiser(time_limit=time_limit)
+            start = time.perf_counter()
+            results = Simulator(inputs=inputs, optimiser=optimiser, output_path=None, solver=args.solver).simulate()
+            print(
+                f"{'':6s}       | time limit {str(time_limit):>5s} | total {time.perf_counter() - start:7.2f} s, "
+                f"cost {results['objective_function']:.4f}, relative gap {optimiser.relative_gap:.2e}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Time of the coordination of a fleet under a feeder capacity against a single LP of the whole fleet
+
+Usage (from the root of the repository):
+
+    python -m benchmarks.fleet -i instances/example_bounds.toml --buildings 100 1000 5000 -w 4
+"""
+import argparse
+import time
+
+import numpy as np
+import scipy.sparse as sps
+from scipy.optimize import linprog
+
+from simulate import create_inputs
+from simulate.core import Inputs
+from simulate.core.optimiser.vectorised import VectorisedSolver
+from simulate.fleet import FleetCoordinator
+
+
+def sample_fleet(inputs: Inputs, n_buildings: int, seed: int = 0) -> dict[str, Inputs]:
+    """Perturbs the ambient temperature of every building, and shifts its cost of electricity so that it is negative
+    at some time-steps (otherwise the capacity of the feeder never binds)
+
+    Returns
+    -------
+    buildings : dict[str, Inputs]
+        inputs of every building
+    """
+    rng = np.random.default_rng(seed)
+    shape = (n_buildings, len(inputs.horizon))
+    temperature_ambient = inputs.temperature_ambient + rng.normal(0, 0.5, (n_buildings, 1))
+    cost_electricity = inputs.cost_electricity - inputs.cost_electricity.mean() + rng.normal(0, 8, shape)
+
+    return {
+        f"building_{index}": inputs.perturbed(
+            temperature_ambient=temperature_ambient[index], cost_electricity=cost_electricity[index]
+        )
+        for index in range(n_buildings)
+    }
+
+
+def monolithic(buildings: dict[str, Inputs], feeder_capacity: float) -> tuple[float, float]:
+    """Solves the LP of the whole fleet with HiGHS, as a reference
+
+    Returns
+    -------
+    objective, solve_time : tuple[float, float]
+        optimal cost and wall time in seconds
+    """
+    start = time.perf_counter()
+    ranges = [VectorisedSolver(inputs)._feasible_power_range() for inputs in buildings.values()]
+    cost = np.concatenate([
+        inputs.cost_electricity * inputs.step_size * inputs.conversion_factor for inputs in buildings.values()
+    ])
+    n_steps = len(next(iter(buildings.values())).horizon)
+    result = linprog(
+        cost,
+        A_ub=sps.kron(np.ones((1, len(buildings))), sps.eye(n_steps), format="csr"),
+        b_ub=np.full(n_steps, feeder_capacity),
+        bounds=np.column_stack([np.concatenate(bounds) for bounds in zip(*ranges)]),
+        method="highs"
+    )
+
+    return result.fun, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time of the coordination of a fleet.")
+    parser.add_argument("-i", "--inputs", dest="inputs", required=True, help="TOML file with input data.")
+    parser.add_argument(
+        "--buildings", dest="n_buildings", type=int, nargs="+", default=[100, 1000], help="Numbers of buildings."
+    )
+    parser.add_argument("-w", "--workers", dest="workers", type=int, help="Number of worker processes.")
+    parser.add_argument(
+        "--congestion", dest="congestion", type=float, default=0.5,
+        help="Position of the capacity between the minimum and the uncoordinated peak load of the fleet."
+    )
+    args = parser.parse_args()
+
+    base = create_inputs(args.inputs)
+    for n_buildings in args.n_buildings:
+        buildings = sample_fleet(base, n_buildings)
+        ranges = [VectorisedSolver(inputs)._feasible_power_range() for inputs in buildings.values()]
+        minimum = sum(lower for lower, _ in ranges).max()
+        peak = sum(
+            np.where(inputs.cost_electricity >= 0, lower, upper)
+            for inputs, (lower, upper) in zip(buildings.values(), ranges)
+        ).max()
+        feeder_capacity = minimum + args.congestion * (peak - minimum)
+
+        coordinator = FleetCoordinator(buildings, feeder_capacity, workers=args.workers)
+        start = time.perf_counter()
+        results = coordinator()
+        coordination_time = time.perf_counter() - start
+        objective, solve_time = monolithic(buildings, feeder_capacity)
+        print(
+            f"{n_buildings:6d} buildings | ADMM {coordination_time:7.2f} s, "
+            f"{coordinator.statistics['Number of iterations']:4d} iterations, "
+            f"cost {results.objective_function.sum():.4f} (lower bound {results.lower_bound:.4f}) | "
+            f"single LP {solve_time:7.2f} s, cost {objective:.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
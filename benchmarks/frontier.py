@@ -0,0 +1,54 @@
+"""Time of the cost-comfort frontier against independent simulations along the same path of temperature bounds
+
+Usage (from the root of the repository):
+
+    python -m benchmarks.frontier -i instances/example_bounds.toml --to 18 22 -s appsi_highs -n 20
+"""
+import argparse
+import time
+
+import numpy as np
+
+from simulate import create_inputs
+from simulate.core import ComfortFrontier, Optimiser, Simulator
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time of the cost-comfort frontier.")
+    parser.add_argument("-i", "--inputs", dest="inputs", required=True, help="TOML file with input data.")
+    parser.add_argument(
+        "--to", dest="temperature_bounds", type=float, nargs=2, default=[18, 22], help="Target temperature bounds."
+    )
+    parser.add_argument("-s", "--solver", dest="solver", default="appsi_highs", help="Solver of the simulations.")
+    parser.add_argument("-n", "--points", dest="n_points", type=int, default=20, help="Number of simulations.")
+    args = parser.parse_args()
+
+    inputs = create_inputs(args.inputs)
+    target = tuple(args.temperature_bounds)
+    start = time.perf_counter()
+    frontier = ComfortFrontier(inputs)(target)
+    frontier_time = time.perf_counter() - start
+    print(f"Frontier: {frontier_time:.4f} s, {len(frontier.position)} breakpoints")
+
+    positions = np.linspace(frontier.position[0], frontier.position[-1], args.n_points)
+    bounds = np.asarray(inputs.temperature_bounds) + positions[:, None] * (
+        np.asarray(target) - np.asarray(inputs.temperature_bounds)
+    )
+    start = time.perf_counter()
+    costs = np.array([
+        Simulator(
+            inputs=inputs.perturbed(temperature_bounds=tuple(row)), optimiser=Optimiser(), output_path=None,
+            solver=args.solver
+        ).simulate()["objective_function"]
+        for row in bounds
+    ])
+    simulation_time = time.perf_counter() - start
+    error = np.abs(costs - frontier(positions)).max()
+    print(
+        f"{args.n_points} simulations ({args.solver}): {simulation_time:.2f} s, "
+        f"{simulation_time / frontier_time:.0f}x the frontier, largest difference of cost {error:.2e}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Import-time regression check of the command line interface
+
+Runs `python -X importtime -m simulate -h` and fails (exit code 1) if the imports take longer than the budget or if
+any heavy dependency is imported. tests/test_import_time.py runs the same check under pytest.
+
+Usage (from the root of the repository): python -m benchmarks.import_time --budget 0.2
+"""
+import argparse
+import subprocess
+import sys
+
+HEAVY_MODULES = ("pyomo", "pandas", "scipy", "matplotlib")
+BUDGET = 0.2
+
+
+def measure_imports() -> dict[str, float]:
+    """Measures the cumulative import time of every module imported by `python -m simulate -h`
+
+    Returns
+    -------
+    imports : dict[str, float]
+        cumulative import time of each module in seconds
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "simulate", "-h"], capture_output=True, text=True, check=True
+    )
+    imports = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.split("|")
+        # Module names are preceded by a space, plus two per nesting level
+        imports[module[1:].rstrip()] = int(cumulative) * 1e-6
+
+    return imports
+
+
+def check_imports() -> tuple[float, list[str]]:
+    """Measures the total import time of `python -m simulate -h` and the heavy modules it imports
+
+    Returns
+    -------
+    total, heavy : tuple[float, list[str]]
+        import time in seconds and names of the heavy modules imported
+    """
+    imports = measure_imports()
+    # The cumulative time of the top-level imports includes all the nested ones
+    total = sum(time for module, time in imports.items() if not module.startswith(" "))
+    heavy = sorted({
+        module.strip() for module in imports if module.strip().split(".")[0] in HEAVY_MODULES
+    })
+
+    return total, heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time regression check of the command line interface.")
+    parser.add_argument("-b", "--budget", dest="budget", type=float, default=BUDGET, help="Budget in seconds.")
+    args = parser.parse_args()
+
+    total, heavy = check_imports()
+    print(f"Import time of `python -m simulate -h`: {total * 1e3:.1f} ms (budget {args.budget * 1e3:.0f} ms)")
+    if heavy:
+        print(f"Heavy modules imported: {', '.join(heavy)}")
+    if total > args.budget or heavy:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""Wall time and peak memory of every phase of the pipeline across horizon sizes
+
+Phases: inputs (Inputs construction), build (Optimiser._problem_build), solve (Optimiser._problem_solve), read
+(Simulator.read_results), save (Simulator.write_results) and plot (Plotter). The objectives of the
+instances in instances/ are checked against the baselines stored in results/, so speed-ups do not break correctness.
+
+Usage (from the root of the repository):
+
+    python -m benchmarks.pipeline -s cbc --horizons 96:0.25 8760:0.25 8760:0.0166666666666666 -o bench.json
+"""
+import argparse
+import json
+import os.path as osp
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from simulate import create_inputs
+from simulate.core import Inputs, Optimiser, Plotter, SimulationResults, Simulator
+from simulate.utils import read_input_file
+
+ROOT = osp.dirname(osp.dirname(osp.abspath(__file__)))
+BASE_INSTANCE = osp.join(ROOT, "instances", "example_bounds.toml")
+BASELINES = ("example_bounds", "example_no_bounds")
+DEFAULT_HORIZONS = ("96:0.25", "720:0.25", "8760:0.25", "8760:0.016666666666666666")
+PHASES = ("inputs", "build", "solve", "read", "save", "plot")
+
+
+@contextmanager
+def measure(record: dict, phase: str):
+    """Measures the wall time of a phase or, if tracemalloc is tracing, the peak of memory it allocates
+
+    Timings are not taken while tracing, as tracemalloc slows down allocations.
+
+    Parameters
+    ----------
+    record : dict
+        dictionary where the measurements are stored (under the name of the phase)
+    phase : str
+        name of the phase
+    """
+    is_tracing = tracemalloc.is_tracing()
+    if is_tracing:
+        tracemalloc.reset_peak()
+        start_memory = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    yield
+    wall_time = time.perf_counter() - start
+    if is_tracing:
+        record[phase] = {"peak_memory": tracemalloc.get_traced_memory()[1] - start_memory}
+    else:
+        record[phase] = {"wall_time": wall_time}
+
+
+def run_pipeline(
+        inputs_fields: dict,
+        solver: str,
+        output_path: str,
+        phases: tuple[str, ...] = PHASES
+) -> tuple[dict, SimulationResults]:
+    """Runs and measures the phases of the pipeline for one instance
+
+    Parameters
+    ----------
+    inputs_fields : dict
+        fields of the inputs object
+    solver : str
+        solver name
+    output_path : str
+        folder to store the results
+    phases : tuple[str, ...]
+        phases to run after solving (read, save and plot)
+
+    Returns
+    -------
+    record, results : tuple[dict, SimulationResults]
+        measurements of every phase and results of the simulation
+    """
+    record = {}
+    with measure(record, "inputs"):
+        inputs = Inputs(**inputs_fields)
+
+    optimiser = Optimiser()
+    optimiser.initialise(inputs=inputs, output_path=output_path, solver=solver)
+    simulator = Simulator(inputs=inputs, optimiser=optimiser, output_path=output_path, solver=solver)
+    if solver in Optimiser._matrix_solvers:
+        backend = Optimiser._matrix_solvers[solver](inputs)
+        if hasattr(backend, "_problem_build"):
+            with measure(record, "build"):
+                problem = backend._problem_build()
+            with measure(record, "solve"):
+                optimiser._solution = backend._problem_solve(problem)
+        else:
+            with measure(record, "solve"):
+                optimiser._solution = backend()
+    else:
+        with measure(record, "build"):
+            model = optimiser._problem_build()
+        with measure(record, "solve"):
+            optimiser._problem_solve(model)
+
+    with measure(record, "read"):
+        results = simulator.read_results()
+    if "save" in phases:
+        with measure(record, "save"):
+            simulator.write_results(results)
+    if "plot" in phases:
+        with measure(record, "plot"):
+            Plotter(inputs=inputs, simulation_results=results, output_path=output_path)()
+
+    return record, results
+
+
+def check_baselines(solver: str, rtol: float = 1e-6) -> dict:
+    """Compares the objectives and schedules of the example instances with the stored results
+
+    Parameters
+    ----------
+    solver : str
+        solver name
+    rtol : float
+        relative tolerance
+
+    Returns
+    -------
+    checks : dict
+        objective, baseline objective and outcome of the comparison of every instance
+    """
+    checks = {}
+    for name in BASELINES:
+        results = Simulator(
+            inputs=create_inputs(osp.join(ROOT, "instances", f"{name}.toml")),
+            optimiser=Optimiser(),
+            output_path=None,
+            solver=solver
+        ).simulate()
+        baseline_path = osp.join(ROOT, "results", name)
+        baseline = pd.read_csv(osp.join(baseline_path, "objective_function.csv"), index_col=0).iloc[0, 0]
+        objective = results["objective_function"]
+        is_ok = bool(np.isclose(objective, baseline, rtol=rtol))
+        for variable in ("temperature_house", "power_heater"):
+            values = pd.read_csv(osp.join(baseline_path, f"{variable}.csv"), index_col=0).iloc[:, 0].values
+            is_ok &= bool(np.allclose(results[variable], values, rtol=rtol, atol=1e-6))
+        checks[name] = {"objective": objective, "baseline": float(baseline), "ok": is_ok}
+
+    return checks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the phases of the pipeline.")
+    parser.add_argument("-s", "--solver", dest="solver", help="Solver name (cbc, numpy ...)", default="cbc")
+    parser.add_argument(
+        "--horizons", dest="horizons", nargs="+", default=DEFAULT_HORIZONS,
+        help="Horizons as cardinality_horizon:step_size, in hours."
+    )
+    parser.add_argument(
+        "--phases", dest="phases", nargs="+", choices=PHASES[3:], default=PHASES[3:],
+        help="Phases to run after solving."
+    )
+    parser.add_argument(
+        "-o", "--output", dest="output", default="bench.json", help="JSON file with the measurements."
+    )
+    parser.add_argument(
+        "--no-memory", dest="is_memory_measured", action="store_false",
+        help="Do not run the second pass that measures peak memory."
+    )
+    args = parser.parse_args()
+
+    base = read_input_file(BASE_INSTANCE)
+    phases = tuple(args.phases)
+    # Warm-up run, so lazy imports and caches are not measured
+    with tempfile.TemporaryDirectory() as output_path:
+        run_pipeline(base, args.solver, output_path, phases)
+
+    runs = []
+    for horizon in args.horizons:
+        cardinality_horizon, step_size = (float(value) for value in horizon.split(":"))
+        inputs_fields = {**base, "cardinality_horizon": cardinality_horizon, "step_size": step_size}
+        with tempfile.TemporaryDirectory() as output_path:
+            record, results = run_pipeline(inputs_fields, args.solver, output_path, phases)
+            if args.is_memory_measured:
+                tracemalloc.start()
+                memory_record, _ = run_pipeline(inputs_fields, args.solver, output_path, phases)
+                tracemalloc.stop()
+                for phase, measurement in memory_record.items():
+                    record[phase].update(measurement)
+        n_steps = len(results["power_heater"])
+        runs.append({
+            "cardinality_horizon": cardinality_horizon,
+            "step_size": step_size,
+            "n_steps": n_steps,
+            "objective": results["objective_function"],
+            "phases": record
+        })
+        print(f"{n_steps:>9} steps | " + " | ".join(
+            f"{phase} {measurement['wall_time']:8.3f} s"
+            + (f" {measurement['peak_memory'] / 2**20:8.1f} MiB" if "peak_memory" in measurement else "")
+            for phase, measurement in record.items()
+        ))
+
+    baselines = check_baselines(args.solver)
+    for name, check in baselines.items():
+        print(
+            f"{name}: objective {check['objective']:.6f} (baseline {check['baseline']:.6f}) "
+            f"{'ok' if check['ok'] else 'MISMATCH'}"
+        )
+
+    with open(args.output, "w") as output_file:
+        json.dump({
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version,
+            "platform": platform.platform(),
+            "solver": args.solver,
+            "runs": runs,
+            "baselines": baselines
+        }, output_file, indent=2)
+    if not all(check["ok"] for check in baselines.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Per-step latency of the rolling-horizon optimiser: persistent model vs rebuilding the model at every step
+
+Usage (from the root of the repository):
+
+    python -m benchmarks.rolling_horizon -i instances/example_bounds.toml -s highs -w 96 -n 50
+"""
+import argparse
+import time
+
+import numpy as np
+
+from simulate import create_inputs
+from simulate.core import RollingHorizonOptimiser
+
+
+def benchmark(optimiser: RollingHorizonOptimiser, n_steps: int, rebuild: bool) -> list[float]:
+    """Times n_steps receding-horizon steps
+
+    Parameters
+    ----------
+    optimiser : RollingHorizonOptimiser
+        initialised rolling-horizon optimiser
+    n_steps : int
+        number of steps to time
+    rebuild : bool
+        flag to throw away the model (and the solver instance) before every step
+
+    Returns
+    -------
+    step_times : list[float]
+        wall time of every step in seconds
+    """
+    inputs = optimiser._inputs
+    window_size = optimiser._window_size
+    padding = (0, window_size + n_steps)
+    temperature_ambient = np.pad(inputs.temperature_ambient, padding, mode="edge")
+    cost_electricity = np.pad(inputs.cost_electricity, padding, mode="edge")
+
+    step_times = []
+    temperature_house = inputs.initial_temperature
+    for k in range(n_steps):
+        if rebuild:
+            optimiser._model = None
+            optimiser._persistent_solver = None
+        start = time.perf_counter()
+        _, temperature_house = optimiser.step(
+            temperature_ambient[k:k + window_size], cost_electricity[k:k + window_size], temperature_house
+        )
+        step_times.append(time.perf_counter() - start)
+
+    return step_times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the rolling-horizon optimiser.")
+    parser.add_argument("-i", "--inputs", dest="inputs", help="TOML file with input data.")
+    parser.add_argument("-s", "--solver", dest="solver", help="Solver name (highs, cbc ...)", default="highs")
+    parser.add_argument("-w", "--window-size", dest="window_size", type=int, default=96, help="Window size.")
+    parser.add_argument("-n", "--n-steps", dest="n_steps", type=int, default=50, help="Number of steps to time.")
+    args = parser.parse_args()
+
+    inputs = create_inputs(args.inputs)
+    for mode, rebuild in (("persistent", False), ("rebuild", True)):
+        optimiser = RollingHorizonOptimiser(window_size=args.window_size)
+        optimiser.initialise(inputs=inputs, output_path=".", solver=args.solver)
+        step_times = np.array(benchmark(optimiser, args.n_steps, rebuild)) * 1e3
+        print(
+            f"{mode:>10}: first step {step_times[0]:8.2f} ms | "
+            f"median {np.median(step_times[1:]):8.2f} ms | p95 {np.percentile(step_times[1:], 95):8.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Build and solve time of the scenario-indexed model against the number of scenarios x time-steps
+
+Usage (from the root of the repository):
+
+    python -m benchmarks.scenarios -i instances/example_bounds.toml --scenarios 50 100 200 400 --steps 384 1536
+"""
+import argparse
+import time
+from dataclasses import fields
+
+import numpy as np
+
+from simulate import create_inputs
+from simulate.core import Inputs, Optimiser
+from simulate.core.optimiser.scenarios import Scenarios, ScenarioSolver
+
+
+def sample_scenarios(inputs: Inputs, n_scenarios: int, seed: int = 0) -> Scenarios:
+    """Perturbs the ambient temperature (normal noise) and the cost of electricity (log-normal noise)
+
+    Returns
+    -------
+    scenarios : Scenarios
+        equiprobable scenarios
+    """
+    rng = np.random.default_rng(seed)
+    shape = (n_scenarios, len(inputs.horizon))
+
+    return Scenarios(
+        temperature_ambient=inputs.temperature_ambient + rng.normal(0, 0.3, shape),
+        cost_electricity=inputs.cost_electricity * rng.lognormal(0, 0.2, shape),
+        probabilities=np.full(n_scenarios, 1 / n_scenarios)
+    )
+
+
+def pyomo_build_time(inputs: Inputs) -> float:
+    """Times building the deterministic pyomo model, as the cost of one model per scenario
+
+    Returns
+    -------
+    build_time : float
+        wall time in seconds
+    """
+    optimiser = Optimiser()
+    optimiser.initialise(inputs=inputs, output_path=None, solver="cbc")
+    start = time.perf_counter()
+    optimiser._problem_build()
+
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Scaling of the scenario-indexed model.")
+    parser.add_argument("-i", "--inputs", dest="inputs", required=True, help="TOML file with input data.")
+    parser.add_argument("--scenarios", dest="scenarios", type=int, nargs="+", default=[50, 100, 200, 400])
+    parser.add_argument("--steps", dest="steps", type=int, nargs="+", default=[384, 1536])
+    parser.add_argument("--first-stage-steps", dest="first_stage_steps", type=int, default=96)
+    args = parser.parse_args()
+
+    base = create_inputs(args.inputs)
+    fields_base = {field.name: getattr(base, field.name) for field in fields(base) if field.init}
+    # Warm-up, so that the imports are not timed
+    pyomo_build_time(base)
+    ScenarioSolver(base, sample_scenarios(base, 1))._problem_build()
+    for n_steps in args.steps:
+        inputs = Inputs(**{**fields_base, "cardinality_horizon": n_steps * base.step_size})
+        pyomo_time = pyomo_build_time(inputs)
+        for n_scenarios in args.scenarios:
+            solver = ScenarioSolver(inputs, sample_scenarios(inputs, n_scenarios), args.first_stage_steps)
+            start = time.perf_counter()
+            problem = solver._problem_build()
+            build_time = time.perf_counter() - start
+            solver._problem_solve(problem)
+            solve_time = time.perf_counter() - start - build_time
+            cells = n_scenarios * n_steps
+            print(
+                f"{n_scenarios:5d} scenarios x {n_steps:6d} steps | build {build_time:7.3f} s "
+                f"({1e9 * build_time / cells:5.0f} ns/cell) | solve {solve_time:7.3f} s | "
+                f"one pyomo model per scenario {pyomo_time * n_scenarios:8.2f} s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Latency of the simulation server under concurrent load, against launching `python -m simulate` per call
+
+Usage (from the root of the repository), once the server is started, e.g. with
+`python -m simulate serve --socket /tmp/simulate.sock -s highs -w 4`:
+
+    python -m benchmarks.server -i instances/example_bounds.toml --socket /tmp/simulate.sock -n 200 -c 16
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from simulate.utils import read_input_file
+
+
+async def request(
+        method: str,
+        path: str,
+        body: bytes,
+        host: str,
+        port: int,
+        socket_path: str | None
+) -> tuple[int, dict]:
+    """Sends one HTTP request on a new connection
+
+    Returns
+    -------
+    status, response : tuple[int, dict]
+        status and JSON body of the response
+    """
+    if socket_path is None:
+        reader, writer = await asyncio.open_connection(host, port)
+    else:
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    response = (await reader.read()).split(b"\r\n\r\n", 1)[1]
+    writer.close()
+
+    return status, json.loads(response)
+
+
+async def load(payload: dict, n_requests: int, concurrency: int, **address) -> tuple[list[float], int]:
+    """Sends n_requests simulations, with at most concurrency of them in flight
+
+    Returns
+    -------
+    latencies, n_failed : tuple[list[float], int]
+        latency of every request in seconds, and number of requests that failed
+    """
+    body = json.dumps(payload).encode()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    n_failed = 0
+
+    async def simulate() -> None:
+        nonlocal n_failed
+        async with semaphore:
+            start = time.perf_counter()
+            status, _ = await request("POST", "/simulate", body, **address)
+            latencies.append(time.perf_counter() - start)
+            n_failed += status != 200
+
+    await asyncio.gather(*(simulate() for _ in range(n_requests)))
+
+    return latencies, n_failed
+
+
+def cold_start(inputs_file: str, solver: str, n_runs: int) -> list[float]:
+    """Times launching the command line once per simulation
+
+    Returns
+    -------
+    latencies : list[float]
+        wall time of every run in seconds
+    """
+    latencies = []
+    with tempfile.TemporaryDirectory() as output_path:
+        for _ in range(n_runs):
+            start = time.perf_counter()
+            subprocess.run(
+                [sys.executable, "-m", "simulate", "-i", inputs_file, "-o", output_path, "-s", solver, "--no-cache",
+                 "--no-plot"],
+                check=True, capture_output=True
+            )
+            latencies.append(time.perf_counter() - start)
+
+    return latencies
+
+
+def summary(latencies: list[float]) -> str:
+    """Percentiles of the latencies in milliseconds
+    """
+    p50, p90, p99 = 1e3 * np.percentile(latencies, (50, 90, 99))
+
+    return f"p50 {p50:8.1f} ms | p90 {p90:8.1f} ms | p99 {p99:8.1f} ms"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Latency of the simulation server under load.")
+    parser.add_argument("-i", "--inputs", dest="inputs", required=True, help="TOML file with input data.")
+    parser.add_argument("--host", dest="host", default="127.0.0.1", help="Address of the server.")
+    parser.add_argument("--port", dest="port", type=int, default=8080, help="Port of the server.")
+    parser.add_argument("--socket", dest="socket_path", help="Unix socket of the server.")
+    parser.add_argument("-n", "--requests", dest="n_requests", type=int, default=200, help="Number of requests.")
+    parser.add_argument("-c", "--concurrency", dest="concurrency", type=int, default=16, help="Requests in flight.")
+    parser.add_argument(
+        "--cold", dest="solver", help="Also time this many runs of the command line with the given solver."
+    )
+    parser.add_argument("--cold-runs", dest="cold_runs", type=int, default=5, help="Number of command line runs.")
+    args = parser.parse_args()
+
+    address = {"host": args.host, "port": args.port, "socket_path": args.socket_path}
+    payload = read_input_file(args.inputs)
+    start = time.perf_counter()
+    latencies, n_failed = asyncio.run(load(payload, args.n_requests, args.concurrency, **address))
+    wall_time = time.perf_counter() - start
+    print(
+        f"server  | {summary(latencies)} | {args.n_requests / wall_time:7.1f} req/s | {n_failed} failed "
+        f"({args.n_requests} requests, {args.concurrency} concurrent)"
+    )
+    if args.solver is not None:
+        print(f"cold    | {summary(cold_start(args.inputs, args.solver, args.cold_runs))}")
+
+    _, metrics = asyncio.run(request("GET", "/metrics", b"", **address))
+    print(json.dumps(metrics, indent=2))
+
+
+if __name__ == "__main__":
+    main()
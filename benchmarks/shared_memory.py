@@ -0,0 +1,91 @@
+"""Private memory of worker processes holding the inputs of a long horizon, sent as copies or through shared memory
+
+Usage (from the root of the repository):
+
+    python -m benchmarks.shared_memory -i instances/example_bounds.toml --hours 8760 --step 0.0166667 -w 4
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields
+
+import numpy as np
+
+from simulate import create_inputs
+from simulate.core import Inputs
+from simulate.core.shared import SharedSeriesStore
+
+# Inputs kept alive by the worker, as when it solves many variants of the same site
+_held: list[Inputs] = []
+
+
+def memory() -> dict[str, int]:
+    """Resident, proportional and private memory of the process in kB (Linux)
+    """
+    with open("/proc/self/smaps_rollup") as smaps:
+        values = {line.split(":")[0]: int(line.split()[1]) for line in smaps if line.split()[-1] == "kB"}
+
+    return {
+        "rss": values["Rss"],
+        "pss": values["Pss"],
+        "private": values["Private_Clean"] + values["Private_Dirty"]
+    }
+
+
+def hold(inputs: Inputs | None) -> tuple[int, dict[str, int]]:
+    """Receives the inputs (None for the baseline), reads all their values and reports the memory of the worker
+    """
+    if inputs is not None:
+        _held.append(inputs)
+        float(inputs.temperature_ambient.sum() + inputs.cost_electricity.sum() + inputs.horizon.sum())
+    # Every worker takes one task
+    time.sleep(0.5)
+
+    return os.getpid(), memory()
+
+
+def measure(inputs: Inputs, workers: int) -> dict[str, float]:
+    """Average increase of the memory of the workers once they hold the inputs, in MB
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        baseline = dict(executor.map(hold, [None] * workers))
+        loaded = dict(executor.map(hold, [inputs] * workers))
+
+    return {
+        key: np.mean([loaded[pid][key] - baseline[pid][key] for pid in loaded if pid in baseline]) / 1024
+        for key in ("rss", "pss", "private")
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Memory of workers holding copies or shared series.")
+    parser.add_argument("-i", "--inputs", dest="inputs", required=True, help="TOML file with input data.")
+    parser.add_argument("--hours", dest="hours", type=float, default=8760, help="Length of the horizon in hours.")
+    parser.add_argument("--step", dest="step", type=float, default=1 / 60, help="Step size in hours.")
+    parser.add_argument("-w", "--workers", dest="workers", type=int, default=4, help="Number of worker processes.")
+    args = parser.parse_args()
+
+    base = create_inputs(args.inputs)
+    inputs = Inputs(**{
+        **{field.name: getattr(base, field.name) for field in fields(base) if field.init},
+        "cardinality_horizon": args.hours,
+        "step_size": args.step,
+        "temperature_ambient_file": None,
+        "cost_electricity_file": None
+    })
+    size = (inputs.horizon.nbytes + inputs.temperature_ambient.nbytes + inputs.cost_electricity.nbytes) / 2**20
+    print(f"{len(inputs.horizon)} time-steps, {size:.1f} MB of series, {args.workers} workers")
+    for label, dtype in (("copies", None), ("shared float64", np.float64), ("shared float32", np.float32)):
+        with SharedSeriesStore() as store:
+            sent = inputs if dtype is None else inputs.attach(store, dtype)
+            stored = store.nbytes / 2**20
+            increase = measure(sent, args.workers)
+        print(
+            f"{label:15s} | per worker: rss +{increase['rss']:6.1f} MB, pss +{increase['pss']:6.1f} MB, "
+            f"private +{increase['private']:6.1f} MB | shared segments {stored:5.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,5 @@
-from .utils import create_inputs
+from .core.lazy import lazy_attributes
+
+__getattr__ = lazy_attributes(__name__, {
+    "create_inputs": ".utils"
+})
@@ -1,8 +1,7 @@
 import argparse
 import os
 
-from . import create_inputs
-from .core import Optimiser, Simulator, Plotter
+from .core.constants import MODEL_FORMATS, OUTPUT_FORMATS, PLOTS
 
 
 def main():
@@ -10,29 +9,424 @@ def main():
     parser = argparse.ArgumentParser(description="Parsing the inputs to run the module.")
     parser.add_argument("-i", "--inputs", dest="inputs", help="TOML file with input data.")
     parser.add_argument("-o", "--output-path", dest="output_path", help="Path where to write the results.")
-    parser.add_argument("-s", "--solver", dest="solver", help="Solver name (cbc, cplex ...)", default="cbc")
+    parser.add_argument(
+        "-s", "--solver", dest="solver", default="cbc",
+        help="Solver name (cbc, cplex ...), comma-separated names or portfolio to race several solvers."
+    )
     parser.add_argument("-d", "--debug", dest="is_debug", action="store_true", help="Debug mode.")
-    parser.add_argument("-m", "--model-format", dest="model_format", help="Output file formal (lp, mps ...")
+    parser.add_argument(
+        "-m", "--model-format", dest="model_format", choices=MODEL_FORMATS, default="lp",
+        help="Format of the model file written in debug mode (.gz to compress it)."
+    )
+    optimiser_group = parser.add_mutually_exclusive_group()
+    optimiser_group.add_argument(
+        "-r", "--rolling-horizon", dest="window_size", type=int,
+        help="Re-optimise over a receding window of this many time-steps."
+    )
+    optimiser_group.add_argument(
+        "--decompose", dest="decomposition_size", type=int,
+        help="Solve the horizon as overlapping windows committing this many time-steps each, on a pool of processes."
+    )
+    optimiser_group.add_argument(
+        "--aggregate", dest="aggregation_tolerance", type=float,
+        help="Group time-steps whose cost and ambient temperature differ by less than this fraction of their ranges."
+    )
+    optimiser_group.add_argument(
+        "--scenarios", dest="scenarios_path",
+        help="npz file with (scenarios x horizon) arrays of the ambient temperature and/or the cost of electricity."
+    )
+    parser.add_argument(
+        "--first-stage-steps", dest="first_stage_steps", type=int,
+        help="Number of time-steps whose power is the same in all the scenarios (the whole horizon by default)."
+    )
+    parser.add_argument(
+        "--max-error", dest="max_error", type=float, default=1e-4,
+        help="Maximum relative error of the objective of the aggregated problem."
+    )
+    parser.add_argument(
+        "--time-limit", dest="time_limit", type=float,
+        help="Time limit of the solver in seconds, after which the best feasible solution is kept."
+    )
+    parser.add_argument(
+        "--mip-gap", dest="mip_gap", type=float, help="Relative gap at which the solver of discrete modes stops."
+    )
+    parser.add_argument(
+        "--portfolio-log", dest="portfolio_log",
+        help="JSON-lines file where to append the outcome of the race of a portfolio of solvers (not logged by "
+             "default)."
+    )
+    parser.add_argument(
+        "--overlap", dest="overlap", type=int, default=96,
+        help="Number of time-steps solved before and after the block of every window of the decomposition."
+    )
+    parser.add_argument(
+        "-w", "--workers", dest="workers", type=int,
+        help="Number of processes solving the windows of the decomposition."
+    )
+    parser.add_argument(
+        "--float32", dest="is_float32", action="store_true",
+        help="Share the time series with the processes of the decomposition in single precision."
+    )
+    parser.add_argument(
+        "--no-cache", dest="is_cached", action="store_false",
+        help="Do not use the results cache (by default, results are cached in ~/.cache/simulate and an unchanged "
+             "instance is not solved again, except in debug mode)."
+    )
+    parser.add_argument(
+        "--refresh", dest="refresh_cache", action="store_true", help="Re-solve and overwrite the cached results."
+    )
+    parser.add_argument(
+        "-f", "--output-format", dest="output_format", choices=OUTPUT_FORMATS, default="csv",
+        help="Format of the results: one csv per variable, or a single npz/parquet file."
+    )
+    parser.add_argument(
+        "-c", "--compression", dest="compression",
+        help="Compression of npz (any value) or parquet (snappy, gzip, zstd ...) results."
+    )
+    parser.add_argument("--plots", dest="plots", nargs="+", choices=PLOTS, default=PLOTS, help="Plots to render.")
+    parser.add_argument("--no-plot", dest="plots", action="store_const", const=(), help="Do not render any plot.")
+    parser.add_argument(
+        "--plot-format", dest="plot_format", default="pdf", help="Format of the plots (pdf, png ...)."
+    )
+    parser.add_argument(
+        "--plot-max-points", dest="plot_max_points", type=int,
+        help="Downsample longer series to this many points, keeping their minima and maxima."
+    )
+    parser.add_argument(
+        "--rasterise", dest="is_rasterised", action="store_true", help="Rasterise series in vector plots."
+    )
+    parser.add_argument(
+        "--plot-workers", dest="plot_workers", type=int, default=1, help="Number of processes rendering the plots."
+    )
+    parser.add_argument(
+        "-p", "--profile", dest="profile_path",
+        help="JSON file where to write the timings, memory and solver statistics of the run."
+    )
+    parser.add_argument(
+        "--profile-memory", dest="is_memory_traced", action="store_true",
+        help="Trace the peak memory allocated by each phase (slows down the run)."
+    )
+    parser.add_argument("--cprofile", dest="cprofile_path", help="File where to dump cProfile statistics.")
+    subparsers = parser.add_subparsers(dest="command")
+
+    batch_parser = subparsers.add_parser("batch", help="Simulate many TOML instances on a pool of processes.")
+    batch_parser.add_argument("instances", nargs="+", help="Directories, glob patterns or TOML files.")
+    batch_parser.add_argument(
+        "-o", "--output-path", dest="output_path", required=True, help="Path where to write the results."
+    )
+    batch_parser.add_argument("-s", "--solver", dest="solver", help="Solver name (cbc, cplex ...)", default="cbc")
+    batch_parser.add_argument("-w", "--workers", dest="workers", type=int, help="Number of worker processes.")
+    batch_parser.add_argument(
+        "-t", "--timeout", dest="timeout", type=float, help="Time limit per instance in seconds."
+    )
+    batch_parser.add_argument(
+        "-f", "--output-format", dest="output_format", choices=OUTPUT_FORMATS, default="csv",
+        help="Format of the results: one csv per variable, or a single npz/parquet file."
+    )
+    batch_parser.add_argument(
+        "-c", "--compression", dest="compression",
+        help="Compression of npz (any value) or parquet (snappy, gzip, zstd ...) results."
+    )
+
+    sweep_parser = subparsers.add_parser("sweep", help="Solve a grid of parameters described in a TOML file.")
+    sweep_parser.add_argument("sweep_file", help="TOML file with the base inputs and the swept parameters.")
+    sweep_parser.add_argument(
+        "-o", "--output-path", dest="output_path", required=True, help="Path where to write the results."
+    )
+    sweep_parser.add_argument("-s", "--solver", dest="solver", help="Solver name (cbc, cplex ...)", default="cbc")
+    sweep_parser.add_argument("-w", "--workers", dest="workers", type=int, help="Number of worker processes.")
+    sweep_parser.add_argument(
+        "-c", "--checkpoint-every", dest="checkpoint_every", type=int, default=50,
+        help="Number of solved points between checkpoints."
+    )
+    sweep_parser.add_argument(
+        "--float32", dest="is_float32", action="store_true",
+        help="Share the time series with the worker processes in single precision."
+    )
+    sweep_parser.add_argument(
+        "--retry-failed", dest="retry_failed", action="store_true",
+        help="Solve again the points that failed in a previous run."
+    )
+    backtest_parser = subparsers.add_parser(
+        "backtest", help="Replay stored schedules against the realised ambient temperature and cost of electricity."
+    )
+    backtest_parser.add_argument(
+        "schedules", nargs="+",
+        help="Result folders or files, glob patterns, or npy (schedules x time-steps) matrices."
+    )
+    backtest_parser.add_argument("-i", "--inputs", dest="inputs", required=True, help="TOML file with input data.")
+    backtest_parser.add_argument(
+        "-o", "--output-path", dest="output_path", help="Path where to write the indicators."
+    )
+    backtest_parser.add_argument(
+        "--temperature-ambient", dest="temperature_ambient_file",
+        help="File with the realised ambient temperature (the forecast of the inputs by default)."
+    )
+    backtest_parser.add_argument(
+        "--cost-electricity", dest="cost_electricity_file",
+        help="File with the realised cost of electricity (the forecast of the inputs by default)."
+    )
+    backtest_parser.add_argument(
+        "--chunk-size", dest="chunk_size", type=int, help="Number of schedules evaluated at once."
+    )
+    fleet_parser = subparsers.add_parser(
+        "fleet", help="Coordinate the heaters of buildings sharing the capacity of a feeder."
+    )
+    fleet_parser.add_argument(
+        "fleet_file", help="TOML file with the inputs files of the buildings and the feeder capacity."
+    )
+    fleet_parser.add_argument(
+        "-o", "--output-path", dest="output_path", required=True, help="Path where to write the results."
+    )
+    fleet_parser.add_argument("-w", "--workers", dest="workers", type=int, help="Number of worker processes.")
+    fleet_parser.add_argument(
+        "--rho", dest="rho", type=float, help="Penalty of the coordination (derived from the costs by default)."
+    )
+    fleet_parser.add_argument(
+        "--tolerance", dest="tolerance", type=float, default=1e-4,
+        help="Maximum relative gap between the cost of the fleet and its lower bound."
+    )
+    fleet_parser.add_argument(
+        "--max-iterations", dest="max_iterations", type=int, default=1000, help="Maximum number of iterations."
+    )
+    fleet_parser.add_argument(
+        "-f", "--output-format", dest="output_format", choices=OUTPUT_FORMATS, default="csv",
+        help="Format of the results: one csv per variable, or a single npz/parquet file."
+    )
+    fleet_parser.add_argument(
+        "-c", "--compression", dest="compression",
+        help="Compression of npz (any value) or parquet (snappy, gzip, zstd ...) results."
+    )
+    frontier_parser = subparsers.add_parser(
+        "frontier", help="Trace the optimal cost as the temperature bounds move towards target bounds."
+    )
+    frontier_parser.add_argument("-i", "--inputs", dest="inputs", required=True, help="TOML file with input data.")
+    frontier_parser.add_argument(
+        "--to", dest="temperature_bounds", type=float, nargs=2, required=True, metavar=("MIN", "MAX"),
+        help="Target temperature bounds."
+    )
+    frontier_parser.add_argument("-o", "--output-path", dest="output_path", help="Path where to write the frontier.")
+    serve_parser = subparsers.add_parser("serve", help="Serve simulations over HTTP from a pool of warm workers.")
+    serve_parser.add_argument("--host", dest="host", default="127.0.0.1", help="Address to listen on.")
+    serve_parser.add_argument("--port", dest="port", type=int, default=8080, help="Port to listen on.")
+    serve_parser.add_argument(
+        "--socket", dest="socket_path", help="Unix socket to listen on instead of host and port."
+    )
+    serve_parser.add_argument("-s", "--solver", dest="solver", help="Solver name (cbc, cplex ...)", default="cbc")
+    serve_parser.add_argument("-w", "--workers", dest="workers", type=int, help="Number of worker processes.")
+    serve_parser.add_argument(
+        "--batch-size", dest="max_batch_size", type=int, default=8,
+        help="Maximum number of requests solved at once by a worker."
+    )
+    serve_parser.add_argument(
+        "--batch-wait", dest="batch_wait", type=float, default=0.0,
+        help="Maximum time in seconds to wait for more requests to fill a batch."
+    )
+    serve_parser.add_argument(
+        "--max-pending", dest="max_pending", type=int, default=1024,
+        help="Maximum number of queued requests, beyond which requests are rejected."
+    )
     args = parser.parse_args()
+    is_decomposed = any(
+        value is not None for value in
+        (args.window_size, args.decomposition_size, args.aggregation_tolerance, args.scenarios_path)
+    )
+    if args.command is None and is_decomposed and (args.time_limit is not None or args.mip_gap is not None):
+        parser.error(
+            "--time-limit and --mip-gap only apply to the full model, not to --rolling-horizon, --decompose, "
+            "--aggregate or --scenarios."
+        )
+    if args.command == "sweep" and args.checkpoint_every < 1:
+        parser.error("--checkpoint-every must be at least 1.")
+
+    if args.command == "batch":
+        batch(args)
+    elif args.command == "sweep":
+        sweep(args)
+    elif args.command == "backtest":
+        backtest(args)
+    elif args.command == "fleet":
+        fleet(args)
+    elif args.command == "frontier":
+        frontier(args)
+    elif args.command == "serve":
+        serve(args)
+    else:
+        simulate(args)
+
+
+def simulate(args: argparse.Namespace) -> None:
+    import numpy as np
+
+    from . import create_inputs
+    from .core import (
+        AggregatedOptimiser, DecompositionOptimiser, Optimiser, ResultCache, RollingHorizonOptimiser,
+        ScenarioOptimiser, Simulator
+    )
+    from .core.optimiser import load_scenarios
+    from .core.profiler import Profiler
 
     os.makedirs(args.output_path, exist_ok=True)
 
-    inputs = create_inputs(args.inputs)
-    simulator = Simulator(
-        inputs=inputs,
-        optimiser=Optimiser(),
+    profiler = Profiler(
+        is_enabled=args.profile_path is not None or args.cprofile_path is not None,
+        is_memory_traced=args.is_memory_traced,
+        cprofile_path=args.cprofile_path
+    )
+    with profiler:
+        with profiler.phase("inputs"):
+            inputs = create_inputs(args.inputs)
+        if args.window_size is not None:
+            optimiser = RollingHorizonOptimiser(args.window_size)
+        elif args.decomposition_size is not None:
+            optimiser = DecompositionOptimiser(
+                args.decomposition_size, args.overlap, args.workers, dtype=np.float32 if args.is_float32 else None
+            )
+        elif args.aggregation_tolerance is not None:
+            optimiser = AggregatedOptimiser(args.aggregation_tolerance, args.max_error)
+        elif args.scenarios_path is not None:
+            optimiser = ScenarioOptimiser(load_scenarios(args.scenarios_path, inputs), args.first_stage_steps)
+        else:
+            optimiser = Optimiser(time_limit=args.time_limit, mip_gap=args.mip_gap, portfolio_log=args.portfolio_log)
+        simulator = Simulator(
+            inputs=inputs,
+            optimiser=optimiser,
+            output_path=args.output_path,
+            solver=args.solver,
+            is_debug=args.is_debug,
+            model_format=args.model_format,
+            # The outcomes of the scenarios are not cached, only their expectation
+            cache=ResultCache() if args.is_cached and args.scenarios_path is None else None,
+            refresh_cache=args.refresh_cache,
+            output_format=args.output_format,
+            compression=args.compression,
+            profiler=profiler
+        )
+        results = simulator.simulate()
+        if getattr(optimiser, "relative_gap", None) is not None:
+            print(f"Relative gap of the solution: {optimiser.relative_gap:.3g}.")
+        if getattr(optimiser, "objective_error_bound", None) is not None:
+            print(f"Objective within {optimiser.objective_error_bound:.3g} of the optimum.")
+        if args.scenarios_path is not None:
+            np.savez(os.path.join(args.output_path, "scenario_results.npz"), **optimiser.scenario_results)
+        if args.plots:
+            from .core import Plotter
+
+            with profiler.phase("plot"):
+                plotter = Plotter(
+                    inputs=inputs,
+                    simulation_results=results,
+                    output_path=args.output_path,
+                    plots=tuple(args.plots),
+                    file_format=args.plot_format,
+                    max_points=args.plot_max_points,
+                    is_rasterised=args.is_rasterised,
+                    workers=args.plot_workers
+                )
+                plotter()
+
+    if args.profile_path is not None:
+        profiler.metadata = {
+            "instance": args.inputs,
+            "solver": args.solver,
+            "optimiser": repr(optimiser),
+            "n_steps": len(inputs.horizon)
+        }
+        profiler.dump(args.profile_path)
+
+
+def batch(args: argparse.Namespace) -> None:
+    from .batch import collect_instances, run_batch
+
+    instances = collect_instances(args.instances)
+    summary = run_batch(
+        instances=instances,
+        output_path=args.output_path,
+        solver=args.solver,
+        workers=args.workers,
+        timeout=args.timeout,
+        output_format=args.output_format,
+        compression=args.compression
+    )
+    print(summary[["instance", "status", "objective", "wall_time"]].to_string(index=False))
+
+
+def sweep(args: argparse.Namespace) -> None:
+    from .sweep import run_sweep
+
+    store = run_sweep(
+        sweep_file=args.sweep_file,
         output_path=args.output_path,
         solver=args.solver,
-        is_debug=args.is_debug,
-        model_format=args.model_format
+        workers=args.workers,
+        checkpoint_every=args.checkpoint_every,
+        dtype="float32" if args.is_float32 else None,
+        retry_failed=args.retry_failed
+    )
+    print(f"{len(store)} points in the store.")
+
+
+def backtest(args: argparse.Namespace) -> None:
+    import json
+
+    from . import create_inputs
+    from .backtest import collect_schedules, run_backtest
+
+    results = run_backtest(
+        schedules=collect_schedules(args.schedules),
+        inputs=create_inputs(args.inputs),
+        output_path=args.output_path,
+        temperature_ambient_file=args.temperature_ambient_file,
+        cost_electricity_file=args.cost_electricity_file,
+        size=args.chunk_size
     )
-    results = simulator.simulate()
-    plotter = Plotter(
-        inputs=inputs,
-        simulation_results=results,
-        output_path=args.output_path
+    print(json.dumps(results.summary(), indent=2))
+
+
+def fleet(args: argparse.Namespace) -> None:
+    import json
+
+    from .fleet import run_fleet
+
+    results = run_fleet(
+        fleet_file=args.fleet_file,
+        output_path=args.output_path,
+        rho=args.rho,
+        tolerance=args.tolerance,
+        max_iterations=args.max_iterations,
+        workers=args.workers,
+        output_format=args.output_format,
+        compression=args.compression
+    )
+    print(json.dumps(results.summary(), indent=2))
+
+
+def frontier(args: argparse.Namespace) -> None:
+    from pathlib import Path
+
+    from . import create_inputs
+    from .core import ComfortFrontier
+
+    table = ComfortFrontier(create_inputs(args.inputs))(tuple(args.temperature_bounds)).to_pandas()
+    if args.output_path is not None:
+        Path(args.output_path).mkdir(parents=True, exist_ok=True)
+        table.to_csv(Path(args.output_path) / "frontier.csv", index=False)
+    print(table.to_string(index=False))
+
+
+def serve(args: argparse.Namespace) -> None:
+    from .server import run_server
+
+    run_server(
+        host=args.host,
+        port=args.port,
+        socket_path=args.socket_path,
+        solver=args.solver,
+        workers=args.workers,
+        max_batch_size=args.max_batch_size,
+        batch_wait=args.batch_wait,
+        max_pending=args.max_pending
     )
-    plotter()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,384 @@
+import glob
+import json
+import os
+import os.path as osp
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, fields
+
+import numpy as np
+import numpy.typing as npt
+
+from simulate.core import Inputs
+from simulate.core.lazy import lazy_import
+from simulate.core.storage import RESULTS_FILE, read_results
+from simulate.core.timeseries import load_series
+
+pd = lazy_import("pandas")
+
+# Size of the chunks of schedules evaluated at once
+CHUNK_BYTES = 2**26
+
+
+@dataclass(slots=True)
+class BacktestResults:
+    """Key performance indicators of every schedule replayed against the realised conditions
+    """
+    names: list[str]
+    planned_cost: npt.NDArray
+    realised_cost: npt.NDArray
+    energy: npt.NDArray
+    violation_steps: npt.NDArray
+    violation_degree_hours: npt.NDArray
+    max_violation: npt.NDArray
+
+    def summary(self) -> dict:
+        """Aggregates the indicators of all the schedules
+
+        Returns
+        -------
+        summary : dict
+            json-serialisable summary
+        """
+        is_violated = self.violation_steps > 0
+
+        return {
+            "n_schedules": len(self.names),
+            "planned_cost": float(self.planned_cost.sum()),
+            "realised_cost": float(self.realised_cost.sum()),
+            "cost_deviation": float((self.realised_cost - self.planned_cost).sum()),
+            "realised_cost_p50": float(np.percentile(self.realised_cost, 50)) if len(self.names) else None,
+            "realised_cost_p95": float(np.percentile(self.realised_cost, 95)) if len(self.names) else None,
+            "energy": float(self.energy.sum()),
+            "schedules_with_violations": int(is_violated.sum()),
+            "share_with_violations": float(is_violated.mean()) if len(self.names) else None,
+            "violation_steps": int(self.violation_steps.sum()),
+            "violation_degree_hours": float(self.violation_degree_hours.sum()),
+            "max_violation": float(self.max_violation.max(initial=0))
+        }
+
+    def to_pandas(self) -> "pd.DataFrame":
+        """Indicators of every schedule as a table
+
+        Returns
+        -------
+        table : pd.DataFrame
+            one row per schedule
+        """
+        return pd.DataFrame({field.name: getattr(self, field.name) for field in fields(self)})
+
+
+class Backtester:
+    """Replays heater schedules against the realised ambient temperature and cost of electricity
+
+    The temperature of the house follows the relation of Constraints, and the cost the formula of ObjectiveFunction,
+    for a whole matrix of schedules (schedules x time-steps) at once. Schedules are streamed in chunks, so the
+    matrix does not have to fit in memory.
+    """
+    tolerance: float = 1e-6
+
+    def __init__(
+            self,
+            inputs: Inputs,
+            temperature_ambient: npt.ArrayLike | None = None,
+            cost_electricity: npt.ArrayLike | None = None
+    ) -> None:
+        """Constructor
+
+        Parameters
+        ----------
+        inputs : Inputs
+            inputs of the simulation (bounds, coefficients, initial temperature and forecasts)
+        temperature_ambient : npt.ArrayLike | None
+            realised ambient temperature over the horizon (the forecast of the inputs if None)
+        cost_electricity : npt.ArrayLike | None
+            realised cost of electricity over the horizon (the forecast of the inputs if None)
+        """
+        n_steps = len(inputs.horizon)
+        self._inputs = inputs
+        self._temperature_ambient = np.asarray(
+            inputs.temperature_ambient if temperature_ambient is None else temperature_ambient, dtype=float
+        )[:n_steps]
+        self._cost_electricity = np.asarray(
+            inputs.cost_electricity if cost_electricity is None else cost_electricity, dtype=float
+        )[:n_steps]
+        if len(self._temperature_ambient) < n_steps or len(self._cost_electricity) < n_steps:
+            raise ValueError(f"The realised series must cover the {n_steps} time-steps of the horizon.")
+
+    def __call__(self, chunks: Iterable[tuple[list[str], npt.NDArray]]) -> BacktestResults:
+        """Evaluates all the chunks of schedules
+
+        Parameters
+        ----------
+        chunks : Iterable[tuple[list[str], npt.NDArray]]
+            names and (schedules x time-steps) power of the heater of every chunk
+
+        Returns
+        -------
+        results : BacktestResults
+            indicators of every schedule
+        """
+        names, indicators = [], []
+        for chunk_names, schedules in chunks:
+            names.extend(chunk_names)
+            indicators.append(self.evaluate(schedules))
+
+        if not indicators:
+            return BacktestResults(names, *(np.empty(0) for _ in range(6)))
+
+        return BacktestResults(names, *(np.concatenate(values) for values in zip(*indicators)))
+
+    def trajectories(self, schedules: npt.NDArray) -> npt.NDArray:
+        """Temperature of the house under every schedule
+
+        Parameters
+        ----------
+        schedules : npt.NDArray
+            (schedules x time-steps) power of the heater
+
+        Returns
+        -------
+        temperature_house : npt.NDArray
+            (schedules x time-steps) temperature of the house
+        """
+        schedules = self.__check_shape(schedules)
+        temperature_house = schedules * self._inputs.coefficient_heat_div_cool
+        temperature_house += self._temperature_ambient
+        temperature_house[:, 0] = self._inputs.initial_temperature
+
+        return temperature_house
+
+    def evaluate(self, schedules: npt.NDArray) -> tuple[npt.NDArray, ...]:
+        """Computes the indicators of a chunk of schedules
+
+        Parameters
+        ----------
+        schedules : npt.NDArray
+            (schedules x time-steps) power of the heater
+
+        Returns
+        -------
+        indicators : tuple[npt.NDArray, ...]
+            planned cost, realised cost, energy, number of time-steps out of the temperature bounds, degree-hours out
+            of the bounds, and largest distance to the bounds of every schedule
+        """
+        schedules = self.__check_shape(schedules)
+        scale = self._inputs.step_size * self._inputs.conversion_factor
+        planned_cost = schedules @ self._inputs.cost_electricity[:schedules.shape[1]] * scale
+        realised_cost = schedules @ self._cost_electricity * scale
+        energy = schedules.sum(axis=1) * self._inputs.step_size
+
+        temperature_min, temperature_max = self._inputs.temperature_bounds
+        excess = self.trajectories(schedules)
+        below = temperature_min - excess
+        excess -= temperature_max
+        np.maximum(excess, below, out=excess)
+        np.maximum(excess, 0, out=excess)
+        excess[excess <= self.tolerance] = 0
+
+        return (
+            planned_cost,
+            realised_cost,
+            energy,
+            np.count_nonzero(excess, axis=1),
+            excess.sum(axis=1) * self._inputs.step_size,
+            excess.max(axis=1, initial=0)
+        )
+
+    def __check_shape(self, schedules: npt.NDArray) -> npt.NDArray:
+        """Checks that the schedules cover the horizon
+
+        Parameters
+        ----------
+        schedules : npt.NDArray
+            (schedules x time-steps) power of the heater
+
+        Returns
+        -------
+        schedules : npt.NDArray
+            schedules as a two-dimensional float array
+        """
+        schedules = np.atleast_2d(np.asarray(schedules, dtype=float))
+        if schedules.shape[1] != len(self._temperature_ambient):
+            raise ValueError(
+                f"The schedules have {schedules.shape[1]} time-steps, "
+                f"the horizon has {len(self._temperature_ambient)}."
+            )
+
+        return schedules
+
+
+def chunk_size(n_steps: int, chunk_bytes: int = CHUNK_BYTES) -> int:
+    """Number of schedules per chunk
+
+    Parameters
+    ----------
+    n_steps : int
+        number of time-steps of the schedules
+    chunk_bytes : int
+        memory of a chunk of schedules in bytes
+
+    Returns
+    -------
+    size : int
+        number of schedules per chunk
+    """
+    return max(1, chunk_bytes // (8 * max(n_steps, 1)))
+
+
+def read_schedule_matrix(path: str, size: int | None = None) -> Iterator[tuple[list[str], npt.NDArray]]:
+    """Streams the rows of a (schedules x time-steps) matrix stored in a npy file, memory-mapped
+
+    Parameters
+    ----------
+    path : str
+        path to the npy file
+    size : int | None
+        number of schedules per chunk (a chunk of CHUNK_BYTES if None)
+
+    Yields
+    ------
+    names, schedules : tuple[list[str], npt.NDArray]
+        names (file and row) and power of the heater of a chunk of schedules
+    """
+    matrix = np.load(path, mmap_mode="r")
+    if matrix.ndim != 2:
+        raise ValueError(f"The schedules in {path} must be a (schedules x time-steps) matrix, found {matrix.shape}.")
+    size = size or chunk_size(matrix.shape[1])
+    for start in range(0, len(matrix), size):
+        stop = min(start + size, len(matrix))
+        yield [f"{path}[{row}]" for row in range(start, stop)], np.asarray(matrix[start:stop], dtype=float)
+
+
+def read_schedule_files(paths: list[str], size: int | None = None) -> Iterator[tuple[list[str], npt.NDArray]]:
+    """Streams the schedules of result folders or files (power_heater.csv, results.npz or results.parquet)
+
+    Parameters
+    ----------
+    paths : list[str]
+        result folders or files
+    size : int | None
+        number of schedules per chunk (a chunk of CHUNK_BYTES if None)
+
+    Yields
+    ------
+    names, schedules : tuple[list[str], npt.NDArray]
+        paths and power of the heater of a chunk of schedules
+    """
+    names, schedules = [], []
+    for path in paths:
+        names.append(path)
+        schedules.append(read_schedule(path))
+        if len(schedules[-1]) != len(schedules[0]):
+            raise ValueError(
+                f"The schedule in {path} has {len(schedules[-1])} time-steps, expected {len(schedules[0])}."
+            )
+        if len(names) == (size or chunk_size(len(schedules[0]))):
+            yield names, np.stack(schedules)
+            names, schedules = [], []
+    if names:
+        yield names, np.stack(schedules)
+
+
+def read_schedule(path: str) -> npt.NDArray:
+    """Reads the power of the heater stored by a simulation
+
+    Parameters
+    ----------
+    path : str
+        result folder or file (power_heater.csv, results.npz or results.parquet)
+
+    Returns
+    -------
+    power_heater : npt.NDArray
+        power of the heater at every time-step
+    """
+    if osp.isdir(path):
+        candidates = [
+            osp.join(path, name) for name in ("power_heater.csv", f"{RESULTS_FILE}.npz", f"{RESULTS_FILE}.parquet")
+        ]
+        existing = [candidate for candidate in candidates if osp.exists(candidate)]
+        if not existing:
+            raise FileNotFoundError(f"No schedule of the power of the heater in {path}.")
+        path = existing[0]
+    if path.endswith(".csv"):
+        # One row per time-step, after the header, with the time-step in the first column
+        return np.loadtxt(path, delimiter=",", skiprows=1, usecols=1, ndmin=1)
+
+    return np.asarray(read_results(path, columns=["power_heater"])[0]["power_heater"], dtype=float)
+
+
+def collect_schedules(paths: list[str]) -> list[str]:
+    """Expands glob patterns into a sorted list of result folders or files
+
+    Parameters
+    ----------
+    paths : list[str]
+        glob patterns, result folders or files
+
+    Returns
+    -------
+    schedules : list[str]
+        result folders or files
+    """
+    return sorted({match for path in paths for match in glob.glob(path)})
+
+
+def run_backtest(
+        schedules: list[str],
+        inputs: Inputs,
+        output_path: str | None = None,
+        temperature_ambient_file: str | dict | None = None,
+        cost_electricity_file: str | dict | None = None,
+        size: int | None = None
+) -> BacktestResults:
+    """Replays stored schedules against the realised conditions
+
+    Parameters
+    ----------
+    schedules : list[str]
+        result folders or files, or npy files with (schedules x time-steps) matrices
+    inputs : Inputs
+        inputs of the simulation
+    output_path : str | None
+        folder where to write the indicators of every schedule (backtest.csv) and their summary
+        (backtest_summary.json), nothing is written if None
+    temperature_ambient_file : str | dict | None
+        realised ambient temperature, as the series of the inputs files (the forecast of the inputs if None)
+    cost_electricity_file : str | dict | None
+        realised cost of electricity, as the series of the inputs files (the forecast of the inputs if None)
+    size : int | None
+        number of schedules per chunk (a chunk of CHUNK_BYTES if None)
+
+    Returns
+    -------
+    results : BacktestResults
+        indicators of every schedule
+    """
+    n_steps = len(inputs.horizon)
+    backtester = Backtester(
+        inputs,
+        temperature_ambient=(
+            None if temperature_ambient_file is None else
+            load_series(temperature_ambient_file, "temperature_ambient", inputs.step_size, n_steps)
+        ),
+        cost_electricity=(
+            None if cost_electricity_file is None else
+            load_series(cost_electricity_file, "cost_electricity", inputs.step_size, n_steps)
+        )
+    )
+    matrices = [path for path in schedules if path.endswith(".npy")]
+    files = [path for path in schedules if not path.endswith(".npy")]
+
+    def chunks() -> Iterator[tuple[list[str], npt.NDArray]]:
+        for path in matrices:
+            yield from read_schedule_matrix(path, size)
+        yield from read_schedule_files(files, size)
+
+    results = backtester(chunks())
+    if output_path is not None:
+        os.makedirs(output_path, exist_ok=True)
+        results.to_pandas().to_csv(osp.join(output_path, "backtest.csv"), index=False)
+        with open(osp.join(output_path, "backtest_summary.json"), "w") as summary_file:
+            json.dump(results.summary(), summary_file, indent=2)
+
+    return results
@@ -0,0 +1,240 @@
+import glob
+import multiprocessing
+import os
+import os.path as osp
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass
+
+import pandas as pd
+
+from simulate.core import Optimiser, Simulator
+from .utils import create_inputs
+
+
+@dataclass(slots=True)
+class BatchResult:
+    """Outcome of the simulation of one instance
+    """
+    instance: str
+    status: str
+    objective: float | None = None
+    wall_time: float | None = None
+    message: str = ""
+
+
+def collect_instances(paths: list[str]) -> list[str]:
+    """Expands directories and glob patterns into a sorted list of TOML files
+
+    Parameters
+    ----------
+    paths : list[str]
+        directories, glob patterns or TOML files
+
+    Returns
+    -------
+    instances : list[str]
+        paths to the TOML input files
+    """
+    instances = set()
+    for path in paths:
+        if osp.isdir(path):
+            instances.update(glob.glob(osp.join(path, "*.toml")))
+        else:
+            instances.update(glob.glob(path))
+
+    return sorted(instances)
+
+
+def output_folders(instances: list[str]) -> dict[str, str]:
+    """Names the result folders of the instances after their paths relative to the directory they share, without
+    extension, so that instances with the same file name in different directories do not overwrite each other
+
+    Parameters
+    ----------
+    instances : list[str]
+        paths to the TOML input files
+
+    Returns
+    -------
+    folders : dict[str, str]
+        relative result folder of every instance
+    """
+    if not instances:
+        return {}
+    root = osp.commonpath([osp.dirname(osp.abspath(instance)) for instance in instances])
+
+    return {instance: osp.splitext(osp.relpath(osp.abspath(instance), root))[0] for instance in instances}
+
+
+def run_instance(
+        inputs_file: str,
+        output_path: str,
+        solver: str = "cbc",
+        timeout: float | None = None,
+        output_format: str = "csv",
+        compression: str | None = None
+) -> BatchResult:
+    """Simulates one instance, capturing any failure in the returned result
+
+    Parameters
+    ----------
+    inputs_file : str
+        path to TOML inputs file
+    output_path : str
+        folder to store the results of the simulation
+    solver : str
+        solver to perform the matrix multiplication
+    timeout : float | None
+        maximum wall time in seconds (no limit if None), after which the instance and the solvers it launched are
+        killed
+    output_format : str
+        format of the results (csv, npz or parquet)
+    compression : str | None
+        compression of npz (any value) and parquet (name of the codec) files
+
+    Returns
+    -------
+    result : BatchResult
+        outcome of the simulation
+    """
+    start = time.perf_counter()
+    if not timeout:
+        return _simulate(inputs_file, output_path, solver, output_format, compression, start)
+
+    # The instance runs in its own process group, so that the solver executables it launches are killed with it
+    context = multiprocessing.get_context()
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(
+        target=_run_in_group, args=(sender, inputs_file, output_path, solver, output_format, compression, start)
+    )
+    process.start()
+    sender.close()
+    try:
+        if receiver.poll(max(timeout - (time.perf_counter() - start), 0)):
+            try:
+                return receiver.recv()
+            except EOFError:
+                process.join()
+                return BatchResult(
+                    inputs_file, "crashed", None, time.perf_counter() - start, f"exited with code {process.exitcode}"
+                )
+        return BatchResult(inputs_file, "timeout", None, time.perf_counter() - start, f"exceeded {timeout} s")
+    finally:
+        receiver.close()
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            process.kill()
+        process.join()
+
+
+def run_batch(
+        instances: list[str],
+        output_path: str,
+        solver: str = "cbc",
+        workers: int | None = None,
+        timeout: float | None = None,
+        output_format: str = "csv",
+        compression: str | None = None
+) -> pd.DataFrame:
+    """Simulates many instances on a pool of processes
+
+    Every instance writes its results to its own sub-folder of output_path (named after the path of the TOML file
+    relative to the directory all the instances share), and a summary of all the instances is written to
+    output_path/summary.csv.
+
+    Parameters
+    ----------
+    instances : list[str]
+        paths to the TOML input files
+    output_path : str
+        folder to store the results of the simulations
+    solver : str
+        solver to perform the matrix multiplication
+    workers : int | None
+        number of worker processes (number of CPUs if None)
+    timeout : float | None
+        maximum wall time in seconds per instance (no limit if None)
+    output_format : str
+        format of the results (csv, npz or parquet)
+    compression : str | None
+        compression of npz (any value) and parquet (name of the codec) files
+
+    Returns
+    -------
+    summary : pd.DataFrame
+        objective, wall time and status of each instance
+    """
+    os.makedirs(output_path, exist_ok=True)
+    results = []
+    folders = output_folders(instances)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                run_instance,
+                inputs_file=instance,
+                output_path=osp.join(output_path, folders[instance]),
+                solver=solver,
+                timeout=timeout,
+                output_format=output_format,
+                compression=compression
+            ): instance
+            for instance in instances
+        }
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except BrokenProcessPool as error:
+                result = BatchResult(futures[future], "crashed", message=str(error))
+            print(f"[{result.status}] {result.instance}")
+            results.append(result)
+
+    summary = pd.DataFrame([asdict(result) for result in results], columns=list(BatchResult.__dataclass_fields__))
+    summary = summary.sort_values("instance", ignore_index=True)
+    summary.to_csv(osp.join(output_path, "summary.csv"), index=False)
+
+    return summary
+
+
+def _simulate(
+        inputs_file: str,
+        output_path: str,
+        solver: str,
+        output_format: str,
+        compression: str | None,
+        start: float
+) -> BatchResult:
+    """Simulates one instance in the current process, capturing any failure in the returned result
+
+    Returns
+    -------
+    result : BatchResult
+        outcome of the simulation
+    """
+    try:
+        os.makedirs(output_path, exist_ok=True)
+        simulator = Simulator(
+            inputs=create_inputs(inputs_file),
+            optimiser=Optimiser(),
+            output_path=output_path,
+            solver=solver,
+            output_format=output_format,
+            compression=compression
+        )
+        results = simulator.simulate()
+        objective = results["objective_function"]
+        return BatchResult(inputs_file, "ok", objective, time.perf_counter() - start)
+    except Exception as error:
+        message = f"{type(error).__name__}: {' '.join(str(error).split())}"
+        return BatchResult(inputs_file, "failed", None, time.perf_counter() - start, message)
+
+
+def _run_in_group(sender, *args) -> None:
+    """Simulates one instance in a new process group (in a child process), and sends its result to the parent
+    """
+    os.setsid()
+    sender.send(_simulate(*args))
+    sender.close()
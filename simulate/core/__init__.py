@@ -1,4 +1,19 @@
-from .inputs import Inputs
-from .optimiser import Optimiser
-from .simulator import Simulator
-from .plotter import Plotter
+from .lazy import lazy_attributes
+
+# Modules are only imported when their attributes are first used, so the heavy dependencies (pyomo, pandas,
+# matplotlib ...) are only loaded by the code paths that need them
+__getattr__ = lazy_attributes(__name__, {
+    "Inputs": ".inputs",
+    "Optimiser": ".optimiser",
+    "RollingHorizonOptimiser": ".optimiser",
+    "DecompositionOptimiser": ".optimiser",
+    "ScenarioOptimiser": ".optimiser",
+    "AggregatedOptimiser": ".optimiser",
+    "ResultCache": ".cache",
+    "SimulationResults": ".results",
+    "SensitivityAnalysis": ".sensitivity",
+    "ComfortFrontier": ".frontier",
+    "Frontier": ".frontier",
+    "Simulator": ".simulator",
+    "Plotter": ".plotter"
+})
@@ -0,0 +1,156 @@
+import glob
+import hashlib
+import json
+import os
+import os.path as osp
+from dataclasses import fields
+
+import numpy as np
+
+from . import Inputs
+from .results import SimulationResults
+
+DEFAULT_CACHE_DIR = osp.join(osp.expanduser("~"), ".cache", "simulate")
+MODEL_SOURCES = osp.join(osp.dirname(__file__), "optimiser", "*.py")
+# Version of the layout of the entries, part of the key so entries in another layout are never read
+LAYOUT_VERSION = 2
+
+
+class ResultCache:
+    """Content-addressed on-disk cache of simulation results with size-based LRU eviction
+
+    Every entry is a npz file named after the hash of the inputs (fields and derived arrays), the solver, the
+    optimiser, the version of the model (hash of the sources of the optimiser package) and the version of the layout
+    of the entries.
+    """
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_size: int = 2**30) -> None:
+        """Constructor
+
+        Parameters
+        ----------
+        cache_dir : str
+            folder to store the cached results
+        max_size : int
+            maximum size of the cache in bytes, the least recently used entries are evicted beyond it
+        """
+        self._cache_dir = cache_dir
+        self._max_size = max_size
+        self._model_version: str = None
+
+    def key(self, inputs: Inputs, solver: str, optimiser: str) -> str:
+        """Computes the key of a simulation
+
+        Parameters
+        ----------
+        inputs : Inputs
+            inputs of the simulation
+        solver : str
+            solver name
+        optimiser : str
+            representation of the optimiser object
+
+        Returns
+        -------
+        key : str
+            hexadecimal digest
+        """
+        digest = hashlib.sha256()
+        data = {field.name: getattr(inputs, field.name) for field in fields(inputs) if field.init}
+        data.update(
+            solver=solver, optimiser=optimiser, model_version=self.model_version, layout_version=LAYOUT_VERSION
+        )
+        digest.update(json.dumps(data, sort_keys=True).encode())
+        for array in (inputs.horizon, inputs.temperature_ambient, inputs.cost_electricity):
+            digest.update(np.ascontiguousarray(array).tobytes())
+
+        return digest.hexdigest()
+
+    @property
+    def model_version(self) -> str:
+        """Hash of the sources of the optimiser package, so changes to the model invalidate the cache
+        """
+        if self._model_version is None:
+            digest = hashlib.sha256()
+            for path in sorted(glob.glob(MODEL_SOURCES)):
+                with open(path, "rb") as source:
+                    digest.update(source.read())
+            self._model_version = digest.hexdigest()
+
+        return self._model_version
+
+    def get(self, key: str) -> SimulationResults | None:
+        """Reads cached results
+
+        Parameters
+        ----------
+        key : str
+            key of the simulation
+
+        Returns
+        -------
+        results : SimulationResults | None
+            cached results (None if the key is not in the cache)
+        """
+        path = self.__path(key)
+        try:
+            with np.load(path) as data:
+                results = SimulationResults({name: data[name] for name in data.files})
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        results["objective_function"] = float(results["objective_function"])
+
+        return results
+
+    def put(self, key: str, results: SimulationResults) -> None:
+        """Writes results in the cache and evicts the least recently used entries if it is too large
+
+        The cache is best-effort: results that cannot be written (e.g. read-only home directory) are not cached.
+
+        Parameters
+        ----------
+        key : str
+            key of the simulation
+        results : SimulationResults
+            results of the simulation
+        """
+        path = self.__path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            with open(tmp_path, "wb") as tmp_file:
+                np.savez_compressed(tmp_file, **{name: np.asarray(val) for name, val in results.items()})
+            os.replace(tmp_path, path)
+            self.__evict()
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def __evict(self) -> None:
+        """Removes the least recently used entries until the cache fits in its maximum size
+        """
+        entries = []
+        for path in glob.glob(osp.join(self._cache_dir, "*.npz")):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self._max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+
+    def __path(self, key: str) -> str:
+        return osp.join(self._cache_dir, f"{key}.npz")
@@ -0,0 +1,4 @@
+# Kept free of heavy imports, as the command line parser needs them before any simulation code is loaded
+PLOTS = ("temp_power", "bounds", "price", "cost")
+OUTPUT_FORMATS = ("csv", "npz", "parquet")
+MODEL_FORMATS = ("lp", "mps", "lp.gz", "mps.gz")
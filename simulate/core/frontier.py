@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import numpy.typing as npt
+
+from .inputs import Inputs
+from .lazy import lazy_import
+from .optimiser.errors import SolverError
+from .optimiser.vectorised import VectorisedSolver
+from .results import SimulationResults
+
+pd = lazy_import("pandas")
+
+
+@dataclass(frozen=True, slots=True)
+class Frontier:
+    """Optimal cost against the temperature bounds, along a path of bounds
+
+    The cost and the mean temperature of the house are piecewise linear in the position along the path (0 at the
+    bounds of the inputs, 1 at the target bounds), with breakpoints at the positions given, and linear in between.
+    Positions where no schedule keeps the temperature within the bounds are left out.
+    """
+    position: npt.NDArray
+    temperature_min: npt.NDArray
+    temperature_max: npt.NDArray
+    mean_temperature: npt.NDArray
+    cost: npt.NDArray
+
+    def __call__(self, position: npt.ArrayLike) -> npt.NDArray:
+        """Optimal cost at any position of the path
+
+        Parameters
+        ----------
+        position : npt.ArrayLike
+            positions along the path
+
+        Returns
+        -------
+        cost : npt.NDArray
+            optimal cost, NaN where the bounds are infeasible
+        """
+        position = np.asarray(position, dtype=float)
+        is_feasible = (position >= self.position[0]) & (position <= self.position[-1])
+
+        return np.where(is_feasible, np.interp(position, self.position, self.cost), np.nan)
+
+    def to_pandas(self) -> "pd.DataFrame":
+        """Breakpoints of the frontier as a table
+
+        Returns
+        -------
+        table : pd.DataFrame
+            one row per breakpoint
+        """
+        return pd.DataFrame({name: getattr(self, name) for name in self.__slots__})
+
+
+class ComfortFrontier:
+    """Traces the optimal cost as the temperature bounds move from those of the inputs to target bounds, in one pass
+
+    Along the path, the bounds are linear in the position s in [0, 1]. Every time-step is an independent problem (see
+    VectorisedSolver), whose optimal power is its minimum feasible power (or its maximum for negative costs): the
+    larger of the power bound and the power bringing the house to its lower temperature bound, which is linear in s.
+    The optimal power of every time-step is thus piecewise linear in s with at most one breakpoint, and the optimal
+    cost is their sum: all the breakpoints are sorted once, and the cost at each of them is a cumulative sum of the
+    changes of slope, without solving any problem.
+    """
+    def __init__(self, inputs: Inputs) -> None:
+        """Constructor
+
+        Parameters
+        ----------
+        inputs : Inputs
+            inputs of the simulation, whose temperature bounds start the path
+        """
+        if inputs.power_levels is not None:
+            raise ValueError("The frontier is only traced for a heater whose power varies continuously.")
+        self._inputs = inputs
+
+    def __call__(self, temperature_bounds: tuple[float, float]) -> Frontier:
+        """Traces the frontier up to the target bounds
+
+        Parameters
+        ----------
+        temperature_bounds : tuple[float, float]
+            target temperature bounds, e.g. (19, 27) to widen the comfort band of the inputs, or (22, 24) to tighten
+            it
+
+        Returns
+        -------
+        frontier : Frontier
+            breakpoints of the frontier
+        """
+        inputs = self._inputs
+        start = np.asarray(inputs.temperature_bounds, dtype=float)
+        change = np.asarray(temperature_bounds, dtype=float) - start
+        power_min, power_max = inputs.power_bounds
+        coefficient = inputs.coefficient_heat_div_cool
+        ambient = inputs.temperature_ambient[1:]
+        cost = inputs.cost_electricity[1:] * inputs.step_size * inputs.conversion_factor
+        first, last = self.__feasible_positions(start, change)
+
+        # Optimal power of every time-step: the larger (smaller for negative costs) of the power bound and of the
+        # power at the lower (upper) temperature bound, intercept + slope * s
+        is_min = cost >= 0
+        bound = np.where(is_min, power_min, power_max)
+        intercept = (np.where(is_min, start[0], start[1]) - ambient) / coefficient
+        slope = np.where(is_min, change[0], change[1]) / coefficient * np.ones_like(ambient)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            kinks = np.where(slope != 0, (bound - intercept) / slope, np.inf)
+        # The power bound applies before the breakpoint if the power at the temperature bound crosses it upwards for a
+        # minimum (downwards for a maximum)
+        is_bound_first = (slope > 0) == is_min
+        clamped = np.where(is_min, np.maximum(bound, intercept), np.minimum(bound, intercept))
+        left = np.where(slope == 0, clamped, np.where(is_bound_first, bound, intercept)), np.where(
+            (slope == 0) | is_bound_first, 0.0, slope
+        )
+        right = np.where(is_bound_first, intercept, bound), np.where(is_bound_first, slope, 0.0)
+
+        position = np.unique(np.concatenate(([first, last], kinks[(kinks > first) & (kinks < last)])))
+        # Time-steps past their breakpoint at every position (the breakpoints before the first position included)
+        order = np.argsort(kinks)
+        n_kinks = np.searchsorted(kinks[order], position, side="right")
+
+        def total(weights: npt.NDArray) -> npt.NDArray:
+            """Sum of the optimal power over the time-steps, weighted, at every breakpoint
+            """
+            changes = [
+                np.concatenate(([0.0], np.cumsum((weights * (after - before))[order])))
+                for before, after in zip(left, right)
+            ]
+            return (
+                np.dot(weights, left[0]) + np.dot(weights, left[1]) * position +
+                changes[0][n_kinks] + changes[1][n_kinks] * position
+            )
+
+        first_power = power_min if inputs.cost_electricity[0] >= 0 else power_max
+        scale = inputs.step_size * inputs.conversion_factor
+        n_steps = len(inputs.horizon)
+        bounds = start + position[:, None] * change
+
+        return Frontier(
+            position=position,
+            temperature_min=bounds[:, 0],
+            temperature_max=bounds[:, 1],
+            mean_temperature=(
+                inputs.initial_temperature + ambient.sum() + coefficient * total(np.ones_like(ambient))
+            ) / n_steps,
+            cost=inputs.cost_electricity[0] * first_power * scale + total(cost)
+        )
+
+    def schedule(self, temperature_bounds: tuple[float, float]) -> SimulationResults:
+        """Optimal schedule for some temperature bounds of the frontier
+
+        Parameters
+        ----------
+        temperature_bounds : tuple[float, float]
+            temperature bounds
+
+        Returns
+        -------
+        results : SimulationResults
+            optimal temperature of the house, power of the heater and cost
+        """
+        return SimulationResults(VectorisedSolver(self._inputs.perturbed(temperature_bounds=temperature_bounds))())
+
+    def __feasible_positions(self, start: npt.NDArray, change: npt.NDArray) -> tuple[float, float]:
+        """Finds the positions of the path where every time-step admits a schedule within the bounds
+
+        Every condition is linear in the position s (offset + slope * s <= 0): the lower bound is below the upper
+        bound, the initial temperature is within the bounds, and the power bounds reach the temperature bounds at
+        every time-step (only the coldest and warmest time-steps matter).
+
+        Parameters
+        ----------
+        start : npt.NDArray
+            temperature bounds at position 0
+        change : npt.NDArray
+            change of the temperature bounds from position 0 to 1
+
+        Returns
+        -------
+        first, last : tuple[float, float]
+            first and last feasible positions
+        """
+        inputs = self._inputs
+        power_min, power_max = inputs.power_bounds
+        ambient = inputs.temperature_ambient[1:]
+        coefficient = inputs.coefficient_heat_div_cool
+        conditions = np.array([
+            (start[0] - start[1], change[0] - change[1]),
+            (start[0] - inputs.initial_temperature, change[0]),
+            (inputs.initial_temperature - start[1], -change[1]),
+            (start[0] - ambient.min(initial=np.inf) - coefficient * power_max, change[0]),
+            (ambient.max(initial=-np.inf) + coefficient * power_min - start[1], -change[1]),
+            (power_min - power_max, 0.0)
+        ])
+        offset, slope = conditions.T
+        tolerance = VectorisedSolver.tolerance
+        with np.errstate(divide="ignore", invalid="ignore"):
+            limits = -offset / slope
+        first = float(np.max(limits[slope < 0], initial=0.0))
+        last = float(np.min(limits[slope > 0], initial=1.0))
+        if (offset[slope == 0] > tolerance).any() or first > last + tolerance:
+            raise SolverError(
+                f"Problem not properly solved.\n"
+                f"Status: infeasible\n"
+                f"No temperature bounds between {tuple(start)} and {tuple(start + change)} are feasible."
+            )
+
+        return first, max(first, last)
@@ -1,9 +1,15 @@
+import copy
 from dataclasses import dataclass, field
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import numpy as np
 import numpy.typing as npt
 
+from .timeseries import load_series
+
+if TYPE_CHECKING:
+    from .shared import SharedSeriesStore
+
 
 @dataclass(frozen=True, slots=True)
 class Inputs:
@@ -16,6 +22,11 @@ class Inputs:
     step_size: int
     conversion_factor: int
     variables: list[str]
+    temperature_ambient_file: str | dict | None = None
+    cost_electricity_file: str | dict | None = None
+    power_levels: list[float] | None = None
+    minimum_up_time: float = 0
+    minimum_down_time: float = 0
     horizon: npt.NDArray = field(init=False)
     temperature_ambient: npt.NDArray = field(init=False)
     cost_electricity: npt.NDArray = field(init=False)
@@ -23,17 +34,107 @@ class Inputs:
 
     def __post_init__(self) -> None:
         """Instantiates the remaining attributes (horizon, temperature_ambient, and cost_electricity)
+
+        The ambient temperature and the cost of electricity are read from the given files, if any.
         """
         time_set = np.arange(start=0, stop=self.cardinality_horizon, step=self.step_size)
         attrs = {
             "horizon": np.arange(start=0, stop=len(time_set), step=1),
-            "temperature_ambient": 15 - np.sin(np.pi*(time_set+4)/12),
-            "cost_electricity": 40 + 25*np.sin(np.pi*time_set/12)**2,
+            "temperature_ambient": (
+                15 - np.sin(np.pi*(time_set+4)/12) if self.temperature_ambient_file is None else
+                load_series(self.temperature_ambient_file, "temperature_ambient", self.step_size, len(time_set))
+            ),
+            "cost_electricity": (
+                40 + 25*np.sin(np.pi*time_set/12)**2 if self.cost_electricity_file is None else
+                load_series(self.cost_electricity_file, "cost_electricity", self.step_size, len(time_set))
+            ),
             "coefficient_heat_div_cool": self.heating_coefficient / self.cooling_coefficient
         }
         for key, val in attrs.items():
             self.__set_attribute(attribute=key, value=val)
 
+    def window(self, start: int, stop: int, initial_temperature: float | None = None) -> "Inputs":
+        """Restricts the inputs to the time-steps [start, stop) of the horizon
+
+        Parameters
+        ----------
+        start : int
+            first time-step of the window, whose temperature is the initial temperature of the window
+        stop : int
+            time-step following the last one of the window
+        initial_temperature : float | None
+            temperature of the house at the start of the window (the initial temperature if None)
+
+        Returns
+        -------
+        inputs : Inputs
+            inputs of the window, indexed from 0
+        """
+        window = copy.copy(self)
+        attrs = {
+            "cardinality_horizon": (stop - start) * self.step_size,
+            "horizon": np.arange(stop - start),
+            "temperature_ambient": self.temperature_ambient[start:stop],
+            "cost_electricity": self.cost_electricity[start:stop],
+            "initial_temperature": self.initial_temperature if initial_temperature is None else initial_temperature
+        }
+        for key, val in attrs.items():
+            window.__set_attribute(attribute=key, value=val)
+
+        return window
+
+    def perturbed(self, **values: Any) -> "Inputs":
+        """Replaces some of the inputs of the optimisation, without reading the series again
+
+        Parameters
+        ----------
+        values : Any
+            new values of initial_temperature, temperature_bounds, power_bounds (tuples), temperature_ambient or
+            cost_electricity (scalars or arrays over the horizon)
+
+        Returns
+        -------
+        inputs : Inputs
+            perturbed inputs
+        """
+        series = {"temperature_ambient", "cost_electricity"}
+        unknown = set(values) - series - {"initial_temperature", "temperature_bounds", "power_bounds"}
+        if unknown:
+            raise ValueError(f"Inputs that cannot be perturbed: {sorted(unknown)}.")
+
+        perturbed = copy.copy(self)
+        for key, val in values.items():
+            if key in series:
+                val = np.array(np.broadcast_to(np.asarray(val, dtype=float), self.horizon.shape))
+            elif key != "initial_temperature":
+                val = tuple(val)
+            perturbed.__set_attribute(attribute=key, value=val)
+
+        return perturbed
+
+    def attach(self, store: "SharedSeriesStore", dtype: npt.DTypeLike | None = None) -> "Inputs":
+        """Moves the horizon and the series to a shared-memory store, so that worker processes share them
+
+        Parameters
+        ----------
+        store : SharedSeriesStore
+            shared-memory store
+        dtype : npt.DTypeLike | None
+            type of the shared ambient temperature and cost of electricity, e.g. np.float32 to halve their size
+            (unchanged if None)
+
+        Returns
+        -------
+        inputs : Inputs
+            inputs reading their horizon and series from the store
+        """
+        attached = copy.copy(self)
+        attached.__set_attribute(attribute="horizon", value=store.put(self.horizon))
+        for key in ("temperature_ambient", "cost_electricity"):
+            attached.__set_attribute(attribute=key, value=store.put(getattr(self, key), dtype))
+
+        return attached
+
     def __set_attribute(self, attribute: str, value: npt.NDArray | float) -> None:
         """Adds attribute to frozen object
         """
@@ -0,0 +1,59 @@
+import importlib
+import sys
+from types import ModuleType
+
+
+class LazyModule(ModuleType):
+    """Placeholder of a module that is imported the first time one of its attributes is accessed
+    """
+    def __getattr__(self, attribute: str):
+        module = importlib.import_module(self.__name__)
+        # Later accesses are resolved by the instance dictionary, without going through __getattr__
+        self.__dict__.update(module.__dict__)
+
+        return getattr(module, attribute)
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Imports a module that is only loaded the first time one of its attributes is accessed
+
+    Parameters
+    ----------
+    name : str
+        absolute name of the module
+
+    Returns
+    -------
+    module : ModuleType
+        the module if it is already loaded, a placeholder that loads it on first use otherwise
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+
+    return LazyModule(name)
+
+
+def lazy_attributes(package: str, attributes: dict[str, str]):
+    """Creates the module-level __getattr__ of a package whose attributes are imported from its modules on first use
+
+    Parameters
+    ----------
+    package : str
+        name of the package
+    attributes : dict[str, str]
+        name of each attribute and relative name of the module that defines it
+
+    Returns
+    -------
+    __getattr__ : callable
+        function to be assigned to the __getattr__ of the package
+    """
+    def __getattr__(name: str):
+        if name not in attributes:
+            raise AttributeError(f"module '{package}' has no attribute '{name}'")
+        value = getattr(importlib.import_module(attributes[name], package), name)
+        setattr(sys.modules[package], name, value)
+
+        return value
+
+    return __getattr__
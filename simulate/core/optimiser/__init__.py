@@ -1,3 +1,13 @@
-from .objective_function import ObjectiveFunction
-from .constraints import Constraints
-from .optimiser import Optimiser
+from ..lazy import lazy_attributes
+from .errors import SolverError
+
+__getattr__ = lazy_attributes(__name__, {
+    "ObjectiveFunction": ".objective_function",
+    "Constraints": ".constraints",
+    "Optimiser": ".optimiser",
+    "RollingHorizonOptimiser": ".rolling_horizon",
+    "DecompositionOptimiser": ".decomposition",
+    "ScenarioOptimiser": ".scenarios",
+    "AggregatedOptimiser": ".aggregation",
+    "load_scenarios": ".scenarios"
+})
@@ -0,0 +1,360 @@
+from __future__ import annotations
+
+import numpy as np
+import numpy.typing as npt
+
+from simulate.core import Inputs
+from simulate.core.lazy import lazy_import
+from .errors import SolverError
+from .optimiser import Optimiser
+from .sparse import SparseProblem, SparseSolver
+from .vectorised import VectorisedSolver
+
+sco = lazy_import("scipy.optimize")
+sps = lazy_import("scipy.sparse")
+
+
+def similar_blocks(inputs: Inputs, tolerance: float) -> npt.NDArray:
+    """Groups consecutive time-steps with similar cost of electricity and ambient temperature into blocks
+
+    Both series are quantised in bins of `tolerance` times their range, and a block starts wherever a bin changes
+    (a constant series never starts a block). The first time-step, whose temperature is the initial temperature, is a
+    block of its own. A tolerance of 0 or less does not aggregate: every time-step is a block.
+
+    Parameters
+    ----------
+    inputs : Inputs
+        inputs of the simulation
+    tolerance : float
+        width of the bins, relative to the range of every series
+
+    Returns
+    -------
+    starts : npt.NDArray
+        first time-step of every block
+    """
+    if tolerance <= 0:
+        return np.arange(len(inputs.horizon))
+    changes = np.zeros(len(inputs.horizon), dtype=bool)
+    changes[:2] = True
+    for series in (inputs.cost_electricity, inputs.temperature_ambient):
+        width = tolerance * np.ptp(series)
+        if width > 0:
+            bins = np.floor((series - series.min()) / width)
+            changes[1:] |= bins[1:] != bins[:-1]
+
+    return np.flatnonzero(changes[:len(inputs.horizon)])
+
+
+class AggregatedSolver:
+    """Solves the problem with the power of the heater constant over blocks of time-steps, refining the blocks until
+    the error of the objective is small enough
+
+    The temperature of the house keeps one variable (and one constraint) per time-step, so the schedule of every
+    aggregated problem is a feasible schedule at full resolution, whose cost is an upper bound of the optimum. Duals
+    of the constraints give a lower bound (the Lagrangian bound of the problem at full resolution), and the gap
+    between both splits over the time-steps. The blocks with the largest gaps, where a temperature or power bound
+    binds at some of their time-steps only, are refined to full resolution and the problem is solved again, until the
+    relative gap is at most `max_error`.
+    """
+    def __init__(
+            self,
+            inputs: Inputs,
+            tolerance: float = 0.05,
+            max_error: float = 1e-4,
+            max_iterations: int = 20
+    ) -> None:
+        """Constructor
+
+        Parameters
+        ----------
+        inputs : Inputs
+            inputs of the simulation
+        tolerance : float
+            width of the bins of the cost of electricity and of the ambient temperature grouped in a block, relative
+            to their ranges (no aggregation if 0)
+        max_error : float
+            maximum relative error of the objective
+        max_iterations : int
+            maximum number of refinements
+        """
+        self._inputs = inputs
+        self._tolerance = tolerance
+        self._max_error = max_error
+        self._max_iterations = max_iterations
+        self.statistics: dict = {}
+
+    def __call__(self) -> dict[str, npt.NDArray | float]:
+        """Solves the aggregated problems until the error bound is met
+
+        Returns
+        -------
+        solution : dict[str, npt.NDArray | float]
+            schedules at full resolution, their objective and the bound of its error
+        """
+        problem = SparseSolver(self._inputs)._problem_build()
+        A_eq = problem.A_eq.copy()
+        A_eq.eliminate_zeros()
+        n_steps = len(self._inputs.horizon)
+        starts = self.__split_infeasible_blocks(similar_blocks(self._inputs, self._tolerance))
+        iterations = []
+        while True:
+            solution, duals = self.__solve(problem, starts)
+            lower_bound, gaps = self.__lagrangian_bound(problem, solution, self.__best_duals(problem, A_eq, duals))
+            upper_bound = float(problem.c @ solution)
+            error = max(upper_bound - lower_bound, 0.0)
+            iterations.append(
+                {"Number of blocks": len(starts), "Upper bound": upper_bound, "Lower bound": lower_bound}
+            )
+            max_error = self._max_error * max(abs(upper_bound), 1)
+            if error <= max_error or len(iterations) > self._max_iterations:
+                break
+
+            # Refines the blocks with the largest gaps (over the temperature and the power of their time-steps), until
+            # the gap left is half the error allowed
+            lengths = np.diff(np.append(starts, n_steps))
+            block_gaps = np.add.reduceat(gaps[:n_steps] + gaps[n_steps:], starts) * (lengths > 1)
+            order = np.argsort(-block_gaps)
+            n_refined = min(
+                np.searchsorted(np.cumsum(block_gaps[order]), error - max_error / 2) + 1,
+                np.count_nonzero(block_gaps)
+            )
+            if n_refined == 0:
+                break
+            refined = order[:n_refined]
+            starts = np.unique(np.concatenate(
+                [starts, *(np.arange(starts[block], starts[block] + lengths[block]) for block in refined)]
+            ))
+
+        self.statistics = {
+            "solver": "scipy",
+            "Number of time-steps": n_steps,
+            "Number of blocks": len(starts),
+            "Number of iterations": len(iterations),
+            "Objective upper bound": upper_bound,
+            "Objective lower bound": lower_bound,
+            "Objective error bound": error,
+            "iterations": iterations
+        }
+
+        return {
+            "temperature_house": solution[:n_steps],
+            "power_heater": solution[n_steps:],
+            "objective_function": upper_bound,
+            "objective_error_bound": error
+        }
+
+    def __split_infeasible_blocks(self, starts: npt.NDArray) -> npt.NDArray:
+        """Splits the blocks whose time-steps admit no common power of the heater
+
+        Parameters
+        ----------
+        starts : npt.NDArray
+            first time-step of every block
+
+        Returns
+        -------
+        starts : npt.NDArray
+            first time-step of every block, with a common feasible power in every block
+        """
+        lower, upper = VectorisedSolver(self._inputs)._feasible_power_range()
+        is_infeasible = (
+            np.maximum.reduceat(lower, starts) > np.minimum.reduceat(upper, starts) + VectorisedSolver.tolerance
+        )
+        if not is_infeasible.any():
+            return starts
+
+        stops = np.append(starts[1:], len(lower))
+        splits = []
+        for start, stop in zip(starts[is_infeasible], stops[is_infeasible]):
+            # Greedily extends every new block while its time-steps keep a common feasible power
+            block_lower, block_upper = lower[start], upper[start]
+            for step in range(start + 1, stop):
+                block_lower, block_upper = max(block_lower, lower[step]), min(block_upper, upper[step])
+                if block_lower > block_upper + VectorisedSolver.tolerance:
+                    splits.append(step)
+                    block_lower, block_upper = lower[step], upper[step]
+
+        return np.union1d(starts, splits)
+
+    def __solve(self, problem: SparseProblem, starts: npt.NDArray) -> tuple[npt.NDArray, npt.NDArray]:
+        """Solves the problem with the power constant over every block
+
+        The power of the heater of the time-steps of every block is replaced by one variable: x = E z, where E maps
+        the blocks to their time-steps.
+
+        Parameters
+        ----------
+        problem : SparseProblem
+            problem at full resolution
+        starts : npt.NDArray
+            first time-step of every block
+
+        Returns
+        -------
+        solution, duals : tuple[npt.NDArray, npt.NDArray]
+            solution at full resolution and duals of the constraints
+        """
+        n_steps = len(self._inputs.horizon)
+        block = np.cumsum(np.isin(np.arange(n_steps), starts)) - 1
+        expansion = sps.block_diag(
+            (
+                sps.identity(n_steps, format="csr"),
+                sps.csr_matrix((np.ones(n_steps), (np.arange(n_steps), block)), shape=(n_steps, len(starts)))
+            ),
+            format="csr"
+        )
+        results = sco.linprog(
+            c=expansion.T @ problem.c,
+            A_eq=problem.A_eq @ expansion,
+            b_eq=problem.b_eq,
+            bounds=np.concatenate((problem.bounds[:n_steps], problem.bounds[n_steps + starts])),
+            method="highs"
+        )
+        if results.status != 0:
+            raise SolverError(
+                f"Problem not properly solved.\n"
+                f"Status: {results.status}\n"
+                f"termination condition: {results.message})."
+            )
+
+        return expansion @ results.x, results.eqlin.marginals
+
+    @staticmethod
+    def __best_duals(problem: SparseProblem, A_eq: sps.csr_matrix, duals: npt.NDArray) -> npt.NDArray:
+        """Improves the duals row by row, when every variable is in one constraint at most
+
+        The Lagrangian bound is then a sum of one concave, piecewise-linear function of the dual of every constraint,
+        whose maximum is at the dual of the aggregated problem or at a breakpoint, where the reduced cost of one of
+        the variables of the constraint is zero. Every constraint keeps the candidate with the largest term.
+
+        Parameters
+        ----------
+        problem : SparseProblem
+            problem at full resolution
+        A_eq : sps.csr_matrix
+            matrix of the equality constraints, without explicit zeros
+        duals : npt.NDArray
+            duals of the constraints of the aggregated problem
+
+        Returns
+        -------
+        duals : npt.NDArray
+            duals of the constraints giving a bound at least as tight
+        """
+        by_column = A_eq.tocsc()
+        if np.diff(by_column.indptr).max(initial=0) > 1:
+            return duals
+
+        n_rows = A_eq.shape[0]
+        columns = np.flatnonzero(np.diff(by_column.indptr))
+        rows = np.concatenate((np.arange(n_rows), by_column.indices))
+        candidates = np.concatenate((duals, problem.c[columns] / by_column.data))
+
+        # Term of every candidate: b_i y + sum over the variables of the row of min(r_j l_j, r_j u_j)
+        counts = np.diff(A_eq.indptr)[rows]
+        owner = np.repeat(np.arange(len(rows)), counts)
+        positions = (
+            np.repeat(A_eq.indptr[rows], counts) + np.arange(counts.sum()) -
+            np.repeat(np.cumsum(counts) - counts, counts)
+        )
+        variables = A_eq.indices[positions]
+        reduced_costs = problem.c[variables] - A_eq.data[positions] * candidates[owner]
+        lower, upper = problem.bounds[variables].T
+        with np.errstate(invalid="ignore"):
+            minimum = np.fmin(reduced_costs * lower, reduced_costs * upper)
+        minimum[reduced_costs == 0] = 0
+        terms = problem.b_eq[rows] * candidates + np.bincount(owner, minimum, minlength=len(rows))
+
+        # Candidate with the largest term of every row
+        order = np.lexsort((terms, rows))
+        is_last = np.append(rows[order][1:] != rows[order][:-1], True)
+        best = np.empty(n_rows)
+        best[rows[order][is_last]] = candidates[order][is_last]
+
+        return best
+
+    @staticmethod
+    def __lagrangian_bound(
+            problem: SparseProblem,
+            solution: npt.NDArray,
+            duals: npt.NDArray
+    ) -> tuple[float, npt.NDArray]:
+        """Lower bound of the optimal objective given by duals of the constraints
+
+        min c'x + y'(b - Ax) over the bounds is b'y + sum_j min(r_j l_j, r_j u_j), with r = c - A'y. Since Ax = b,
+        the gap of a feasible solution, c'x minus the bound, is the sum over the variables of r_j x_j - min(r_j l_j,
+        r_j u_j) >= 0.
+
+        Parameters
+        ----------
+        problem : SparseProblem
+            problem at full resolution
+        solution : npt.NDArray
+            feasible solution
+        duals : npt.NDArray
+            duals of the constraints
+
+        Returns
+        -------
+        lower_bound, gaps : tuple[float, npt.NDArray]
+            lower bound of the objective, and gap of every variable
+        """
+        reduced_costs = problem.c - problem.A_eq.T @ duals
+        lower, upper = problem.bounds.T
+        with np.errstate(invalid="ignore"):
+            minimum = np.fmin(reduced_costs * lower, reduced_costs * upper)
+        minimum[reduced_costs == 0] = 0
+        gaps = np.maximum(reduced_costs * solution - minimum, 0)
+
+        return float(problem.b_eq @ duals + minimum.sum()), gaps
+
+
+class AggregatedOptimiser(Optimiser):
+    """Optimises the schedule of the heater over blocks of similar time-steps, refined where bounds bind
+
+    The problem is solved with HiGHS through scipy, whatever the solver. The solution is at full resolution, its
+    objective exceeds the optimum by at most `objective_error_bound`, and the statistics of the solver report the
+    bounds of the optimal objective.
+    """
+    def __init__(self, tolerance: float = 0.05, max_error: float = 1e-4, max_iterations: int = 20) -> None:
+        """Constructor
+
+        Parameters
+        ----------
+        tolerance : float
+            width of the bins of the cost of electricity and of the ambient temperature grouped in a block, relative
+            to their ranges (no aggregation if 0)
+        max_error : float
+            maximum relative error of the objective
+        max_iterations : int
+            maximum number of refinements
+        """
+        super().__init__()
+        self._tolerance = tolerance
+        self._max_error = max_error
+        self._max_iterations = max_iterations
+        self.objective_error_bound: float | None = None
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}(tolerance={self._tolerance}, max_error={self._max_error}, "
+            f"max_iterations={self._max_iterations})"
+        )
+
+    def _backend(self) -> AggregatedSolver:
+        """Solves the aggregated problems with scipy
+
+        Returns
+        -------
+        backend : AggregatedSolver
+            solver of the aggregated problems
+        """
+        self._check_continuous("aggregated optimiser")
+        return AggregatedSolver(self._inputs, self._tolerance, self._max_error, self._max_iterations)
+
+    def run(self) -> None:
+        """Solves the aggregated problems, and keeps the bound of the error of the objective apart from the solution
+        """
+        super().run()
+        self.objective_error_bound = self._solution.pop("objective_error_bound")
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import numpy.typing as npt
+
+from simulate.core import Inputs
+from simulate.core.profiler import NULL_PROFILER, Profiler
+from simulate.core.shared import SharedSeriesStore
+from .optimiser import Optimiser
+
+
+class DecompositionOptimiser(Optimiser):
+    """Splits the horizon into overlapping windows solved concurrently on a pool of processes
+
+    Every window commits a block of time-steps, and is solved with `overlap` extra time-steps on both sides: the ones
+    before warm up the temperature of the house from a guessed initial temperature, the ones after keep the decisions
+    at the end of the block from being myopic. The windows are then reconciled at their boundaries: a window whose
+    temperature before its block differs from the one committed by the previous window is re-solved, starting from
+    the committed temperature, until all the boundaries agree. The committed blocks are stitched into the solution.
+    Every process builds one window at a time, so the memory of the models is bounded by the size of the windows, and
+    the processes read the time series from one copy in shared memory.
+    """
+    def __init__(
+            self,
+            window_size: int = 1440,
+            overlap: int = 96,
+            workers: int | None = None,
+            tolerance: float = 1e-6,
+            dtype: npt.DTypeLike | None = None
+    ) -> None:
+        """Constructor
+
+        Parameters
+        ----------
+        window_size : int
+            number of time-steps committed by every window
+        overlap : int
+            number of time-steps solved before and after the block committed by every window
+        workers : int | None
+            number of processes solving the windows (number of CPUs if None)
+        tolerance : float
+            maximum difference of the temperatures of two consecutive windows at their boundary
+        dtype : npt.DTypeLike | None
+            type of the time series shared with the processes, e.g. np.float32 (unchanged if None)
+        """
+        if window_size < 1 or overlap < 0:
+            raise ValueError(f"Invalid window size {window_size} or overlap {overlap}.")
+        super().__init__()
+        self._window_size = window_size
+        self._overlap = overlap
+        self._workers = workers
+        self._tolerance = tolerance
+        self._dtype = dtype
+        self.statistics: dict = {}
+
+    def __repr__(self) -> str:
+        dtype = "" if self._dtype is None else f", dtype={np.dtype(self._dtype)}"
+
+        return (
+            f"{type(self).__name__}(window_size={self._window_size}, overlap={self._overlap}, "
+            f"tolerance={self._tolerance}{dtype})"
+        )
+
+    def initialise(
+            self,
+            inputs: Inputs,
+            output_path: str,
+            solver: str = "CBC",
+            is_debug: bool = False,
+            model_format: str = "lp",
+            profiler: Profiler = NULL_PROFILER
+    ) -> None:
+        """Initialises the optimiser
+
+        Parameters
+        ----------
+        inputs : Inputs
+            inputs of the simulation
+        output_path : str
+            folder to store the results of the simulation
+        solver : str
+            solver of the windows
+        is_debug : bool
+            flag to run in debug mode
+        model_format : str
+            format of the model to be written in debug mode (lp or mps, gzip-compressed with lp.gz or mps.gz)
+        profiler : Profiler
+            profiler recording the phases of the optimisation and the statistics of the solver
+        """
+        super().initialise(inputs, output_path, solver, is_debug, model_format, profiler)
+        self.statistics = {}
+
+    def run(self) -> None:
+        """Solves the windows, reconciles their boundaries and stitches them
+        """
+        # The minimum up and down times of the modes would not hold across the boundaries of the windows
+        self._check_continuous("decomposition")
+        with self._writing_model():
+            with self._profiler.phase("solve"):
+                temperature_house, power_heater = self.__solve_windows()
+            self._profiler.record_solver(self.statistics)
+
+        self._solution = {
+            "temperature_house": temperature_house,
+            "power_heater": power_heater,
+            "objective_function": float(
+                np.dot(self._inputs.cost_electricity, power_heater) *
+                self._inputs.step_size *
+                self._inputs.conversion_factor
+            )
+        }
+
+    def __solve_windows(self) -> tuple[npt.NDArray, npt.NDArray]:
+        """Solves the windows until the temperatures at their boundaries agree
+
+        Returns
+        -------
+        temperature_house, power_heater : tuple[npt.NDArray, npt.NDArray]
+            committed temperature of the house and power of the heater over the horizon
+        """
+        n_steps = len(self._inputs.horizon)
+        blocks = [(start, min(start + self._window_size, n_steps)) for start in range(0, n_steps, self._window_size)]
+        temperature_house = np.empty(n_steps)
+        power_heater = np.empty(n_steps)
+        # Temperature of every window at the time-step before its block
+        boundaries = np.empty(len(blocks))
+
+        # The first pass starts the windows from the initial temperature, as a guess for all but the first one
+        pending = {
+            window: (max(start - self._overlap - 1, 0), self._inputs.initial_temperature)
+            for window, (start, _) in enumerate(blocks)
+        }
+        n_passes = n_solves = 0
+        with SharedSeriesStore() as store, ProcessPoolExecutor(max_workers=self._workers) as executor:
+            # The windows are views of the shared series, sent to the processes as references to the store
+            inputs = self._inputs.attach(store, self._dtype)
+            while pending:
+                n_passes += 1
+                n_solves += len(pending)
+                futures = {
+                    executor.submit(
+                        solve_window,
+                        inputs.window(first, min(blocks[window][1] + self._overlap, n_steps), temperature),
+                        self._solver
+                    ): (window, first)
+                    for window, (first, temperature) in pending.items()
+                }
+                for future in as_completed(futures):
+                    window, first = futures[future]
+                    start, stop = blocks[window]
+                    window_temperature, window_power = future.result()
+                    temperature_house[start:stop] = window_temperature[start - first:stop - first]
+                    power_heater[start:stop] = window_power[start - first:stop - first]
+                    boundaries[window] = window_temperature[start - first - 1] if start > 0 else np.nan
+
+                pending = {
+                    window: (start - 1, temperature_house[start - 1])
+                    for window, (start, _) in enumerate(blocks)
+                    if start > 0 and abs(boundaries[window] - temperature_house[start - 1]) > self._tolerance
+                }
+
+        self.statistics = {
+            "solver": self._solver,
+            "Number of windows": len(blocks),
+            "Number of passes": n_passes,
+            "Number of window solves": n_solves
+        }
+
+        return temperature_house, power_heater
+
+
+def solve_window(inputs: Inputs, solver: str) -> tuple[npt.NDArray, npt.NDArray]:
+    """Solves the full model of a window (in a worker process)
+
+    Parameters
+    ----------
+    inputs : Inputs
+        inputs of the window
+    solver : str
+        solver name
+
+    Returns
+    -------
+    temperature_house, power_heater : tuple[npt.NDArray, npt.NDArray]
+        temperature of the house and power of the heater over the window
+    """
+    optimiser = Optimiser()
+    optimiser.initialise(inputs=inputs, output_path=None, solver=solver)
+    optimiser.run()
+    if optimiser._solution is not None:
+        # Owned copies: the solution of the matrix solvers may derive from the shared series of the inputs
+        return tuple(
+            np.array(optimiser._solution[variable], dtype=float) for variable in ("temperature_house", "power_heater")
+        )
+
+    return tuple(
+        np.fromiter(
+            (var.value for var in getattr(optimiser._model, variable).values()),
+            dtype=float,
+            count=len(inputs.horizon)
+        )
+        for variable in ("temperature_house", "power_heater")
+    )
@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import math
+
+import numpy as np
+import numpy.typing as npt
+
+from simulate.core import Inputs
+from simulate.core.lazy import lazy_import
+from .vectorised import VectorisedSolver
+
+pyo = lazy_import("pyomo.environ")
+
+
+def minimum_steps(inputs: Inputs) -> tuple[int, int]:
+    """Converts the minimum up and down times of the heater to numbers of time-steps
+
+    Parameters
+    ----------
+    inputs : Inputs
+        inputs of the simulation
+
+    Returns
+    -------
+    up, down : tuple[int, int]
+        minimum numbers of consecutive time-steps on and off (at least 1)
+    """
+    return tuple(
+        max(1, math.ceil(hours / inputs.step_size - 1e-9))
+        for hours in (inputs.minimum_up_time, inputs.minimum_down_time)
+    )
+
+
+def power_levels(inputs: Inputs) -> npt.NDArray:
+    """Sorted power of the operating modes of the heater, which must lie within the power bounds
+
+    Parameters
+    ----------
+    inputs : Inputs
+        inputs of the simulation
+
+    Returns
+    -------
+    levels : npt.NDArray
+        power of every mode, 0 being off
+    """
+    levels = np.unique(np.asarray(inputs.power_levels, dtype=float))
+    power_min, power_max = inputs.power_bounds
+    if len(levels) == 0 or levels[0] < power_min or levels[-1] > power_max:
+        raise ValueError(
+            f"The power levels {levels.tolist()} must lie within the power bounds {inputs.power_bounds}."
+        )
+
+    return levels
+
+
+class DiscreteOperation:
+    """Defines the operating modes of the heater and its minimum up and down times
+
+    At every time-step, the heater runs in exactly one mode, whose power is one of the power levels (a level of 0
+    is off). Once started (from off to any other mode), it stays on for the minimum up time, and once stopped it
+    stays off for the minimum down time. The state before the horizon is unknown, so the first run is not
+    constrained.
+    """
+    def __init__(self, model, inputs) -> None:
+        """Constructor
+        """
+        self._model = model
+        self._inputs = inputs
+        self._levels = power_levels(inputs)
+        self._up, self._down = minimum_steps(inputs)
+
+    def create_sets_variables(self) -> None:
+        """Creates the modes, the binary variables of the modes, and the start-ups and shut-downs of the heater
+        """
+        self._model.modes = pyo.Set(initialize=range(len(self._levels)))
+        self._model.heater_mode = pyo.Var(self._model.horizon, self._model.modes, within=pyo.Binary)
+        # Integral as soon as the modes are, they do not need to be binary
+        self._model.startup = pyo.Var(self._model.horizon, bounds=(0, 1))
+        self._model.shutdown = pyo.Var(self._model.horizon, bounds=(0, 1))
+
+    def __call__(self) -> None:
+        self._model.heater_mode_eqn = pyo.Constraint(self._model.horizon, rule=self.__one_mode)
+        self._model.power_heater_mode_eqn = pyo.Constraint(self._model.horizon, rule=self.__power_heater)
+        self._model.switch_eqn = pyo.Constraint(self._model.horizon, rule=self.__switch)
+        if self._up > 1:
+            self._model.minimum_up_time_eqn = pyo.Constraint(self._model.horizon, rule=self.__minimum_up_time)
+        if self._down > 1:
+            self._model.minimum_down_time_eqn = pyo.Constraint(self._model.horizon, rule=self.__minimum_down_time)
+
+    def __is_on(self, model: pyo.Model, t: int) -> pyo.Expression:
+        """Expression equal to 1 if the heater is on at time-step t, 0 otherwise
+        """
+        return pyo.quicksum(model.heater_mode[t, m] for m in model.modes if self._levels[m] > 0)
+
+    def __one_mode(self, model: pyo.Model, t: pyo.Set) -> pyo.Constraint:
+        """Runs the heater in exactly one mode
+        """
+        return pyo.quicksum(model.heater_mode[t, m] for m in model.modes) == 1
+
+    def __power_heater(self, model: pyo.Model, t: pyo.Set) -> pyo.Constraint:
+        """Sets the power of the heater to the level of its mode
+        """
+        return model.power_heater[t] == pyo.quicksum(
+            float(self._levels[m]) * model.heater_mode[t, m] for m in model.modes
+        )
+
+    def __switch(self, model: pyo.Model, t: pyo.Set) -> pyo.Constraint:
+        """Counts the start-ups and shut-downs of the heater
+        """
+        if t == 0:
+            return pyo.Constraint.Skip
+        return model.startup[t] - model.shutdown[t] == self.__is_on(model, t) - self.__is_on(model, t - 1)
+
+    def __minimum_up_time(self, model: pyo.Model, t: pyo.Set) -> pyo.Constraint:
+        """Keeps the heater on if it started less than the minimum up time ago
+        """
+        if t == 0:
+            return pyo.Constraint.Skip
+        startups = pyo.quicksum(model.startup[s] for s in range(max(1, t - self._up + 1), t + 1))
+
+        return startups <= self.__is_on(model, t)
+
+    def __minimum_down_time(self, model: pyo.Model, t: pyo.Set) -> pyo.Constraint:
+        """Keeps the heater off if it stopped less than the minimum down time ago
+        """
+        if t == 0:
+            return pyo.Constraint.Skip
+        return (
+            pyo.quicksum(model.shutdown[s] for s in range(max(1, t - self._down + 1), t + 1)) <=
+            1 - self.__is_on(model, t)
+        )
+
+
+class RoundingHeuristic:
+    """Finds a feasible schedule of the discrete heater quickly, to warm-start the MILP or to fall back on
+
+    The continuous relaxation of the operating modes (any power between the bounds) is solved in closed form, its
+    power is rounded to the nearest level feasible at every time-step, and the schedule is then repaired forwards: a
+    start-up or shut-down is only kept if the heater can stay in its new state for the minimum up or down time,
+    otherwise the heater stays in its previous state, in its cheapest feasible mode. The relaxation also gives a lower
+    bound of the optimum.
+    """
+    def __init__(self, inputs: Inputs) -> None:
+        """Constructor
+
+        Parameters
+        ----------
+        inputs : Inputs
+            inputs of the simulation
+        """
+        self._inputs = inputs
+        self.lower_bound: float | None = None
+        self.statistics: dict = {}
+
+    def __call__(self) -> dict[str, npt.NDArray | float] | None:
+        """Builds the schedule
+
+        Returns
+        -------
+        solution : dict[str, npt.NDArray | float] | None
+            temperature of the house, power of the heater, mode at every time-step and cost, or None if the repair
+            failed
+        """
+        inputs = self._inputs
+        levels = power_levels(inputs)
+        up, down = minimum_steps(inputs)
+        lower, upper = VectorisedSolver(inputs)._feasible_power_range()
+        cost = inputs.cost_electricity
+        scale = inputs.step_size * inputs.conversion_factor
+        relaxed = np.where(cost >= 0, lower, upper)
+        self.lower_bound = float(np.dot(cost, relaxed) * scale) if (lower <= upper).all() else None
+
+        tolerance = VectorisedSolver.tolerance
+        # Modes feasible at every time-step, and the rounded mode of the relaxation (-1 where no mode is feasible)
+        feasible = (levels >= lower[:, None] - tolerance) & (levels <= upper[:, None] + tolerance)
+        distance = np.where(feasible, np.abs(levels - relaxed[:, None]), np.inf)
+        rounded = np.where(feasible.any(axis=1), distance.argmin(axis=1), -1)
+        is_on_level = levels > 0
+        on = feasible & is_on_level
+        off = feasible & ~is_on_level
+        # Cheapest feasible mode in each state (the lowest level if the cost is non-negative, otherwise the highest)
+        cheapest_on = np.where(cost >= 0, on.argmax(axis=1), len(levels) - 1 - on[:, ::-1].argmax(axis=1))
+        cheapest_off = off.argmax(axis=1)
+
+        n_steps = len(inputs.horizon)
+        modes = np.empty(n_steps, dtype=int)
+        temperature_min, temperature_max = inputs.temperature_bounds
+        if rounded[0] < 0 or not (
+                temperature_min - tolerance <= inputs.initial_temperature <= temperature_max + tolerance
+        ):
+            return self.__failed(0)
+        modes[0] = rounded[0]
+        locked_until = 0
+        for t in range(1, n_steps):
+            was_on = is_on_level[modes[t - 1]]
+            wants_on = is_on_level[rounded[t]] if rounded[t] >= 0 else not was_on
+            is_on = was_on
+            if t >= locked_until and wants_on != was_on:
+                duration = up if wants_on else down
+                window = (on if wants_on else off)[t:t + duration]
+                if window.any(axis=1).all():
+                    is_on, locked_until = wants_on, t + duration
+            state = on if is_on else off
+            if not state[t].any():
+                return self.__failed(t)
+            is_rounded_kept = rounded[t] >= 0 and is_on_level[rounded[t]] == is_on
+            modes[t] = rounded[t] if is_rounded_kept else (cheapest_on[t] if is_on else cheapest_off[t])
+
+        power_heater = levels[modes]
+        temperature_house = inputs.temperature_ambient + inputs.coefficient_heat_div_cool * power_heater
+        temperature_house[0] = inputs.initial_temperature
+        objective = float(np.dot(cost, power_heater) * scale)
+        self.statistics = {
+            "Heuristic objective": objective,
+            "Relaxation bound": self.lower_bound,
+            "Rounded time-steps changed by the repair": int((modes != rounded).sum())
+        }
+
+        return {
+            "temperature_house": temperature_house,
+            "power_heater": power_heater,
+            "heater_mode": modes,
+            "objective_function": objective
+        }
+
+    def __failed(self, step: int) -> None:
+        """Records the time-step where the repair failed
+
+        Parameters
+        ----------
+        step : int
+            time-step without feasible mode
+        """
+        self.statistics = {"Relaxation bound": self.lower_bound, "Heuristic failed at time-step": step}
+
+
+def warm_start(model: pyo.Model, inputs: Inputs, solution: dict[str, npt.NDArray | float]) -> None:
+    """Sets the values of the variables of a discrete model to a schedule of RoundingHeuristic
+
+    Parameters
+    ----------
+    model : pyo.Model
+        pyomo model with discrete operation
+    inputs : Inputs
+        inputs of the simulation
+    solution : dict[str, npt.NDArray | float]
+        schedule of the heuristic
+    """
+    modes = solution["heater_mode"]
+    is_on = (power_levels(inputs)[modes] > 0).astype(int)
+    switches = np.diff(is_on, prepend=is_on[0])
+    for t in model.horizon:
+        model.temperature_house[t].set_value(float(solution["temperature_house"][t]))
+        model.power_heater[t].set_value(float(solution["power_heater"][t]))
+        model.startup[t].set_value(max(int(switches[t]), 0))
+        model.shutdown[t].set_value(max(-int(switches[t]), 0))
+        for m in model.modes:
+            model.heater_mode[t, m].set_value(int(modes[t] == m))
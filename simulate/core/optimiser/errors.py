@@ -0,0 +1,12 @@
+class SolverError(Exception):
+    """Custom error that is raised if the solver does not find an optimal solution
+    """
+
+    def __init__(self, message: str) -> None:
+        """
+        Parameters
+        ----------
+        message : str
+            Message to be given to the error.
+        """
+        super().__init__(message)
@@ -1,5 +1,10 @@
+from __future__ import annotations
+
 import numpy as np
-import pyomo.environ as pyo
+
+from simulate.core.lazy import lazy_import
+
+pyo = lazy_import("pyomo.environ")
 
 
 class ObjectiveFunction:
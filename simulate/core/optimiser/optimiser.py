@@ -1,37 +1,93 @@
+from __future__ import annotations
+
+import numpy as np
+import numpy.typing as npt
+import gzip
+import math
+import os
 import os.path as osp
-import pyomo.environ as pyo
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Iterator
 
 from simulate.core import Inputs
+from simulate.core.lazy import lazy_import
+from simulate.core.profiler import NULL_PROFILER, Profiler
 from . import ObjectiveFunction, Constraints
+from .discrete import DiscreteOperation, RoundingHeuristic, warm_start
+from .errors import SolverError
+from .portfolio import SolverPortfolio, portfolio_solvers
+from .sparse import SparseSolver
+from .vectorised import VectorisedSolver
+from .writer import ModelWriter
 
-
-class SolverError(Exception):
-    """Custom error that is raised if the solver does not find an optimal solution
-    """
-
-    def __init__(self, message: str) -> None:
-        """
-        Parameters
-        ----------
-        message : str
-            Message to be given to the error.
-        """
-        super().__init__(message)
+pyo = lazy_import("pyomo.environ")
 
 
 class Optimiser:
     """Builds the mathematical program
     """
-    def __init__(self) -> None:
+    # Solvers that bypass pyomo and return the solution directly
+    _matrix_solvers = {
+        "numpy": VectorisedSolver,
+        "scipy": SparseSolver
+    }
+    binding_tolerance: float = 1e-7
+    # Names of the time limit (in seconds) and relative MIP gap options of every solver
+    _option_names = {
+        "cbc": ("seconds", "ratioGap"),
+        "glpk": ("tmlim", "mipgap"),
+        "appsi_highs": ("time_limit", "mip_rel_gap"),
+        "highs": ("time_limit", "mip_rel_gap"),
+        "gurobi": ("TimeLimit", "MIPGap"),
+        "gurobi_direct": ("TimeLimit", "MIPGap"),
+        "gurobi_persistent": ("TimeLimit", "MIPGap"),
+        "cplex": ("timelimit", "mip_tolerances_mipgap"),
+        "cplex_direct": ("timelimit", "mip_tolerances_mipgap"),
+        "scip": ("limits/time", "limits/gap")
+    }
+
+    def __init__(
+            self, time_limit: float | None = None, mip_gap: float | None = None, portfolio_log: str | None = None
+    ) -> None:
         """Constructor
+
+        Parameters
+        ----------
+        time_limit : float | None
+            time limit of the solver in seconds (none if None), after which the best feasible solution is kept
+        mip_gap : float | None
+            relative gap between the solution and the bound at which the solver stops (its default if None)
+        portfolio_log : str | None
+            JSON-lines file where to append the outcome of the races of a portfolio of solvers (not logged if None)
         """
 
+        self._time_limit = time_limit
+        self._mip_gap = mip_gap
+        self._portfolio_log = portfolio_log
         self._inputs: Inputs = None
         self._output_path: str = None
         self._solver: str = None
         self._is_debug: bool = None
         self._model_format: str = None
         self._model: pyo.Model = None
+        self._solution: dict[str, npt.NDArray | float] = None
+        self._profiler: Profiler = NULL_PROFILER
+        # Sensitivities of the optimal solution, empty if the solver does not report them
+        self.duals: dict[str, npt.NDArray] = {}
+        self.reduced_costs: dict[str, npt.NDArray] = {}
+        self.binding: dict[str, npt.NDArray] = {}
+        # Relative gap of the solution of a discrete model, None for continuous models
+        self.relative_gap: float | None = None
+
+    def __repr__(self) -> str:
+        options = ", ".join(
+            f"{name}={value}" for name, value in (("time_limit", self._time_limit), ("mip_gap", self._mip_gap))
+            if value is not None
+        )
+
+        return f"{type(self).__name__}({options})"
 
     def initialise(
             self,
@@ -39,7 +95,8 @@ class Optimiser:
             output_path: str,
             solver: str = "CBC",
             is_debug: bool = False,
-            model_format: str = "lp"
+            model_format: str = "lp",
+            profiler: Profiler = NULL_PROFILER
     ) -> None:
         """Initialises the optimiser
 
@@ -50,23 +107,65 @@ class Optimiser:
         output_path : str
             folder to store the results of the simulation
         solver : str
-            solver to perform the matrix multiplication
+            solver to perform the matrix multiplication ("numpy" or "scipy" solve the problem without pyomo, and
+            "portfolio" or comma-separated solver names race several solvers)
         is_debug : bool
             flag to run in debug mode
         model_format : str
-            format of the model to be written (lp or mps)
+            format of the model to be written in debug mode (lp or mps, gzip-compressed with lp.gz or mps.gz)
+        profiler : Profiler
+            profiler recording the phases of the optimisation and the statistics of the solver
         """
         self._inputs: Inputs = inputs
         self._output_path = output_path
         self._solver = solver
         self._is_debug = is_debug
         self._model_format = model_format
+        self._model = None
+        self._solution = None
+        self._profiler = profiler
+        self.duals, self.reduced_costs, self.binding = {}, {}, {}
+        self.relative_gap = None
 
     def run(self) -> None:
         """Runs the optimisation
         """
-        model = self._problem_build()
-        self._problem_solve(model)
+        with self._writing_model():
+            backend = self._backend()
+            if backend is not None:
+                with self._profiler.phase("solve"):
+                    self._solution = backend()
+                self._profiler.record_solver(backend.statistics)
+                self.duals = getattr(backend, "duals", {})
+                self.reduced_costs = getattr(backend, "reduced_costs", {})
+                self.binding = self._binding_status(self._solution)
+                self.relative_gap = getattr(backend, "relative_gap", None)
+                return
+
+            model = self._problem_build()
+            self._problem_solve(model)
+
+    def _backend(self) -> VectorisedSolver | SparseSolver | SolverPortfolio | None:
+        """Backend solving the problem without a pyomo model in this process
+
+        Returns
+        -------
+        backend : VectorisedSolver | SparseSolver | SolverPortfolio | None
+            matrix solver, portfolio of solvers raced in parallel ("portfolio" or comma-separated solver names), or
+            None to build and solve the pyomo model
+        """
+        if self._solver in self._matrix_solvers:
+            self._check_continuous(f"{self._solver} solver")
+            return self._matrix_solvers[self._solver](self._inputs)
+        solvers = portfolio_solvers(self._solver)
+        if solvers is None:
+            return None
+        if not solvers:
+            raise SolverError("No solver of the portfolio is installed.")
+
+        return SolverPortfolio(
+            self._inputs, solvers, log_path=self._portfolio_log, time_limit=self._time_limit, mip_gap=self._mip_gap
+        )
 
     def _problem_build(self) -> pyo.Model:
         """Builds the optimisation problem
@@ -76,14 +175,31 @@ class Optimiser:
         model : pyo.Model
             pyomo model with sets, variables, and equations built
         """
-        self._create_model()
-        self._create_sets_variables_parameters()
-        self._create_equations()
-        if self._is_debug:
-            self._create_lp_mps(self._output_path, self._model_format)
+        with self._profiler.phase("build"):
+            self._create_model()
+            self._create_sets_variables_parameters()
+            self._create_equations()
+            self._create_suffixes()
 
         return self._model
 
+    @property
+    def _is_discrete(self) -> bool:
+        """Whether the heater runs in discrete modes, which makes the problem a MILP
+        """
+        return self._inputs.power_levels is not None
+
+    def _check_continuous(self, method: str) -> None:
+        """Raises SolverError if the heater runs in discrete modes, which the method cannot solve
+
+        Parameters
+        ----------
+        method : str
+            name of the method in the error message
+        """
+        if self._is_discrete:
+            raise SolverError(f"The {method} cannot solve the discrete modes of the heater.")
+
     def _create_model(self) -> None:
         """Creates a pyomo model
         """
@@ -102,12 +218,25 @@ class Optimiser:
         self._model.power_heater = pyo.Var(
             self._model.horizon, within=pyo.Reals, bounds=self.__bounds_power_heater
         )
+        if self._is_discrete:
+            DiscreteOperation(self._model, self._inputs).create_sets_variables()
 
     def _create_equations(self) -> None:
         """Creates (calls) the constraints and objective of the problem
         """
         ObjectiveFunction(self._model, self._inputs)()
         Constraints(self._model, self._inputs)()
+        if self._is_discrete:
+            DiscreteOperation(self._model, self._inputs)()
+
+    def _create_suffixes(self) -> None:
+        """Creates the suffixes importing the duals of the constraints and the reduced costs of the variables (only
+        for continuous models, MILPs have none)
+        """
+        if self._is_discrete:
+            return
+        self._model.dual = pyo.Suffix(direction=pyo.Suffix.IMPORT)
+        self._model.rc = pyo.Suffix(direction=pyo.Suffix.IMPORT)
 
     def _problem_solve(self, model: pyo.Model) -> None:
         """Solves the problem
@@ -117,32 +246,252 @@ class Optimiser:
         model : pyo.Model
             pyomo model with sets, variables, and equations built
         """
-        opt = pyo.SolverFactory(self._solver)
-        results = opt.solve(model, tee=self._is_debug, keepfiles=False)
-        self.__check_solve_status(results)
+        if self._is_discrete:
+            self._discrete_problem_solve(model)
+            return
+
+        with self._profiler.phase("solve"):
+            opt = pyo.SolverFactory(self._solver)
+            results = opt.solve(model, tee=self._is_debug, keepfiles=False, options=self._solver_options())
+        self._profiler.record_solver(self._solver_statistics(results))
+        self._check_solve_status(results)
+        self._read_sensitivities(model)
+
+    def _discrete_problem_solve(self, model: pyo.Model) -> None:
+        """Solves the MILP, warm-started with the schedule of RoundingHeuristic
+
+        A solve stopped by the time limit keeps the best solution found by the solver, or the schedule of the
+        heuristic if the solver found none, and the relative gap of the kept solution is reported in relative_gap.
+
+        Parameters
+        ----------
+        model : pyo.Model
+            pyomo model with sets, variables, and equations built
+        """
+        with self._profiler.phase("heuristic"):
+            heuristic = RoundingHeuristic(self._inputs)
+            schedule = heuristic()
+            if schedule is not None:
+                warm_start(model, self._inputs, schedule)
+
+        with self._profiler.phase("solve"):
+            opt = pyo.SolverFactory(self._solver)
+            # The legacy interface of the appsi solvers has no warm_start_capable
+            is_warm_started = schedule is not None and getattr(opt, "warm_start_capable", lambda: False)()
+            kwargs = {"warmstart": True} if is_warm_started else {}
+            # The solution is only loaded after the status check, so a solve stopped without solution keeps the
+            # values of the heuristic
+            results = opt.solve(
+                model, tee=self._is_debug, keepfiles=False, load_solutions=False, options=self._solver_options(),
+                **kwargs
+            )
+        upper_bound = getattr(results.problem, "upper_bound", None)
+        lower_bound = getattr(results.problem, "lower_bound", None)
+        is_solved = results.solver.termination_condition in {
+            pyo.TerminationCondition.optimal,
+            pyo.TerminationCondition.feasible
+        }
+        # A solve stopped by a limit only has a solution if it reports a finite incumbent
+        has_solution = len(results.solution) > 0 and (
+            is_solved or upper_bound is not None and math.isfinite(upper_bound)
+        )
+        self._check_solve_status(results, has_solution or schedule is not None)
+        if has_solution:
+            model.solutions.load_from(results)
+            upper_bound = float(pyo.value(model.objective_eqn))
+        elif schedule is not None:
+            upper_bound = schedule["objective_function"]
+        else:
+            raise SolverError(
+                f"Problem not properly solved.\n"
+                f"Status: {results.solver.termination_condition}\n"
+                f"Neither the solver nor the heuristic found a solution."
+            )
+        bounds = [
+            bound for bound in (lower_bound, heuristic.lower_bound) if bound is not None and math.isfinite(bound)
+        ]
+        lower_bound = max(bounds) if bounds else -math.inf
+        self.relative_gap = max(upper_bound - lower_bound, 0.0) / max(abs(upper_bound), 1e-10)
+        self._profiler.record_solver({
+            **self._solver_statistics(results),
+            **heuristic.statistics,
+            "Warm start": is_warm_started,
+            "Solution": "solver" if has_solution else "heuristic",
+            "Relative gap": self.relative_gap
+        })
+        self._read_sensitivities(model)
+
+    def _solver_options(self) -> dict:
+        """Translates the time limit and the MIP gap into the options of the solver
+
+        Returns
+        -------
+        options : dict
+            options of the solver
+        """
+        if self._time_limit is None and self._mip_gap is None:
+            return {}
+        if self._solver.lower() not in self._option_names:
+            raise SolverError(f"Time limits and MIP gaps are not supported with the {self._solver} solver.")
+        time_limit, mip_gap = self._option_names[self._solver.lower()]
+
+        return {
+            name: value for name, value in ((time_limit, self._time_limit), (mip_gap, self._mip_gap))
+            if value is not None
+        }
+
+    def _read_sensitivities(self, model: pyo.Model) -> None:
+        """Reads the duals of temperature_house_eqn, the reduced costs and the binding bounds of the variables
+
+        The duals are the derivatives of the objective with respect to the right-hand sides of the constraints (the
+        ambient temperature, and the initial temperature at the first time-step). Values the solver does not report
+        are NaN.
+
+        Parameters
+        ----------
+        model : pyo.Model
+            solved pyomo model
+        """
+        n_steps = len(self._inputs.horizon)
+
+        def read(values) -> npt.NDArray:
+            return np.fromiter(values, dtype=float, count=n_steps)
+
+        variables = ("temperature_house", "power_heater")
+        if hasattr(model, "dual"):
+            self.duals = {
+                "temperature_house_eqn": read(
+                    model.dual.get(con, np.nan) for con in model.temperature_house_eqn.values()
+                )
+            }
+            self.reduced_costs = {
+                variable: read(model.rc.get(var, np.nan) for var in getattr(model, variable).values())
+                for variable in variables
+            }
+        self.binding = self._binding_status(
+            {variable: read(var.value for var in getattr(model, variable).values()) for variable in variables}
+        )
+
+    def _binding_status(self, solution: dict[str, npt.NDArray | float]) -> dict[str, npt.NDArray]:
+        """Finds the variables at their bounds
+
+        Parameters
+        ----------
+        solution : dict[str, npt.NDArray | float]
+            values of the variables
+
+        Returns
+        -------
+        binding : dict[str, npt.NDArray]
+            -1 where the variable is at its lower bound, 1 at its upper bound and 0 in between
+        """
+        bounds = {"temperature_house": self._inputs.temperature_bounds, "power_heater": self._inputs.power_bounds}
+        binding = {}
+        for variable, (lower, upper) in bounds.items():
+            values = np.asarray(solution[variable])
+            binding[variable] = np.select(
+                [
+                    values <= lower + self.binding_tolerance * max(1.0, abs(lower)),
+                    values >= upper - self.binding_tolerance * max(1.0, abs(upper))
+                ],
+                [-1, 1],
+                0
+            )
+
+        return binding
+
+    @contextmanager
+    def _writing_model(self) -> Iterator[None]:
+        """Writes the model in a background thread, in debug mode, while the body of the context builds and solves it
+
+        The write only overlaps with the parts of the body that release the GIL (external solvers, not the pyomo
+        build), and the "write" phase of the profiler records the time spent waiting for the file after the solve.
+        """
+        if not self._is_debug or self._output_path is None:
+            yield
+            return
+        if self._is_discrete:
+            # The matrices of the problem have no integer variables, the pyomo model is written once built
+            yield
+            with self._profiler.phase("write"):
+                self.__write_pyomo_model(osp.join(self._output_path, f"model.{self._model_format or 'lp'}"))
+            return
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-writer") as executor:
+            writing = executor.submit(self._create_lp_mps, self._output_path, self._model_format or "lp")
+            yield
+            with self._profiler.phase("write"):
+                writing.result()
 
     def _create_lp_mps(self, output_path: str, model_format: str) -> None:
-        """Creates lp file with the model for debugging purposes
+        """Creates lp or mps file with the model for debugging purposes
+
+        The file is streamed from the coefficient arrays of the problem, without going through pyomo. It is the
+        reference LP of the whole horizon: optimisers solving other models (windows of the horizon, aggregated
+        time-steps) write this reference unless they override this method.
 
         Parameters
         ----------
         output_path : str
             output path to write the lp file
         model_format : str
-            model format (lp or mps)
+            model format (lp or mps, gzip-compressed with lp.gz or mps.gz)
+        """
+        problem = SparseSolver(self._inputs)._problem_build()
+        ModelWriter(problem)(osp.join(output_path, f"model.{model_format}"), model_format)
+
+    def __write_pyomo_model(self, path: str) -> None:
+        """Writes the pyomo model (gzip-compressed if the path ends with .gz)
+
+        Parameters
+        ----------
+        path : str
+            path to the lp or mps file
         """
-        self._model.write(osp.join(output_path, f"model.{model_format}"), io_options={'symbolic_solver_labels': True})
+        is_compressed = path.endswith(".gz")
+        uncompressed_path = path[:-3] if is_compressed else path
+        self._model.write(uncompressed_path, io_options={"symbolic_solver_labels": True})
+        if is_compressed:
+            with open(uncompressed_path, "rb") as model_file, gzip.open(path, "wb") as compressed_file:
+                shutil.copyfileobj(model_file, compressed_file)
+            os.remove(uncompressed_path)
+
+    def _solver_statistics(self, results) -> dict:
+        """Collects the statistics reported by the solver (status, termination condition, times, iterations ...)
+
+        Parameters
+        ----------
+        results
+            results of the optimisation
+
+        Returns
+        -------
+        statistics : dict
+            statistics of the solve
+        """
+        repn = results.json_repn()
+
+        return {"solver": self._solver, **repn.get("Solver", [{}])[0], "problem": repn.get("Problem", [{}])[0]}
 
     @staticmethod
-    def __check_solve_status(results) -> None:
+    def _check_solve_status(results, has_feasible_solution: bool = False) -> None:
         """Checks the solver status
 
+        A solve stopped by its time (or iteration) limit is accepted if a feasible solution is available.
+
         Parameters
         ----------
         results
             results of the optimisation
+        has_feasible_solution : bool
+            flag of a feasible solution found by the solver or a heuristic
         """
-        if (results.solver.status != pyo.SolverStatus.ok
+        is_limited = has_feasible_solution and results.solver.termination_condition in {
+            pyo.TerminationCondition.maxTimeLimit,
+            pyo.TerminationCondition.maxIterations
+        }
+        if not is_limited and (
+                results.solver.status != pyo.SolverStatus.ok
                 or results.solver.termination_condition not in {
                     pyo.TerminationCondition.optimal,
                     pyo.TerminationCondition.feasible
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import os.path as osp
+import queue
+import signal
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import numpy.typing as npt
+
+from simulate.core import Inputs
+from simulate.core.lazy import lazy_import
+from simulate.core.profiler import Profiler
+from .errors import SolverError
+
+pyo = lazy_import("pyomo.environ")
+
+# Solvers raced by the "portfolio" solver name, when they are installed
+PORTFOLIO_SOLVERS = ("cbc", "glpk", "appsi_highs", "cplex", "gurobi")
+
+
+class SolverPortfolio:
+    """Races several solvers on the same problem in parallel processes, and keeps the first accepted solution
+
+    Every solver builds and solves the problem in its own process (and process group, so that the executables launched
+    by pyomo are killed along with it). The first solution that passes the status check of the optimiser wins, and
+    the other solvers are killed. The outcome of every race (features of the instance, winner and time of every
+    solver) can be appended to a JSON-lines log, to choose the default solvers of classes of instances.
+    """
+    def __init__(
+            self,
+            inputs: Inputs,
+            solvers: list[str],
+            log_path: str | None = None,
+            time_limit: float | None = None,
+            mip_gap: float | None = None
+    ) -> None:
+        """Constructor
+
+        Parameters
+        ----------
+        inputs : Inputs
+            inputs of the simulation
+        solvers : list[str]
+            names of the solvers to race (any solver of the optimiser, matrix solvers included)
+        log_path : str | None
+            JSON-lines file where to append the outcome of the race (not logged if None)
+        time_limit : float | None
+            time limit of every solver in seconds (none if None)
+        mip_gap : float | None
+            relative gap at which every solver of discrete modes stops (its default if None)
+        """
+        self._inputs = inputs
+        self._solvers = solvers
+        self._log_path = log_path
+        self._time_limit = time_limit
+        self._mip_gap = mip_gap
+        self.statistics: dict = {}
+        # Relative gap of the winning solution of a discrete model
+        self.relative_gap: float | None = None
+
+    def __call__(self) -> dict[str, npt.NDArray | float]:
+        """Races the solvers
+
+        Returns
+        -------
+        solution : dict[str, npt.NDArray | float]
+            optimal values of the variables and of the objective function, found by the fastest solver
+        """
+        context = multiprocessing.get_context()
+        results = context.Queue()
+        racers = {
+            solver: context.Process(
+                target=race_solver, args=(self._inputs, solver, results, self._time_limit, self._mip_gap), daemon=True
+            )
+            for solver in self._solvers
+        }
+        start = time.perf_counter()
+        for racer in racers.values():
+            racer.start()
+
+        winner, solution, outcomes = None, None, {}
+        try:
+            while winner is None and len(outcomes) < len(racers):
+                # A racer reports before exiting, so the ones already dead with nothing left to read were killed
+                dead = [solver for solver, racer in racers.items() if solver not in outcomes and not racer.is_alive()]
+                try:
+                    solver, status, payload = results.get(timeout=0.1)
+                except queue.Empty:
+                    for solver in dead:
+                        outcomes[solver] = {"status": f"exited with code {racers[solver].exitcode}"}
+                    continue
+                outcomes[solver] = {"status": status, "wall_time": time.perf_counter() - start}
+                if status == "ok":
+                    winner, solution = solver, payload
+                else:
+                    outcomes[solver]["error"] = payload
+        finally:
+            for racer in racers.values():
+                self.__kill(racer)
+
+        self.statistics = {
+            "solver": ",".join(self._solvers),
+            "winner": winner,
+            "Wall time": time.perf_counter() - start,
+            **(solution.pop("statistics") if solution is not None else {}),
+            "racers": {solver: outcomes.get(solver, {"status": "killed"}) for solver in self._solvers}
+        }
+        self.__log()
+        if solution is None:
+            raise SolverError(
+                "Problem not properly solved by any solver of the portfolio.\n" + "\n".join(
+                    f"{solver}: {outcome.get('error', outcome['status'])}" for solver, outcome in outcomes.items()
+                )
+            )
+        self.relative_gap = solution.pop("relative_gap")
+
+        return solution
+
+    @staticmethod
+    def __kill(racer: multiprocessing.Process) -> None:
+        """Kills a racer and the processes it launched
+
+        Parameters
+        ----------
+        racer : multiprocessing.Process
+            process of a solver
+        """
+        if racer.is_alive():
+            try:
+                os.killpg(racer.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                racer.kill()
+        racer.join()
+
+    def __log(self) -> None:
+        """Appends the outcome of the race to the log
+        """
+        if self._log_path is None:
+            return
+
+        record = {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "n_steps": len(self._inputs.horizon),
+            "step_size": self._inputs.step_size,
+            "temperature_bounds": list(self._inputs.temperature_bounds),
+            "power_bounds": list(self._inputs.power_bounds),
+            "winner": self.statistics["winner"],
+            "racers": self.statistics["racers"]
+        }
+        # The log is best-effort: a race is not failed by a log that cannot be written
+        try:
+            os.makedirs(osp.dirname(self._log_path) or ".", exist_ok=True)
+            with open(self._log_path, "a") as log_file:
+                log_file.write(json.dumps(record, default=str) + "\n")
+        except OSError:
+            pass
+
+
+def portfolio_solvers(solver: str) -> list[str] | None:
+    """Solvers raced by a solver name: "portfolio" for all the installed ones, or a comma-separated list
+
+    Parameters
+    ----------
+    solver : str
+        solver name
+
+    Returns
+    -------
+    solvers : list[str] | None
+        solvers to race (None if the name is a single solver)
+    """
+    if solver == "portfolio":
+        return [name for name in PORTFOLIO_SOLVERS if pyo.SolverFactory(name).available(exception_flag=False)]
+    if "," in solver:
+        return [name.strip() for name in solver.split(",") if name.strip()]
+
+    return None
+
+
+def race_solver(
+        inputs: Inputs,
+        solver: str,
+        results: multiprocessing.Queue,
+        time_limit: float | None = None,
+        mip_gap: float | None = None
+) -> None:
+    """Solves the problem with one solver of the portfolio (in its own process) and reports the outcome
+
+    Parameters
+    ----------
+    inputs : Inputs
+        inputs of the simulation
+    solver : str
+        solver name
+    results : multiprocessing.Queue
+        queue receiving the solver name, the status ("ok" or "error") and the solution or the error
+    time_limit : float | None
+        time limit of the solver in seconds (none if None)
+    mip_gap : float | None
+        relative gap at which the solver of discrete modes stops (its default if None)
+    """
+    from .optimiser import Optimiser
+
+    os.setsid()
+    try:
+        optimiser = Optimiser(time_limit=time_limit, mip_gap=mip_gap)
+        profiler = Profiler(is_enabled=True)
+        optimiser.initialise(inputs=inputs, output_path=None, solver=solver, profiler=profiler)
+        optimiser.run()
+        if optimiser._solution is not None:
+            solution = dict(optimiser._solution)
+        else:
+            model = optimiser._model
+            solution = {
+                variable: np.fromiter(
+                    (var.value for var in getattr(model, variable).values()), dtype=float, count=len(inputs.horizon)
+                )
+                for variable in ("temperature_house", "power_heater")
+            }
+            solution["objective_function"] = float(pyo.value(model.objective_eqn))
+        solution["relative_gap"] = optimiser.relative_gap
+        solution["statistics"] = {key: val for key, val in profiler.solver.items() if key not in ("solver", "solves")}
+        results.put((solver, "ok", solution))
+    except Exception as error:
+        results.put((solver, "error", f"{type(error).__name__}: {' '.join(str(error).split())}"))
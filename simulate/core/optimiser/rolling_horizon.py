@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import time
+
+import numpy as np
+import numpy.typing as npt
+
+from simulate.core import Inputs
+from simulate.core.lazy import lazy_import
+from simulate.core.profiler import NULL_PROFILER, Profiler
+from .optimiser import Optimiser
+
+pyo = lazy_import("pyomo.environ")
+
+
+class RollingHorizonOptimiser(Optimiser):
+    """Re-optimises over a receding window, reusing one persistent model
+
+    The model is built once over a window of time-steps. The inputs that change from one step to the next (ambient
+    temperature, price of electricity and initial temperature) are mutable parameters, so every step only updates
+    their values and re-solves with a persistent (warm-started) solver interface. Index 0 of the window is the current
+    state (its temperature is fixed to the measured one); the decision at index 1 is committed and the window shifted.
+    """
+    def __init__(self, window_size: int = 96) -> None:
+        """Constructor
+
+        Parameters
+        ----------
+        window_size : int
+            number of time-steps in the optimisation window (current state included)
+        """
+        super().__init__()
+        self._window_size = window_size
+        self._persistent_solver = None
+        self.step_times: list[float] = []
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(window_size={self._window_size})"
+
+    def initialise(
+            self,
+            inputs: Inputs,
+            output_path: str,
+            solver: str = "CBC",
+            is_debug: bool = False,
+            model_format: str = "lp",
+            profiler: Profiler = NULL_PROFILER
+    ) -> None:
+        """Initialises the optimiser
+
+        Parameters
+        ----------
+        inputs : Inputs
+            inputs of the simulation
+        output_path : str
+            folder to store the results of the simulation
+        solver : str
+            solver to perform the matrix multiplication (used through its pyomo appsi persistent interface)
+        is_debug : bool
+            flag to run in debug mode
+        model_format : str
+            format of the model to be written (lp or mps)
+        profiler : Profiler
+            profiler recording the phases of the optimisation and the statistics of the solver
+        """
+        super().initialise(inputs, output_path, solver, is_debug, model_format, profiler)
+        self._persistent_solver = None
+        self.step_times = []
+
+    def run(self) -> None:
+        """Rolls the window over the whole horizon, using the inputs as (perfect) forecasts
+        """
+        self._check_continuous("rolling horizon")
+        with self._writing_model():
+            n_steps = len(self._inputs.horizon)
+            padding = (0, self._window_size - 1)
+            temperature_ambient = np.pad(self._inputs.temperature_ambient, padding, mode="edge")
+            cost_electricity = np.pad(self._inputs.cost_electricity, padding, mode="edge")
+
+            temperature_house = np.empty(n_steps)
+            power_heater = np.empty(n_steps)
+            temperature_house[0] = self._inputs.initial_temperature
+            for k in range(max(n_steps - 1, 1)):
+                window = slice(k, k + self._window_size)
+                self.step(temperature_ambient[window], cost_electricity[window], temperature_house[k])
+                if k == 0:
+                    power_heater[0] = pyo.value(self._model.power_heater[0])
+                if k + 1 < n_steps:
+                    power_heater[k + 1] = pyo.value(self._model.power_heater[1])
+                    temperature_house[k + 1] = pyo.value(self._model.temperature_house[1])
+
+            self._solution = {
+                "temperature_house": temperature_house,
+                "power_heater": power_heater,
+                "objective_function": float(
+                    np.dot(self._inputs.cost_electricity, power_heater) *
+                    self._inputs.step_size *
+                    self._inputs.conversion_factor
+                )
+            }
+
+    def step(
+            self,
+            temperature_ambient: npt.NDArray,
+            cost_electricity: npt.NDArray,
+            initial_temperature: float
+    ) -> tuple[float, float]:
+        """Updates the forecasts and the current temperature, and re-solves the window
+
+        Parameters
+        ----------
+        temperature_ambient : npt.NDArray
+            forecast of the ambient temperature over the window
+        cost_electricity : npt.NDArray
+            forecast of the price of electricity over the window
+        initial_temperature : float
+            measured temperature of the house at the current time-step
+
+        Returns
+        -------
+        power_heater, temperature_house : tuple[float, float]
+            power of the heater and temperature of the house to be committed for the next time-step
+        """
+        start = time.perf_counter()
+        if self._model is None:
+            self._problem_build()
+        self._update_parameters(temperature_ambient, cost_electricity, initial_temperature)
+        self._problem_solve(self._model)
+        self.step_times.append(time.perf_counter() - start)
+
+        return pyo.value(self._model.power_heater[1]), pyo.value(self._model.temperature_house[1])
+
+    def _create_sets_variables_parameters(self) -> None:
+        """Creates the sets variables and parameters of the window within the pyomo model
+        """
+        # Sets
+        self._model.horizon = pyo.Set(initialize=range(self._window_size))
+
+        # Parameters
+        self._model.temperature_ambient = pyo.Param(self._model.horizon, initialize=0, mutable=True)
+        self._model.cost_electricity = pyo.Param(self._model.horizon, initialize=0, mutable=True)
+        self._model.initial_temperature = pyo.Param(initialize=self._inputs.initial_temperature, mutable=True)
+
+        # Decision variables
+        self._model.temperature_house = pyo.Var(
+            self._model.horizon, within=pyo.Reals, bounds=tuple(self._inputs.temperature_bounds)
+        )
+        self._model.power_heater = pyo.Var(
+            self._model.horizon, within=pyo.Reals, bounds=tuple(self._inputs.power_bounds)
+        )
+
+    def _create_equations(self) -> None:
+        """Creates the constraints and objective of the window in terms of the mutable parameters
+        """
+        model = self._model
+        model.objective_eqn = pyo.Objective(
+            expr=pyo.quicksum(
+                model.cost_electricity[t] * model.power_heater[t] *
+                self._inputs.step_size * self._inputs.conversion_factor
+                for t in model.horizon
+            ),
+            sense=pyo.minimize
+        )
+        model.temperature_house_eqn = pyo.Constraint(model.horizon, rule=self.__temperature_house)
+
+    def _update_parameters(
+            self,
+            temperature_ambient: npt.NDArray,
+            cost_electricity: npt.NDArray,
+            initial_temperature: float
+    ) -> None:
+        """Sets the values of the mutable parameters
+
+        Parameters
+        ----------
+        temperature_ambient : npt.NDArray
+            forecast of the ambient temperature over the window
+        cost_electricity : npt.NDArray
+            forecast of the price of electricity over the window
+        initial_temperature : float
+            measured temperature of the house at the current time-step
+        """
+        self._model.temperature_ambient.store_values(dict(enumerate(temperature_ambient)))
+        self._model.cost_electricity.store_values(dict(enumerate(cost_electricity)))
+        self._model.initial_temperature.set_value(initial_temperature)
+
+    def _problem_solve(self, model: pyo.Model) -> None:
+        """Solves the problem with the persistent solver, creating it on the first call
+
+        Parameters
+        ----------
+        model : pyo.Model
+            pyomo model with sets, variables, and equations built
+        """
+        if self._persistent_solver is None:
+            solver = self._solver.lower()
+            self._persistent_solver = pyo.SolverFactory(solver if solver.startswith("appsi_") else f"appsi_{solver}")
+            # Only the values of the parameters change between solves
+            update_config = self._persistent_solver.update_config
+            update_config.check_for_new_or_removed_constraints = False
+            update_config.check_for_new_or_removed_vars = False
+            update_config.check_for_new_or_removed_params = False
+            update_config.check_for_new_objective = False
+            update_config.update_constraints = False
+            update_config.update_vars = False
+            update_config.update_named_expressions = False
+            update_config.update_objective = False
+            self._persistent_solver.set_instance(model)
+        with self._profiler.phase("solve"):
+            results = self._persistent_solver.solve(model, tee=self._is_debug)
+        self._profiler.record_solver(self._solver_statistics(results))
+        self._check_solve_status(results)
+
+    def __temperature_house(self, model: pyo.Model, t: pyo.Set) -> pyo.Constraint:
+        """Computes the house temperature
+
+        Parameters
+        ----------
+        model : pyo.Model
+            pyomo model
+        t : pyo.Set
+            time-step of the window
+
+        Returns
+        -------
+        expr : expression of the house temperature
+        """
+        if t == 0:
+            return model.temperature_house[t] == model.initial_temperature
+        else:
+            return model.temperature_house[t] == (
+                    model.temperature_ambient[t] +
+                    (self._inputs.coefficient_heat_div_cool * model.power_heater[t])
+            )
@@ -0,0 +1,323 @@
+from __future__ import annotations
+
+import hashlib
+import os.path as osp
+from dataclasses import dataclass
+
+import numpy as np
+import numpy.typing as npt
+
+from simulate.core import Inputs
+from simulate.core.lazy import lazy_import
+from simulate.core.profiler import NULL_PROFILER, Profiler
+from .errors import SolverError
+from .optimiser import Optimiser
+from .sparse import SparseProblem
+from .writer import ModelWriter
+
+sco = lazy_import("scipy.optimize")
+sps = lazy_import("scipy.sparse")
+
+
+@dataclass(frozen=True, slots=True)
+class Scenarios:
+    """Sampled forecasts of the uncertain inputs, one row per scenario and one column per time-step
+    """
+    temperature_ambient: npt.NDArray
+    cost_electricity: npt.NDArray
+    probabilities: npt.NDArray
+
+    @property
+    def n_scenarios(self) -> int:
+        return len(self.probabilities)
+
+
+def load_scenarios(path: str, inputs: Inputs) -> Scenarios:
+    """Reads the scenarios from a npz file
+
+    The file holds (n_scenarios x horizon) arrays named temperature_ambient and/or cost_electricity (an input without
+    array is the same in all the scenarios), and optionally their probabilities (uniform by default). Columns beyond
+    the horizon of the inputs are ignored.
+
+    Parameters
+    ----------
+    path : str
+        path of the npz file
+    inputs : Inputs
+        inputs of the simulation
+
+    Returns
+    -------
+    scenarios : Scenarios
+        scenarios over the horizon of the inputs
+    """
+    n_steps = len(inputs.horizon)
+    with np.load(path) as data:
+        arrays = {name: np.atleast_2d(data[name]).astype(float) for name in data.files}
+    unknown = set(arrays) - {"temperature_ambient", "cost_electricity", "probabilities"}
+    if unknown:
+        raise ValueError(f"Unknown arrays in the scenarios file {path}: {sorted(unknown)}.")
+
+    n_scenarios = max(
+        len(arrays[name]) for name in ("temperature_ambient", "cost_electricity", "probabilities") if name in arrays
+    )
+    series = {}
+    for name in ("temperature_ambient", "cost_electricity"):
+        values = arrays.get(name, getattr(inputs, name)[np.newaxis])
+        if values.shape[1] < n_steps or len(values) not in (1, n_scenarios):
+            raise ValueError(
+                f"The {name} scenarios have shape {values.shape}, expected ({n_scenarios}, >= {n_steps})."
+            )
+        series[name] = np.broadcast_to(values[:, :n_steps], (n_scenarios, n_steps))
+
+    probabilities = arrays.get("probabilities", np.ones((1, n_scenarios))).ravel()
+    if len(probabilities) != n_scenarios or (probabilities < 0).any() or probabilities.sum() <= 0:
+        raise ValueError(f"Invalid probabilities of the scenarios: {probabilities}.")
+
+    return Scenarios(**series, probabilities=probabilities / probabilities.sum())
+
+
+class ScenarioSolver:
+    """Builds the scenario-indexed (extensive form) problem as sparse arrays and solves it with scipy (HiGHS)
+
+    The power of the heater is a first-stage decision over the first `first_stage_steps` time-steps, i.e. the same in
+    all the scenarios (non-anticipative), and a recourse decision of every scenario afterwards. The temperature of the
+    house follows every scenario, and has to stay within its bounds in all of them. The objective is the expected
+    cost. The problem is built from vectorised index arrays, in time linear in the number of scenarios x time-steps.
+    """
+    def __init__(self, inputs: Inputs, scenarios: Scenarios, first_stage_steps: int | None = None) -> None:
+        """Constructor
+
+        Parameters
+        ----------
+        inputs : Inputs
+            inputs of the simulation (bounds, coefficients and initial temperature)
+        scenarios : Scenarios
+            scenarios of the ambient temperature and of the cost of electricity
+        first_stage_steps : int | None
+            number of time-steps whose power is decided before the scenario is known (the whole horizon if None)
+        """
+        n_steps = len(inputs.horizon)
+        self._inputs = inputs
+        self._scenarios = scenarios
+        self._first_stage_steps = n_steps if first_stage_steps is None else min(first_stage_steps, n_steps)
+        self.statistics: dict = {}
+
+    def __call__(self) -> dict[str, npt.NDArray]:
+        """Builds and solves the problem
+
+        Returns
+        -------
+        solution : dict[str, npt.NDArray]
+            temperature of the house, power of the heater and cost in every scenario
+        """
+        problem = self._problem_build()
+
+        return self._problem_solve(problem)
+
+    def _problem_build(self) -> SparseProblem:
+        """Builds the optimisation problem
+
+        The vector of decision variables is x = [temperature_house (scenario-major), first-stage power_heater,
+        recourse power_heater (scenario-major)].
+
+        Returns
+        -------
+        problem : SparseProblem
+            problem in matrix form
+        """
+        n_scenarios, n_steps = self._scenarios.n_scenarios, len(self._inputs.horizon)
+        n_first, n_recourse = self._first_stage_steps, n_steps - self._first_stage_steps
+        n_temperatures = n_scenarios * n_steps
+        scale = self._inputs.step_size * self._inputs.conversion_factor
+
+        # Objective function: expected cost of the power of the heater
+        weighted_cost = self._scenarios.probabilities[:, np.newaxis] * self._scenarios.cost_electricity * scale
+        c = np.concatenate((
+            np.zeros(n_temperatures), weighted_cost[:, :n_first].sum(axis=0), weighted_cost[:, n_first:].ravel()
+        ))
+
+        # Temperature of the house in every scenario: T[s, 0] = initial temperature,
+        # T[s, t] - k * P[s, t] = ambient temperature[s, t], with P[s, t] = P[t] over the first stage
+        scenario, step = np.divmod(np.arange(n_temperatures), n_steps)
+        power_column = np.where(
+            step < n_first,
+            n_temperatures + step,
+            n_temperatures + n_first + scenario * n_recourse + step - n_first
+        )
+        is_coupled = step > 0
+        rows = np.concatenate((np.arange(n_temperatures), np.flatnonzero(is_coupled)))
+        columns = np.concatenate((np.arange(n_temperatures), power_column[is_coupled]))
+        values = np.concatenate((
+            np.ones(n_temperatures), np.full(is_coupled.sum(), -self._inputs.coefficient_heat_div_cool)
+        ))
+        A_eq = sps.csr_matrix((values, (rows, columns)), shape=(n_temperatures, len(c)))
+        b_eq = np.array(self._scenarios.temperature_ambient, dtype=float)
+        b_eq[:, 0] = self._inputs.initial_temperature
+
+        # Bounds of the decision variables
+        bounds = np.empty((len(c), 2))
+        bounds[:n_temperatures] = self._inputs.temperature_bounds
+        bounds[n_temperatures:] = self._inputs.power_bounds
+
+        return SparseProblem(
+            c=c,
+            A_eq=A_eq,
+            b_eq=b_eq.ravel(),
+            bounds=bounds,
+            variables={
+                "temperature_house": n_temperatures,
+                "power_heater_first_stage": n_first,
+                "power_heater_recourse": n_scenarios * n_recourse
+            },
+            constraints={"temperature_house_eqn": n_temperatures}
+        )
+
+    def _problem_solve(self, problem: SparseProblem) -> dict[str, npt.NDArray]:
+        """Solves the problem
+
+        Parameters
+        ----------
+        problem : SparseProblem
+            problem in matrix form
+
+        Returns
+        -------
+        solution : dict[str, npt.NDArray]
+            temperature of the house, power of the heater and cost in every scenario
+        """
+        results = sco.linprog(
+            c=problem.c, A_eq=problem.A_eq, b_eq=problem.b_eq, bounds=problem.bounds, method="highs"
+        )
+        self.statistics = {
+            "solver": "scipy",
+            "Status": results.status,
+            "Termination condition": results.message,
+            "Number of iterations": results.nit,
+            "Number of scenarios": self._scenarios.n_scenarios,
+            "Number of first-stage steps": self._first_stage_steps
+        }
+        if results.status != 0:
+            raise SolverError(
+                f"Problem not properly solved.\n"
+                f"Status: {results.status}\n"
+                f"termination condition: {results.message})."
+            )
+
+        n_scenarios, n_steps = self._scenarios.n_scenarios, len(self._inputs.horizon)
+        n_temperatures = n_scenarios * n_steps
+        power_heater = np.empty((n_scenarios, n_steps))
+        power_heater[:, :self._first_stage_steps] = results.x[n_temperatures:n_temperatures + self._first_stage_steps]
+        power_heater[:, self._first_stage_steps:] = results.x[n_temperatures + self._first_stage_steps:].reshape(
+            n_scenarios, n_steps - self._first_stage_steps
+        )
+        cost = (
+            np.einsum("st,st->s", self._scenarios.cost_electricity, power_heater) *
+            self._inputs.step_size *
+            self._inputs.conversion_factor
+        )
+
+        return {
+            "temperature_house": results.x[:n_temperatures].reshape(n_scenarios, n_steps),
+            "power_heater": power_heater,
+            "cost": cost
+        }
+
+
+class ScenarioOptimiser(Optimiser):
+    """Optimises the schedule of the heater over scenarios of the ambient temperature and of the cost of electricity
+
+    The problem is built as one scenario-indexed model and solved with HiGHS through scipy, whatever the solver. The
+    solution holds the expected temperature of the house, the expected power of the heater (the first-stage decisions
+    over the first stage) and the expected cost, and `scenario_results` the outcomes of every scenario.
+    """
+    def __init__(self, scenarios: Scenarios, first_stage_steps: int | None = None) -> None:
+        """Constructor
+
+        Parameters
+        ----------
+        scenarios : Scenarios
+            scenarios of the ambient temperature and of the cost of electricity
+        first_stage_steps : int | None
+            number of time-steps whose power is decided before the scenario is known (the whole horizon if None)
+        """
+        super().__init__()
+        self._scenarios = scenarios
+        self._first_stage_steps = first_stage_steps
+        self.scenario_results: dict[str, npt.NDArray] = {}
+
+    def __repr__(self) -> str:
+        digest = hashlib.sha1()
+        scenarios = self._scenarios
+        for array in (scenarios.temperature_ambient, scenarios.cost_electricity, scenarios.probabilities):
+            digest.update(np.ascontiguousarray(array).tobytes())
+
+        return (
+            f"{type(self).__name__}(n_scenarios={self._scenarios.n_scenarios}, "
+            f"first_stage_steps={self._first_stage_steps}, scenarios={digest.hexdigest()[:16]})"
+        )
+
+    def initialise(
+            self,
+            inputs: Inputs,
+            output_path: str,
+            solver: str = "CBC",
+            is_debug: bool = False,
+            model_format: str = "lp",
+            profiler: Profiler = NULL_PROFILER
+    ) -> None:
+        """Initialises the optimiser
+
+        Parameters
+        ----------
+        inputs : Inputs
+            inputs of the simulation
+        output_path : str
+            folder to store the results of the simulation
+        solver : str
+            solver name (the scenario-indexed problem is always solved with HiGHS through scipy)
+        is_debug : bool
+            flag to run in debug mode
+        model_format : str
+            format of the model to be written in debug mode (lp or mps, gzip-compressed with lp.gz or mps.gz)
+        profiler : Profiler
+            profiler recording the phases of the optimisation and the statistics of the solver
+        """
+        super().initialise(inputs, output_path, solver, is_debug, model_format, profiler)
+        self.scenario_results = {}
+
+    def _backend(self) -> ScenarioSolver:
+        """Solves the scenario-indexed problem with scipy
+
+        Returns
+        -------
+        backend : ScenarioSolver
+            solver of the scenario-indexed problem
+        """
+        self._check_continuous("scenario optimiser")
+        return ScenarioSolver(self._inputs, self._scenarios, self._first_stage_steps)
+
+    def run(self) -> None:
+        """Solves the scenario-indexed problem and summarises the outcomes of the scenarios
+        """
+        super().run()
+        self.scenario_results = {**self._solution, "probabilities": self._scenarios.probabilities}
+        probabilities = self._scenarios.probabilities
+        self._solution = {
+            "temperature_house": probabilities @ self.scenario_results["temperature_house"],
+            "power_heater": probabilities @ self.scenario_results["power_heater"],
+            "objective_function": float(probabilities @ self.scenario_results["cost"])
+        }
+
+    def _create_lp_mps(self, output_path: str, model_format: str) -> None:
+        """Creates lp or mps file with the scenario-indexed model for debugging purposes
+
+        Parameters
+        ----------
+        output_path : str
+            output path to write the lp file
+        model_format : str
+            model format (lp or mps, gzip-compressed with lp.gz or mps.gz)
+        """
+        problem = self._backend()._problem_build()
+        ModelWriter(problem)(osp.join(output_path, f"model.{model_format}"), model_format)
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import numpy.typing as npt
+
+from simulate.core import Inputs
+from simulate.core.lazy import lazy_import
+from .errors import SolverError
+
+sco = lazy_import("scipy.optimize")
+sps = lazy_import("scipy.sparse")
+
+
+@dataclass(frozen=True, slots=True)
+class SparseProblem:
+    """Linear program in matrix form: min c'x s.t. A_eq x = b_eq, bounds[:, 0] <= x <= bounds[:, 1]
+
+    The vector of decision variables is x = [temperature_house, power_heater]. Variables and constraints are
+    consecutive blocks, whose names and sizes are given in order.
+    """
+    c: npt.NDArray
+    A_eq: sps.csr_matrix
+    b_eq: npt.NDArray
+    bounds: npt.NDArray
+    variables: dict[str, int]
+    constraints: dict[str, int]
+
+
+class SparseSolver:
+    """Builds the problem directly as sparse arrays and solves it with scipy (HiGHS)
+    """
+    def __init__(self, inputs: Inputs) -> None:
+        """Constructor
+
+        Parameters
+        ----------
+        inputs : Inputs
+            inputs of the simulation
+        """
+        self._inputs = inputs
+        self.statistics: dict = {}
+        self.duals: dict[str, npt.NDArray] = {}
+        self.reduced_costs: dict[str, npt.NDArray] = {}
+
+    def __call__(self) -> dict[str, npt.NDArray | float]:
+        """Builds and solves the problem
+
+        Returns
+        -------
+        solution : dict[str, npt.NDArray | float]
+            optimal values of the variables and of the objective function
+        """
+        problem = self._problem_build()
+
+        return self._problem_solve(problem)
+
+    def _problem_build(self) -> SparseProblem:
+        """Builds the optimisation problem (same formulation as ObjectiveFunction and Constraints)
+
+        Returns
+        -------
+        problem : SparseProblem
+            problem in matrix form
+        """
+        n_steps = len(self._inputs.horizon)
+
+        # Objective function
+        cost_power = self._inputs.cost_electricity * self._inputs.step_size * self._inputs.conversion_factor
+        c = np.concatenate((np.zeros(n_steps), cost_power))
+
+        # Temperature of the house: T[0] = initial temperature, T[t] - k * P[t] = ambient temperature[t]
+        coefficient_power = np.full(n_steps, -self._inputs.coefficient_heat_div_cool)
+        coefficient_power[0] = 0
+        A_eq = sps.hstack(
+            (sps.identity(n_steps, format="csr"), sps.diags(coefficient_power, format="csr")),
+            format="csr"
+        )
+        b_eq = np.array(self._inputs.temperature_ambient, dtype=float)
+        b_eq[0] = self._inputs.initial_temperature
+
+        # Bounds of the decision variables
+        bounds = np.empty((2 * n_steps, 2))
+        bounds[:n_steps] = self._inputs.temperature_bounds
+        bounds[n_steps:] = self._inputs.power_bounds
+
+        return SparseProblem(
+            c=c,
+            A_eq=A_eq,
+            b_eq=b_eq,
+            bounds=bounds,
+            variables={"temperature_house": n_steps, "power_heater": n_steps},
+            constraints={"temperature_house_eqn": n_steps}
+        )
+
+    def _problem_solve(self, problem: SparseProblem) -> dict[str, npt.NDArray | float]:
+        """Solves the problem
+
+        Parameters
+        ----------
+        problem : SparseProblem
+            problem in matrix form
+
+        Returns
+        -------
+        solution : dict[str, npt.NDArray | float]
+            optimal values of the variables and of the objective function
+        """
+        results = sco.linprog(
+            c=problem.c, A_eq=problem.A_eq, b_eq=problem.b_eq, bounds=problem.bounds, method="highs"
+        )
+        self.statistics = {
+            "solver": "scipy",
+            "Status": results.status,
+            "Termination condition": results.message,
+            "Number of iterations": results.nit,
+            "Number of crossover iterations": results.get("crossover_nit")
+        }
+        self.__check_solve_status(results)
+        n_steps = len(self._inputs.horizon)
+        # Marginals are the derivatives of the objective with respect to the right-hand sides and the bounds
+        self.duals = {"temperature_house_eqn": results.eqlin.marginals}
+        reduced_costs = results.lower.marginals + results.upper.marginals
+        self.reduced_costs = {"temperature_house": reduced_costs[:n_steps], "power_heater": reduced_costs[n_steps:]}
+
+        return {
+            "temperature_house": results.x[:n_steps],
+            "power_heater": results.x[n_steps:],
+            "objective_function": float(results.fun)
+        }
+
+    @staticmethod
+    def __check_solve_status(results: sco.OptimizeResult) -> None:
+        """Checks the solver status
+
+        Parameters
+        ----------
+        results : sco.OptimizeResult
+            results of the optimisation
+        """
+        if results.status != 0:
+            raise SolverError(
+                f"Problem not properly solved.\n"
+                f"Status: {results.status}\n"
+                f"termination condition: {results.message})."
+            )
@@ -0,0 +1,127 @@
+import numpy as np
+import numpy.typing as npt
+
+from simulate.core import Inputs
+from .errors import SolverError
+
+
+class VectorisedSolver:
+    """Solves the problem in closed form over the whole horizon with numpy
+
+    The house temperature at each time-step only depends on the ambient temperature and the power of the heater at
+    that same time-step, hence the problem decomposes into one independent (two-variable) problem per time-step.
+    """
+    tolerance: float = 1e-9
+    max_reported_steps: int = 10
+
+    def __init__(self, inputs: Inputs) -> None:
+        """Constructor
+
+        Parameters
+        ----------
+        inputs : Inputs
+            inputs of the simulation
+        """
+        self._inputs = inputs
+        self.statistics: dict = {}
+        self.duals: dict[str, npt.NDArray] = {}
+        self.reduced_costs: dict[str, npt.NDArray] = {}
+
+    def __call__(self) -> dict[str, npt.NDArray | float]:
+        """Solves the problem
+
+        Returns
+        -------
+        solution : dict[str, npt.NDArray | float]
+            optimal values of the variables and of the objective function
+        """
+        lower, upper = self._feasible_power_range()
+        self.__check_feasibility(lower, upper)
+        self.statistics = {"solver": "numpy", "Status": "ok", "Termination condition": "optimal"}
+
+        cost = self._inputs.cost_electricity
+        power_heater = np.where(cost >= 0, lower, upper)
+        temperature_house = self._inputs.temperature_ambient + self._inputs.coefficient_heat_div_cool * power_heater
+        temperature_house[0] = self._inputs.initial_temperature
+        objective = float(
+            np.dot(cost, power_heater) * self._inputs.step_size * self._inputs.conversion_factor
+        )
+        self.__set_sensitivities(temperature_house)
+
+        return {
+            "temperature_house": temperature_house,
+            "power_heater": power_heater,
+            "objective_function": objective
+        }
+
+    def _feasible_power_range(self) -> tuple[npt.NDArray, npt.NDArray]:
+        """Intersects the power bounds with the power range implied by the temperature bounds
+
+        Returns
+        -------
+        lower, upper : tuple[npt.NDArray, npt.NDArray]
+            minimum and maximum feasible power of the heater at each time-step
+        """
+        coefficient = self._inputs.coefficient_heat_div_cool
+        ambient = self._inputs.temperature_ambient
+        temperature_min, temperature_max = self._inputs.temperature_bounds
+        power_min, power_max = self._inputs.power_bounds
+
+        limits = np.stack(((temperature_min - ambient) / coefficient, (temperature_max - ambient) / coefficient))
+        lower = np.maximum(power_min, limits.min(axis=0))
+        upper = np.minimum(power_max, limits.max(axis=0))
+
+        # The first time-step fixes the temperature, the power is only constrained by its bounds
+        lower[0], upper[0] = power_min, power_max
+
+        return lower, upper
+
+    def __set_sensitivities(self, temperature_house: npt.NDArray) -> None:
+        """Computes the duals of temperature_house_eqn and the reduced costs in closed form
+
+        At every time-step, either the temperature of the house is at the bound the cost pushes it to, and the power
+        of the heater is basic (picking the same basis as HiGHS when both are at a bound), or the temperature is
+        basic, and the constraint has no dual.
+
+        Parameters
+        ----------
+        temperature_house : npt.NDArray
+            optimal temperature of the house
+        """
+        temperature_min, temperature_max = self._inputs.temperature_bounds
+        coefficient = self._inputs.coefficient_heat_div_cool
+        cost = self._inputs.cost_electricity * self._inputs.step_size * self._inputs.conversion_factor
+        reduced_cost_temperature = cost / coefficient
+
+        is_power_basic = (
+            (temperature_house <= temperature_min + self.tolerance) & (reduced_cost_temperature >= 0) |
+            (temperature_house >= temperature_max - self.tolerance) & (reduced_cost_temperature <= 0)
+        )
+        is_power_basic[0] = False
+        duals = np.where(is_power_basic, -reduced_cost_temperature, 0.0)
+        self.duals = {"temperature_house_eqn": duals}
+        self.reduced_costs = {"temperature_house": -duals, "power_heater": cost + coefficient * duals}
+
+    def __check_feasibility(self, lower: npt.NDArray, upper: npt.NDArray) -> None:
+        """Checks that every time-step admits a solution
+
+        Parameters
+        ----------
+        lower : npt.NDArray
+            minimum feasible power of the heater at each time-step
+        upper : npt.NDArray
+            maximum feasible power of the heater at each time-step
+        """
+        temperature_min, temperature_max = self._inputs.temperature_bounds
+        infeasible = lower > upper + self.tolerance
+        infeasible[0] |= not (
+            temperature_min - self.tolerance <= self._inputs.initial_temperature <= temperature_max + self.tolerance
+        )
+        if infeasible.any():
+            steps = self._inputs.horizon[infeasible]
+            raise SolverError(
+                f"Problem not properly solved.\n"
+                f"Status: infeasible\n"
+                f"Infeasible time-steps ({len(steps)}): {steps[:self.max_reported_steps].tolist()}"
+                f"{' ...' if len(steps) > self.max_reported_steps else ''}."
+            )
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import gzip
+import math
+from typing import Iterator
+
+import numpy as np
+import numpy.typing as npt
+
+from .sparse import SparseProblem
+
+
+class ModelWriter:
+    """Streams a problem in matrix form to an LP or MPS file, optionally gzip-compressed (lp.gz, mps.gz)
+
+    The file is written in chunks of rows (LP) or columns (MPS) straight from the coefficient arrays, so neither the
+    pyomo model nor the whole text of the file is held in memory. Variables and constraints are labelled as pyomo's
+    symbolic labels, e.g. power_heater(3) and temperature_house_eqn(3).
+    """
+    chunk_size = 2**14
+
+    def __init__(self, problem: SparseProblem) -> None:
+        """Constructor
+
+        Parameters
+        ----------
+        problem : SparseProblem
+            problem in matrix form
+        """
+        self._problem = problem
+        self._A_eq = problem.A_eq.copy()
+        self._A_eq.eliminate_zeros()
+
+    def __call__(self, path: str, model_format: str) -> None:
+        """Writes the problem
+
+        Parameters
+        ----------
+        path : str
+            path of the file
+        model_format : str
+            format of the file (lp, mps, lp.gz or mps.gz)
+        """
+        writers = {"lp": self._write_lp, "mps": self._write_mps}
+        base_format = model_format.lower().removesuffix(".gz")
+        if base_format not in writers:
+            raise ValueError(f"Model format {model_format} not supported, expected one of lp, mps, lp.gz, mps.gz.")
+
+        opener = gzip.open if model_format.lower().endswith(".gz") else open
+        kwargs = {"compresslevel": 1} if opener is gzip.open else {}
+        with opener(path, "wb", **kwargs) as file:
+            for text in writers[base_format]():
+                file.write(text.encode())
+
+    def _write_lp(self) -> Iterator[str]:
+        """Yields the LP file in chunks
+        """
+        problem, A_eq = self._problem, self._A_eq
+        yield "\\ Model written by simulate\n\nminimize\nobjective_eqn:\n"
+        for start, stop in self.__chunks(len(problem.c)):
+            c = problem.c[start:stop]
+            columns = start + np.flatnonzero(c)
+            yield self.__lines(
+                f"{self.__term(value)} {column}"
+                for value, column in zip(c[columns - start].tolist(), self.__labels(problem.variables, columns))
+            )
+
+        yield "\nsubject to\n"
+        for start, stop in self.__chunks(A_eq.shape[0]):
+            rows = A_eq[start:stop]
+            terms = [
+                f"{self.__term(value)} {column}"
+                for value, column in zip(rows.data.tolist(), self.__labels(problem.variables, rows.indices))
+            ]
+            rows_labels = self.__labels(problem.constraints, np.arange(start, stop))
+            yield self.__lines(
+                f"{label}: {' '.join(terms[begin:end])} = {rhs!r}"
+                for label, begin, end, rhs in zip(
+                    rows_labels,
+                    rows.indptr[:-1].tolist(),
+                    rows.indptr[1:].tolist(),
+                    problem.b_eq[start:stop].tolist()
+                )
+            )
+
+        yield "\nbounds\n"
+        for start, stop in self.__chunks(len(problem.c)):
+            yield self.__lines(
+                self.__bound_lp(label, lower, upper)
+                for label, (lower, upper) in zip(
+                    self.__labels(problem.variables, np.arange(start, stop)), problem.bounds[start:stop].tolist()
+                )
+            )
+
+        yield "\nend\n"
+
+    def _write_mps(self) -> Iterator[str]:
+        """Yields the (free) MPS file in chunks
+        """
+        problem = self._problem
+        A_eq = self._A_eq.tocsc()
+        yield "NAME simulate\nROWS\n N  objective_eqn\n"
+        for start, stop in self.__chunks(A_eq.shape[0]):
+            yield self.__lines(f" E  {label}" for label in self.__labels(problem.constraints, np.arange(start, stop)))
+
+        yield "COLUMNS\n"
+        for start, stop in self.__chunks(A_eq.shape[1]):
+            columns = A_eq[:, start:stop]
+            rows_labels = self.__labels(problem.constraints, columns.indices)
+            values = columns.data.tolist()
+            lines = []
+            for label, begin, end, cost in zip(
+                self.__labels(problem.variables, np.arange(start, stop)),
+                columns.indptr[:-1].tolist(),
+                columns.indptr[1:].tolist(),
+                problem.c[start:stop].tolist()
+            ):
+                # Columns without any coefficient are still declared through the objective
+                if cost != 0 or begin == end:
+                    lines.append(f"    {label}  objective_eqn  {cost!r}")
+                lines.extend(f"    {label}  {rows_labels[k]}  {values[k]!r}" for k in range(begin, end))
+            yield self.__lines(lines)
+
+        yield "RHS\n"
+        for start, stop in self.__chunks(A_eq.shape[0]):
+            b_eq = problem.b_eq[start:stop]
+            rows = start + np.flatnonzero(b_eq)
+            yield self.__lines(
+                f"    RHS  {label}  {value!r}"
+                for label, value in zip(self.__labels(problem.constraints, rows), b_eq[rows - start].tolist())
+            )
+
+        yield "BOUNDS\n"
+        for start, stop in self.__chunks(A_eq.shape[1]):
+            yield self.__lines(
+                line
+                for label, (lower, upper) in zip(
+                    self.__labels(problem.variables, np.arange(start, stop)), problem.bounds[start:stop].tolist()
+                )
+                for line in self.__bound_mps(label, lower, upper)
+            )
+
+        yield "ENDATA\n"
+
+    @classmethod
+    def __chunks(cls, size: int) -> Iterator[tuple[int, int]]:
+        """Yields the start and stop indices of the chunks
+
+        Parameters
+        ----------
+        size : int
+            number of items to be written
+        """
+        for start in range(0, size, cls.chunk_size):
+            yield start, min(start + cls.chunk_size, size)
+
+    @staticmethod
+    def __labels(blocks: dict[str, int], indices: npt.NDArray) -> list[str]:
+        """Labels of the variables or constraints at the given indices
+
+        Parameters
+        ----------
+        blocks : dict[str, int]
+            names and sizes of the consecutive blocks of variables or constraints
+        indices : npt.NDArray
+            indices in the vector of variables or constraints
+
+        Returns
+        -------
+        labels : list[str]
+            name of the block followed by the index within the block
+        """
+        names = list(blocks)
+        offsets = np.cumsum([0, *blocks.values()])
+        block = np.searchsorted(offsets, indices, side="right") - 1
+
+        return [f"{names[b]}({i})" for b, i in zip(block.tolist(), (indices - offsets[block]).tolist())]
+
+    @staticmethod
+    def __lines(lines) -> str:
+        """Joins lines, each ending with a new line
+        """
+        text = "\n".join(lines)
+
+        return f"{text}\n" if text else ""
+
+    @staticmethod
+    def __term(value: float) -> str:
+        """Signed coefficient of a linear term
+        """
+        return f"+{value!r}" if value >= 0 else f"-{-value!r}"
+
+    @staticmethod
+    def __bound_lp(label: str, lower: float, upper: float) -> str:
+        """Bounds of a variable in the LP format
+        """
+        if lower == upper:
+            return f"{label} = {lower!r}"
+        if math.isinf(lower) and math.isinf(upper):
+            return f"{label} free"
+
+        lower_label = "-inf" if math.isinf(lower) else repr(lower)
+        upper_label = "+inf" if math.isinf(upper) else repr(upper)
+
+        return f"{lower_label} <= {label} <= {upper_label}"
+
+    @staticmethod
+    def __bound_mps(label: str, lower: float, upper: float) -> list[str]:
+        """Bounds of a variable in the MPS format
+        """
+        if lower == upper:
+            return [f" FX BND  {label}  {lower!r}"]
+        if math.isinf(lower) and math.isinf(upper):
+            return [f" FR BND  {label}"]
+
+        return [
+            f" MI BND  {label}" if math.isinf(lower) else f" LO BND  {label}  {lower!r}",
+            *([] if math.isinf(upper) else [f" UP BND  {label}  {upper!r}"])
+        ]
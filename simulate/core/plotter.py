@@ -1,15 +1,29 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+
 import matplotlib.pyplot as plt
 import numpy as np
 import numpy.typing as npt
 import os.path as osp
 
 from . import Inputs
+from .constants import PLOTS
 
 
 class Plotter:
     """Plots the results
     """
-    def __init__(self, inputs: Inputs, simulation_results: dict[str, npt.NDArray | float], output_path: str) -> None:
+    def __init__(
+            self,
+            inputs: Inputs,
+            simulation_results: dict[str, npt.NDArray | float],
+            output_path: str,
+            plots: tuple[str, ...] = PLOTS,
+            file_format: str = "pdf",
+            max_points: int | None = None,
+            is_rasterised: bool = False,
+            workers: int = 1
+    ) -> None:
         """Constructor
 
         Parameters
@@ -18,24 +32,94 @@ class Plotter:
             dictionary with simulation results
         output_path : str
             path to directory to store results
+        plots : tuple[str, ...]
+            names of the plots to render
+        file_format : str
+            format of the figures (pdf, png, svg ...)
+        max_points : int | None
+            maximum number of points per series, longer series are downsampled keeping their minima and maxima
+        is_rasterised : bool
+            flag to rasterise the series in vector formats
+        workers : int
+            number of processes rendering the figures in parallel
         """
         self._inputs = inputs
         self._simulation_results = simulation_results
         self._output_path = output_path
+        self._plots = plots
+        self._file_format = file_format
+        self._is_rasterised = is_rasterised
+        self._workers = workers
+
+        # Axes data shared by all the plots
+        time_horizon = np.arange(start=0, stop=self._inputs.cardinality_horizon, step=self._inputs.step_size)
+        tick_step = 5 * math.ceil(self._inputs.cardinality_horizon / 100)
+        self._x_ticks = range(0, math.ceil(self._inputs.cardinality_horizon), tick_step)
+        power_heater = np.asarray(self._simulation_results["power_heater"])
+        series = {
+            "temperature_house": np.asarray(self._simulation_results["temperature_house"]),
+            "temperature_ambient": self._inputs.temperature_ambient,
+            "power_heater": power_heater,
+            "cost_electricity": self._inputs.cost_electricity,
+            "costs": self._inputs.cost_electricity * power_heater * self._inputs.step_size
+        }
+        self._series = {
+            name: downsample_min_max(time_horizon, values, max_points) for name, values in series.items()
+        }
+        self._objective = float(self._simulation_results["objective_function"])
 
     def __call__(self) -> None:
         """Calls all plots
         """
-        self._plot_temp_power()
-        self._plot_bounds()
-        self._plot_price()
-        self._plot_cost()
+        if self._workers > 1 and len(self._plots) > 1:
+            workers = min(self._workers, len(self._plots))
+            with ProcessPoolExecutor(max_workers=workers, initializer=_use_agg) as executor:
+                list(executor.map(self._plot, self._plots))
+        else:
+            for name in self._plots:
+                self._plot(name)
+
+    def _plot(self, name: str) -> None:
+        """Renders one plot
+
+        Parameters
+        ----------
+        name : str
+            name of the plot
+        """
+        getattr(self, f"_plot_{name}")()
+
+    def _step(self, ax: plt.Axes, series: str, **kwargs) -> None:
+        """Step plot of a (possibly downsampled) series
+
+        Parameters
+        ----------
+        ax : plt.Axes
+            axes to draw on
+        series : str
+            name of the series
+        """
+        x, y = self._series[series]
+        ax.step(x=x, y=y, rasterized=self._is_rasterised, **kwargs)
+
+    def _save(self, fig: plt.Figure, name: str) -> None:
+        """Saves and closes a figure
+
+        Parameters
+        ----------
+        fig : plt.Figure
+            figure to save
+        name : str
+            name of the file (without extension)
+        """
+        fig.tight_layout()
+        fig.savefig(osp.join(self._output_path, f"{name}.{self._file_format}"))
+        plt.close(fig)
 
     def _plot_temp_power(self, name: str = "temp_power") -> None:
         """Line plot
         """
-        time_horizon = np.arange(start=0, stop=self._inputs.cardinality_horizon, step=self._inputs.step_size)
-        x_ticks = range(0, self._inputs.cardinality_horizon, 5)
+        x_ticks = self._x_ticks
         fig, ax1 = plt.subplots(nrows=1, ncols=1, figsize=(20, 10))
 
         # Left axis
@@ -47,12 +131,12 @@ class Plotter:
         ax1.tick_params(axis='y', labelcolor=colour)
         # ax1.set_ylim(12, 26)
 
-        ax1.step(
-            x=time_horizon, y=self._simulation_results["temperature_house"].values,
+        self._step(
+            ax1, "temperature_house",
             alpha=0.8, color="r", linestyle="-", linewidth=2, label="Temperature house"
         )
-        ax1.step(
-            x=time_horizon, y=self._inputs.temperature_ambient,
+        self._step(
+            ax1, "temperature_ambient",
             alpha=0.8, color="#ff4600", linestyle="-", linewidth=2, label="Temperature ambient"
         )
         # Right axis
@@ -62,8 +146,8 @@ class Plotter:
         ax2.tick_params(axis='y', labelcolor=colour)
         # ax2.set_ylim(2, 10)
 
-        ax2.step(
-            x=time_horizon, y=self._simulation_results["power_heater"].values,
+        self._step(
+            ax2, "power_heater",
             alpha=0.8, color="b", linestyle="-", linewidth=2, label="Power heater"
         )
 
@@ -72,15 +156,12 @@ class Plotter:
         ax1.legend(fontsize=18, loc=2)
         ax2.legend(fontsize=18, loc=1)
         plt.title("Optimal power and temperature")
-        fig.tight_layout()
-        fig.savefig(osp.join(self._output_path, f"{name}.pdf"))
-        plt.close()
+        self._save(fig, name)
 
     def _plot_bounds(self, name: str = "bounds") -> None:
         """Line plot
         """
-        time_horizon = np.arange(start=0, stop=self._inputs.cardinality_horizon, step=self._inputs.step_size)
-        x_ticks = range(0, self._inputs.cardinality_horizon, 5)
+        x_ticks = self._x_ticks
         fig, ax1 = plt.subplots(nrows=1, ncols=1, figsize=(20, 10))
 
         # Left axis
@@ -95,8 +176,8 @@ class Plotter:
         ax1.axhline(y=self._inputs.temperature_bounds[0], color="r", linestyle="--", alpha=0.7, label="Temperature bounds")
         ax1.axhline(y=self._inputs.temperature_bounds[1], color="r", linestyle="--", alpha=0.7)
 
-        ax1.step(
-            x=time_horizon, y=self._simulation_results["temperature_house"].values,
+        self._step(
+            ax1, "temperature_house",
             alpha=0.8, color="r", linestyle="-", linewidth=2, label="Temperature house"
         )
 
@@ -109,8 +190,8 @@ class Plotter:
 
         ax2.axhline(y=self._inputs.power_bounds[0], color="b", linestyle="--", alpha=0.7, label="Power bounds")
         ax2.axhline(y=self._inputs.power_bounds[1], color="b", linestyle="--", alpha=0.7)
-        ax2.step(
-            x=time_horizon, y=self._simulation_results["power_heater"].values,
+        self._step(
+            ax2, "power_heater",
             alpha=0.8, color="b", linestyle="-", linewidth=2, label="Power heater"
         )
 
@@ -118,15 +199,12 @@ class Plotter:
         plt.grid()
         ax1.legend(fontsize=18, loc=6)
         ax2.legend(fontsize=18, loc=5)
-        fig.tight_layout()
-        fig.savefig(osp.join(self._output_path, f"{name}.pdf"))
-        plt.close()
+        self._save(fig, name)
 
     def _plot_price(self, name: str = "price") -> None:
         """Line plot
         """
-        time_horizon = np.arange(start=0, stop=self._inputs.cardinality_horizon, step=self._inputs.step_size)
-        x_ticks = range(0, self._inputs.cardinality_horizon, 5)
+        x_ticks = self._x_ticks
 
         fig, ax1 = plt.subplots(nrows=1, ncols=1, figsize=(20, 10))
 
@@ -139,8 +217,8 @@ class Plotter:
         ax1.tick_params(axis='y', labelcolor=colour)
         # ax1.set_ylim(20, 26)
 
-        ax1.step(
-            x=time_horizon, y=self._inputs.cost_electricity,
+        self._step(
+            ax1, "cost_electricity",
             alpha=0.8, color="#ff6d00", linestyle="-", linewidth=2, label="Price electricity"
         )
 
@@ -151,8 +229,8 @@ class Plotter:
         ax2.tick_params(axis='y', labelcolor=colour)
         # ax2.set_ylim(3, 9)
 
-        ax2.step(
-            x=time_horizon, y=self._simulation_results["power_heater"].values,
+        self._step(
+            ax2, "power_heater",
             alpha=0.8, color="b", linestyle="-", linewidth=2, label="Power heater"
         )
 
@@ -160,17 +238,13 @@ class Plotter:
         plt.grid()
         ax1.legend(fontsize=18, loc=2)
         ax2.legend(fontsize=18, loc=1)
-        plt.title(f"Total cost: ${self._simulation_results['objective_function'].values[0]:,.2f}")
-        fig.tight_layout()
-        fig.savefig(osp.join(self._output_path, f"{name}.pdf"))
-        plt.close()
+        plt.title(f"Total cost: ${self._objective:,.2f}")
+        self._save(fig, name)
 
     def _plot_cost(self, name: str = "cost") -> None:
         """Line plot
         """
-        time_horizon = np.arange(start=0, stop=self._inputs.cardinality_horizon, step=self._inputs.step_size)
-        costs = self._inputs.cost_electricity * self._simulation_results["power_heater"].values * self._inputs.step_size
-        x_ticks = range(0, self._inputs.cardinality_horizon, 5)
+        x_ticks = self._x_ticks
 
         fig, ax1 = plt.subplots(nrows=1, ncols=1, figsize=(20, 10))
 
@@ -182,15 +256,54 @@ class Plotter:
         ax1.set_ylabel("Cost [$]", color=colour, fontsize=20)
         ax1.tick_params(axis='y', labelcolor=colour)
 
-        ax1.step(
-            x=time_horizon, y=costs,
+        self._step(
+            ax1, "costs",
             alpha=0.8, color="r", linestyle="-", linewidth=2, label="Cost power"
         )
 
         # Additional stuff
         plt.grid()
         ax1.legend(fontsize=18, loc=2)
-        plt.title(f"Total cost: ${self._simulation_results['objective_function'].values[0]:,.2f}")
-        fig.tight_layout()
-        fig.savefig(osp.join(self._output_path, f"{name}.pdf"))
-        plt.close()
+        plt.title(f"Total cost: ${self._objective:,.2f}")
+        self._save(fig, name)
+
+
+def downsample_min_max(
+        x: npt.NDArray,
+        y: npt.NDArray,
+        max_points: int | None
+) -> tuple[npt.NDArray, npt.NDArray]:
+    """Downsamples a series keeping the minimum and the maximum of each bucket of consecutive points, so peaks remain
+    visible
+
+    Parameters
+    ----------
+    x : npt.NDArray
+        x coordinates
+    y : npt.NDArray
+        y coordinates
+    max_points : int | None
+        maximum number of points (no downsampling if None)
+
+    Returns
+    -------
+    x, y : tuple[npt.NDArray, npt.NDArray]
+        downsampled coordinates
+    """
+    if max_points is None or len(y) <= max_points:
+        return x, y
+
+    n_buckets = max(max_points // 2, 1)
+    bucket_size = math.ceil(len(y) / n_buckets)
+    buckets = np.pad(y, (0, n_buckets * bucket_size - len(y)), mode="edge").reshape(n_buckets, bucket_size)
+    start = np.arange(n_buckets)[:, None] * bucket_size
+    indices = start + np.stack((buckets.argmin(axis=1), buckets.argmax(axis=1)), axis=1)
+    indices = np.minimum(np.sort(indices, axis=1).ravel(), len(y) - 1)
+
+    return x[indices], y[indices]
+
+
+def _use_agg() -> None:
+    """Switches the worker processes to the non-interactive Agg backend
+    """
+    plt.switch_backend("Agg")
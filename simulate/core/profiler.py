@@ -0,0 +1,138 @@
+import cProfile
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+class Profiler:
+    """Records the wall time, CPU time and memory of the phases of a run, and the statistics of the solver
+
+    Phases that run more than once (e.g., the solves of the rolling horizon) are aggregated under the same name.
+    A disabled profiler records nothing, so it can always be passed around.
+    """
+    def __init__(
+            self,
+            is_enabled: bool = True,
+            is_memory_traced: bool = False,
+            cprofile_path: str | None = None
+    ) -> None:
+        """Constructor
+
+        Parameters
+        ----------
+        is_enabled : bool
+            flag to record the phases
+        is_memory_traced : bool
+            flag to trace the peak of memory allocated by each phase with tracemalloc (slows down allocations)
+        cprofile_path : str | None
+            file where to dump the cProfile statistics of the whole run (no cProfile if None)
+        """
+        self._is_enabled = is_enabled
+        self._is_memory_traced = is_memory_traced
+        self._cprofile_path = cprofile_path
+        self._cprofile: cProfile.Profile = None
+        self._started: str = None
+        self._start: float = None
+        self.phases: dict[str, dict] = {}
+        self.solver: dict = {}
+        self.metadata: dict = {}
+
+    def __enter__(self) -> "Profiler":
+        if self._is_enabled:
+            self._started = datetime.now(timezone.utc).isoformat()
+            self._start = time.perf_counter()
+            if self._is_memory_traced:
+                tracemalloc.start()
+            if self._cprofile_path is not None:
+                self._cprofile = cProfile.Profile()
+                self._cprofile.enable()
+
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self._cprofile_path)
+            self._cprofile = None
+        if self._is_memory_traced and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    @contextmanager
+    def phase(self, name: str):
+        """Measures a phase of the run
+
+        Parameters
+        ----------
+        name : str
+            name of the phase (build, write, solve, read, save, plot ...)
+        """
+        if not self._is_enabled:
+            yield
+            return
+
+        is_tracing = tracemalloc.is_tracing()
+        if is_tracing:
+            tracemalloc.reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+        start, start_cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            record = self.phases.setdefault(name, {"calls": 0, "wall_time": 0.0, "cpu_time": 0.0})
+            record["calls"] += 1
+            record["wall_time"] += time.perf_counter() - start
+            record["cpu_time"] += time.process_time() - start_cpu
+            if resource is not None:
+                # Peak resident memory of the process so far (kilobytes on Linux)
+                record["max_rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            if is_tracing:
+                peak_memory = tracemalloc.get_traced_memory()[1] - start_memory
+                record["peak_memory"] = max(record.get("peak_memory", 0), peak_memory)
+
+    def record_solver(self, statistics: dict) -> None:
+        """Records the statistics of a solve (the last one is kept, together with the number of solves)
+
+        Parameters
+        ----------
+        statistics : dict
+            statistics reported by the solver
+        """
+        if self._is_enabled:
+            self.solver = {**statistics, "solves": self.solver.get("solves", 0) + 1}
+
+    def to_dict(self) -> dict:
+        """Structured trace of the run
+
+        Returns
+        -------
+        trace : dict
+            metadata, phases and solver statistics of the run
+        """
+        return {
+            "started": self._started,
+            "wall_time": None if self._start is None else time.perf_counter() - self._start,
+            **self.metadata,
+            "phases": self.phases,
+            "solver": self.solver
+        }
+
+    def dump(self, path: str) -> None:
+        """Writes the trace of the run as JSON
+
+        Parameters
+        ----------
+        path : str
+            path to the JSON file
+        """
+        with open(path, "w") as trace_file:
+            json.dump(self.to_dict(), trace_file, indent=2, default=str)
+
+
+NULL_PROFILER = Profiler(is_enabled=False)
@@ -0,0 +1,21 @@
+import numpy.typing as npt
+
+from .lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+
+class SimulationResults(dict[str, npt.NDArray | float]):
+    """Results of a simulation: one array (ordered by the horizon) per variable, and the objective as a float
+
+    It is a plain dictionary, pandas objects are only created on demand.
+    """
+    def to_pandas(self) -> dict[str, "pd.Series"]:
+        """Converts the results to pandas series (indexed by the time-steps, the objective being a one-item series)
+
+        Returns
+        -------
+        results : dict[str, pd.Series]
+            results of the simulation
+        """
+        return {key: pd.Series(val) for key, val in self.items()}
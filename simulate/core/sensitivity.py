@@ -0,0 +1,336 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+
+from .inputs import Inputs
+from .lazy import lazy_import
+from .optimiser import Optimiser
+from .optimiser.sparse import SparseProblem, SparseSolver
+from .results import SimulationResults
+
+csgraph = lazy_import("scipy.sparse.csgraph")
+spla = lazy_import("scipy.sparse.linalg")
+
+VARIABLES = ("temperature_house", "power_heater")
+
+
+@dataclass(frozen=True, slots=True)
+class WhatIf:
+    """Answer to a what-if question
+
+    valid_range is the range of the step t along the perturbation (inputs + t * change) over which the optimal basis
+    of the base problem stays optimal, so that the answer is exact when it contains 1. Otherwise, the answer was
+    re-solved.
+    """
+    results: SimulationResults
+    valid_range: tuple[float, float]
+    is_resolved: bool
+
+
+@dataclass(frozen=True, slots=True)
+class _Basis:
+    """Optimal basis of the base problem, with the factorisation of its basis matrix
+    """
+    problem: SparseProblem
+    solution: npt.NDArray
+    is_basic: npt.NDArray
+    side: npt.NDArray
+    factor: Any
+
+
+class SensitivityAnalysis:
+    """Answers what-if questions on the inputs from the optimal basis of the base problem, without re-solving
+
+    The base problem is solved once, and its duals and reduced costs pick an optimal basis. A perturbation of the
+    right-hand sides (ambient temperature, initial temperature), of the bounds or of the costs moves the solution
+    linearly as long as the basis stays primal and dual feasible, which a ratio test checks. The problem is re-solved
+    only when the perturbation leaves this range.
+    """
+    tolerance: float = 1e-7
+
+    def __init__(self, inputs: Inputs, solver: str = "CBC", optimiser: Optimiser | None = None) -> None:
+        """Constructor
+
+        Parameters
+        ----------
+        inputs : Inputs
+            inputs of the base simulation
+        solver : str
+            solver name
+        optimiser : Optimiser | None
+            optimiser of the base problem, already run on the inputs (solved again if None)
+        """
+        self._inputs = inputs
+        self._solver = solver
+        self._optimiser = optimiser
+        self.__basis: _Basis | None = None
+
+    def what_if(self, **changes: Any) -> WhatIf:
+        """Answers a what-if question, e.g. what_if(power_bounds=(4, 7)) or what_if(cost_electricity=2 * cost)
+
+        Parameters
+        ----------
+        changes : Any
+            new values of the inputs (see Inputs.perturbed)
+
+        Returns
+        -------
+        answer : WhatIf
+            optimal results of the perturbed problem
+        """
+        inputs = self._inputs.perturbed(**changes)
+        basis = self.__optimal_basis()
+        if basis is None:
+            return WhatIf(results=self.__solve(inputs), valid_range=(0.0, 0.0), is_resolved=True)
+
+        problem = SparseSolver(inputs)._problem_build()
+        solution, primal_range = self.__primal_step(basis, problem)
+        dual_range = self.__dual_step(basis, problem)
+        valid_range = (max(primal_range[0], dual_range[0]), min(primal_range[1], dual_range[1]))
+        if valid_range[1] < 1 - self.tolerance:
+            return WhatIf(results=self.__solve(inputs), valid_range=valid_range, is_resolved=True)
+
+        results = SimulationResults()
+        start = 0
+        for variable, size in problem.variables.items():
+            results[variable] = solution[start:start + size]
+            start += size
+        results["objective_function"] = float(problem.c @ solution)
+
+        return WhatIf(results=results, valid_range=valid_range, is_resolved=False)
+
+    def __optimal_basis(self) -> _Basis | None:
+        """Solves the base problem (once) and finds an optimal basis from its reduced costs
+
+        The variables strictly within their bounds are basic, and the rows left are covered by variables at a bound
+        with a zero reduced cost (degenerate). The basis is checked to be dual feasible.
+
+        Returns
+        -------
+        basis : _Basis | None
+            optimal basis, None if the solver does not report reduced costs or no basis matches them
+        """
+        if self.__basis is not None:
+            return self.__basis
+
+        if self._optimiser is None:
+            self._optimiser = Optimiser()
+            self._optimiser.initialise(inputs=self._inputs, output_path=None, solver=self._solver)
+            self._optimiser.run()
+        optimiser = self._optimiser
+        if not optimiser.reduced_costs or not optimiser.binding:
+            return None
+
+        problem = SparseSolver(self._inputs)._problem_build()
+        solution = np.concatenate([_optimal_values(optimiser)[variable] for variable in VARIABLES])
+        reduced_costs = np.concatenate([optimiser.reduced_costs[variable] for variable in VARIABLES])
+        side = np.concatenate([optimiser.binding[variable] for variable in VARIABLES])
+        if np.isnan(reduced_costs).any():
+            return None
+
+        A_eq = problem.A_eq.copy()
+        A_eq.eliminate_zeros()
+        is_basic = self.__match_rows(A_eq, side == 0, (side != 0) & (np.abs(reduced_costs) <= self.tolerance))
+        if is_basic is None:
+            return None
+        try:
+            factor = spla.splu(A_eq[:, is_basic].tocsc())
+        except RuntimeError:
+            return None
+
+        basis = _Basis(problem=problem, solution=solution, is_basic=is_basic, side=side, factor=factor)
+        if self.__dual_step(basis, problem)[1] < 0:
+            # The reduced costs of the basis have the wrong signs, so it is not optimal
+            return None
+        self.__basis = basis
+
+        return basis
+
+    @staticmethod
+    def __match_rows(A_eq: Any, is_interior: npt.NDArray, is_degenerate: npt.NDArray) -> npt.NDArray | None:
+        """Matches every row with a basic variable, all the interior variables first
+
+        Parameters
+        ----------
+        A_eq : sps.csr_matrix
+            matrix of the equality constraints, without explicit zeros
+        is_interior : npt.NDArray
+            variables strictly within their bounds
+        is_degenerate : npt.NDArray
+            variables at a bound with a zero reduced cost
+
+        Returns
+        -------
+        is_basic : npt.NDArray | None
+            basic variables, None if the rows cannot all be matched
+        """
+        n_rows = A_eq.shape[0]
+        interior = np.flatnonzero(is_interior)
+        matched = csgraph.maximum_bipartite_matching(A_eq[:, interior].tocsr(), perm_type="column")
+        if (matched >= 0).sum() != len(interior):
+            return None
+
+        is_basic = np.zeros(A_eq.shape[1], dtype=bool)
+        is_basic[interior] = True
+        rows_left = np.flatnonzero(matched < 0)
+        if len(rows_left) > 0:
+            degenerate = np.flatnonzero(is_degenerate)
+            matched = csgraph.maximum_bipartite_matching(A_eq[rows_left][:, degenerate].tocsr(), perm_type="column")
+            if (matched < 0).any():
+                return None
+            is_basic[degenerate[matched]] = True
+
+        return is_basic if is_basic.sum() == n_rows else None
+
+    def __primal_step(self, basis: _Basis, problem: SparseProblem) -> tuple[npt.NDArray, tuple[float, float]]:
+        """Moves the solution along the perturbation of the right-hand sides and of the bounds
+
+        The nonbasic variables follow their bounds, and the basic variables solve the constraints.
+
+        Parameters
+        ----------
+        basis : _Basis
+            optimal basis of the base problem
+        problem : SparseProblem
+            perturbed problem
+
+        Returns
+        -------
+        solution, valid_range : tuple[npt.NDArray, tuple[float, float]]
+            solution of the perturbed problem in this basis, and range of the step over which it is feasible
+        """
+        base = basis.problem
+        change = np.zeros_like(basis.solution)
+        is_lower, is_upper = ~basis.is_basic & (basis.side < 0), ~basis.is_basic & (basis.side > 0)
+        change[is_lower] = problem.bounds[is_lower, 0] - base.bounds[is_lower, 0]
+        change[is_upper] = problem.bounds[is_upper, 1] - base.bounds[is_upper, 1]
+        change[basis.is_basic] = basis.factor.solve(problem.b_eq - base.b_eq - base.A_eq @ change)
+
+        lower, upper = base.bounds.T
+        change_lower, change_upper = (problem.bounds - base.bounds).T
+        valid_range = _step_range(
+            np.concatenate((basis.solution - lower, upper - basis.solution)),
+            np.concatenate((change - change_lower, change_upper - change)),
+            self.tolerance
+        )
+
+        return basis.solution + change, valid_range
+
+    def __dual_step(self, basis: _Basis, problem: SparseProblem) -> tuple[float, float]:
+        """Range of the step along the perturbation of the costs over which the basis stays optimal
+
+        Parameters
+        ----------
+        basis : _Basis
+            optimal basis of the base problem
+        problem : SparseProblem
+            perturbed problem
+
+        Returns
+        -------
+        valid_range : tuple[float, float]
+            range of the step over which the reduced costs of the nonbasic variables keep their signs
+        """
+        base = basis.problem
+        A_eq_T = base.A_eq.T.tocsr()
+
+        def reduced_costs(c: npt.NDArray) -> npt.NDArray:
+            return c - A_eq_T @ basis.factor.solve(c[basis.is_basic], trans="T")
+
+        reduced_costs_base = reduced_costs(base.c)
+        change = reduced_costs(problem.c - base.c)
+        # Nonbasic variables at their lower bound need nonnegative reduced costs, and nonpositive at their upper
+        # bound, unless they are fixed
+        is_fixed = (base.bounds[:, 0] == base.bounds[:, 1]) & (problem.bounds[:, 0] == problem.bounds[:, 1])
+        sign = np.where(basis.is_basic | is_fixed, 0, basis.side)
+        is_checked = sign != 0
+
+        return _step_range(
+            -sign[is_checked] * reduced_costs_base[is_checked],
+            -sign[is_checked] * change[is_checked],
+            self.tolerance
+        )
+
+    def __solve(self, inputs: Inputs) -> SimulationResults:
+        """Solves the perturbed problem
+
+        Parameters
+        ----------
+        inputs : Inputs
+            perturbed inputs
+
+        Returns
+        -------
+        results : SimulationResults
+            optimal results of the perturbed problem
+        """
+        optimiser = Optimiser()
+        optimiser.initialise(inputs=inputs, output_path=None, solver=self._solver)
+        optimiser.run()
+
+        return SimulationResults(_optimal_values(optimiser))
+
+
+def _step_range(slack: npt.NDArray, rate: npt.NDArray, tolerance: float) -> tuple[float, float]:
+    """Range of the step t such that slack + t * rate >= 0 (up to the tolerance)
+
+    Parameters
+    ----------
+    slack : npt.NDArray
+        slack at t = 0 (infinite for missing bounds)
+    rate : npt.NDArray
+        derivative of the slack with respect to t
+    tolerance : float
+        tolerance of the slack and of the rate
+
+    Returns
+    -------
+    valid_range : tuple[float, float]
+        smallest and largest feasible steps (an empty range if the slack is negative at t = 0)
+    """
+    if (slack < -tolerance).any():
+        return np.inf, -np.inf
+
+    slack, rate = np.maximum(slack, 0), np.nan_to_num(rate)
+    is_finite = np.isfinite(slack)
+    is_decreasing, is_increasing = is_finite & (rate < -tolerance), is_finite & (rate > tolerance)
+    step_max = ((slack[is_decreasing] + tolerance) / -rate[is_decreasing]).min(initial=np.inf)
+    step_min = (-(slack[is_increasing] + tolerance) / rate[is_increasing]).max(initial=-np.inf)
+
+    return float(step_min), float(step_max)
+
+
+def _optimal_values(optimiser: Optimiser) -> dict[str, npt.NDArray | float]:
+    """Optimal values of the variables and of the objective function of a solved optimiser
+
+    Parameters
+    ----------
+    optimiser : Optimiser
+        optimiser already run
+
+    Returns
+    -------
+    values : dict[str, npt.NDArray | float]
+        temperature of the house, power of the heater and objective function
+    """
+    if optimiser._solution is not None:
+        return {
+            **{variable: np.asarray(optimiser._solution[variable], dtype=float) for variable in VARIABLES},
+            "objective_function": float(optimiser._solution["objective_function"])
+        }
+
+    model = optimiser._model
+    values = {
+        variable: np.fromiter((var.value for var in getattr(model, variable).values()), dtype=float)
+        for variable in VARIABLES
+    }
+    inputs = optimiser._inputs
+    values["objective_function"] = float(
+        np.dot(inputs.cost_electricity, values["power_heater"]) * inputs.step_size * inputs.conversion_factor
+    )
+
+    return values
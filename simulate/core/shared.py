@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import hashlib
+import sys
+import weakref
+from multiprocessing import shared_memory
+
+import numpy as np
+import numpy.typing as npt
+
+# Segments mapped by the process (name -> segment and address of its first byte), attached once per process
+_segments: dict[str, tuple[shared_memory.SharedMemory, int]] = {}
+
+
+class SharedArray(np.ndarray):
+    """Read-only one-dimensional array in a shared-memory segment
+
+    Pickling it (e.g. to send it to a worker process) only sends the name of its segment and its position in it, and
+    unpickling maps the segment, so all the processes read the same physical copy. Views (e.g. windows of the horizon)
+    keep referring to the segment, but the results of ufuncs and arithmetic, which own new memory, do not. Arrays
+    whose values do not lie within their segment are pickled by value.
+    """
+    _segment: str | None = None
+
+    def __array_finalize__(self, obj: npt.NDArray | None) -> None:
+        self._segment = getattr(obj, "_segment", None)
+
+    def __array_wrap__(self, array: npt.NDArray, *args):
+        wrapped = super().__array_wrap__(array, *args)
+        if isinstance(wrapped, SharedArray):
+            wrapped._segment = None
+
+        return wrapped
+
+    def __reduce__(self):
+        is_contiguous = self.ndim == 1 and (len(self) < 2 or self.strides[0] == self.itemsize)
+        if self._segment not in _segments or not is_contiguous:
+            return np.asarray(self).__reduce__()
+
+        segment, first_byte = _segments[self._segment]
+        offset = self.__array_interface__["data"][0] - first_byte
+        if offset < 0 or offset + self.nbytes > segment.size:
+            return np.asarray(self).__reduce__()
+
+        return _attach, (self._segment, self.dtype.str, offset, len(self))
+
+
+def _attach(name: str, dtype: str, offset: int, length: int) -> SharedArray:
+    """Maps a read-only array of a shared-memory segment (the segment is mapped once per process)
+
+    Parameters
+    ----------
+    name : str
+        name of the segment
+    dtype : str
+        type of the values
+    offset : int
+        position of the first value in bytes
+    length : int
+        number of values
+
+    Returns
+    -------
+    array : SharedArray
+        read-only array
+    """
+    if name not in _segments:
+        # The owner of the segment unlinks it: the processes attaching to it must not track it (Python >= 3.13)
+        kwargs = {"track": False} if sys.version_info >= (3, 13) else {}
+        _map(shared_memory.SharedMemory(name=name, **kwargs))
+    segment, _ = _segments[name]
+    array = np.ndarray((length,), dtype=dtype, buffer=segment.buf, offset=offset).view(SharedArray)
+    array._segment = name
+    array.setflags(write=False)
+
+    return array
+
+
+def _map(segment: shared_memory.SharedMemory) -> None:
+    """Records a segment mapped by the process, with the address of its first byte
+
+    Parameters
+    ----------
+    segment : shared_memory.SharedMemory
+        shared-memory segment
+    """
+    first_byte = np.frombuffer(segment.buf, dtype=np.uint8, count=1)
+    _segments[segment.name] = (segment, first_byte.__array_interface__["data"][0])
+    del first_byte
+
+
+def _release(names: list[str]) -> None:
+    """Unlinks the segments of a store, and unmaps the ones no array refers to any more
+
+    Parameters
+    ----------
+    names : list[str]
+        names of the segments
+    """
+    for name in names:
+        segment, _ = _segments.pop(name, (None, None))
+        if segment is None:
+            continue
+        try:
+            segment.unlink()
+        except FileNotFoundError:
+            pass
+        try:
+            segment.close()
+        except BufferError:
+            # Arrays still refer to the segment: it is unmapped when the process exits
+            pass
+
+
+class SharedSeriesStore:
+    """Time series in shared memory, shared by the processes that receive inputs attached to the store
+
+    The process creating the store owns its segments, and unlinks them when the store is closed, garbage-collected, or
+    at exit. If it crashes, the resource tracker of multiprocessing (shared with the worker processes) unlinks them.
+    Worker processes only map the segments, so their crashes leak nothing. Identical series are stored once.
+    """
+    def __init__(self) -> None:
+        """Constructor
+        """
+        self._names: list[str] = []
+        self._arrays: dict[tuple[str, str], SharedArray] = {}
+        self._finalizer = weakref.finalize(self, _release, self._names)
+
+    def __enter__(self) -> "SharedSeriesStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the series in the store in bytes
+        """
+        return sum(array.nbytes for array in self._arrays.values())
+
+    def put(self, array: npt.ArrayLike, dtype: npt.DTypeLike | None = None) -> SharedArray:
+        """Copies a one-dimensional array in a new segment, unless the store already holds the same values
+
+        Parameters
+        ----------
+        array : npt.ArrayLike
+            values to share
+        dtype : npt.DTypeLike | None
+            type of the shared values (the type of the array if None)
+
+        Returns
+        -------
+        shared : SharedArray
+            read-only array in shared memory
+        """
+        if not self._finalizer.alive:
+            raise ValueError("The shared series store is closed.")
+        values = np.ascontiguousarray(array, dtype=dtype)
+        if values.ndim != 1:
+            raise ValueError(f"Only one-dimensional series can be shared, found shape {values.shape}.")
+        key = (values.dtype.str, hashlib.sha1(values.view(np.uint8)).hexdigest())
+        if key in self._arrays:
+            return self._arrays[key]
+
+        segment = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        self._names.append(segment.name)
+        np.ndarray(values.shape, dtype=values.dtype, buffer=segment.buf)[:] = values
+        _map(segment)
+        shared = _attach(segment.name, values.dtype.str, 0, len(values))
+        self._arrays[key] = shared
+
+        return shared
+
+    def close(self) -> None:
+        """Unlinks the segments of the store (the processes mapping them keep reading them until they unmap them)
+        """
+        self._arrays.clear()
+        self._finalizer()
@@ -1,9 +1,13 @@
 import numpy as np
-import numpy.typing as npt
 import os.path as osp
-import pandas as pd
+from dataclasses import fields
+from datetime import datetime, timezone
 
 from . import Inputs, Optimiser
+from .cache import ResultCache
+from .profiler import NULL_PROFILER, Profiler
+from .results import SimulationResults
+from .storage import save_results
 
 
 class Simulator:
@@ -13,10 +17,15 @@ class Simulator:
             self,
             inputs: Inputs,
             optimiser: Optimiser,
-            output_path: str,
+            output_path: str | None,
             solver: str = "CBC",
             is_debug: bool = False,
-            model_format: str = "lp"
+            model_format: str = "lp",
+            cache: ResultCache | None = None,
+            refresh_cache: bool = False,
+            output_format: str = "csv",
+            compression: str | None = None,
+            profiler: Profiler = NULL_PROFILER
     ) -> None:
         """Constructor
 
@@ -26,14 +35,25 @@ class Simulator:
             inputs of the simulation
         optimiser : Optimiser
             optimiser object
-        output_path : str
-            folder to store the results of the simulation
+        output_path : str | None
+            folder to store the results of the simulation (results are not saved if None)
         solver : str
             solver to perform the matrix multiplication
         is_debug : bool
             flag to run in debug mode
         model_format : str
             format of the model to be written (lp or mps)
+        cache : ResultCache | None
+            cache of results, a hit skips building and solving the model (no caching if None, and never read in debug
+            mode, which writes the model and the log of the solver)
+        refresh_cache : bool
+            flag to solve the model even if the results are cached, and overwrite them
+        output_format : str
+            format of the results: one csv per variable, or a single npz or parquet file with all of them
+        compression : str | None
+            compression of npz (any value) and parquet (name of the codec) files
+        profiler : Profiler
+            profiler recording the phases of the simulation and the statistics of the solver
         """
         self.inputs = inputs
         self._optimiser = optimiser
@@ -41,16 +61,26 @@ class Simulator:
         self._solver = solver
         self._is_debug = is_debug
         self._model_format = model_format
+        self._cache = cache
+        self._refresh_cache = refresh_cache
+        self._output_format = output_format
+        self._compression = compression
+        self._profiler = profiler
 
-    def simulate(self) -> dict[str, npt.NDArray | float]:
+    def simulate(self) -> SimulationResults:
         """Runs the simulation
         """
-        results = self.__run_simulation()
-        self.__save_results(results)
+        if self._cache is None:
+            results = self.__run_simulation()
+        else:
+            results = self.__run_cached_simulation()
+        if self._output_path is not None:
+            with self._profiler.phase("save"):
+                self.write_results(results)
 
         return results
 
-    def __run_simulation(self) -> dict[str, npt.NDArray | float]:
+    def __run_simulation(self) -> SimulationResults:
         """Runs the simulation
         """
         self._optimiser.initialise(
@@ -58,30 +88,94 @@ class Simulator:
             output_path=self._output_path,
             solver=self._solver,
             is_debug=self._is_debug,
-            model_format=self._model_format
+            model_format=self._model_format,
+            profiler=self._profiler
         )
         self._optimiser.run()
-        results = self.__read_results_from_model()
+        with self._profiler.phase("read"):
+            results = self.read_results()
 
         return results
 
-    def __read_results_from_model(self) -> dict[str, npt.NDArray | float]:
-        """Reads the results from the pyomo model
+    def __run_cached_simulation(self) -> SimulationResults:
+        """Reads the results from the cache, or runs the simulation and caches its results
+
+        Debug runs always solve the model, so that they write their debug files, and refresh the cache.
+        """
+        key = self._cache.key(self.inputs, self._solver, repr(self._optimiser))
+        with self._profiler.phase("cache"):
+            results = None if self._refresh_cache or self._is_debug else self._cache.get(key)
+        if results is None:
+            results = self.__run_simulation()
+            self._cache.put(key, results)
+
+        return results
+
+    def read_results(self) -> SimulationResults:
+        """Reads the results from the optimiser (once it has run) into arrays ordered by the horizon
 
         Returns
         -------
-        results : dict[str, pd.Series]
+        results : SimulationResults
             results of the optimisation
         """
-        results = {}
-        for variable in self.inputs.variables:
-            results[variable] = pd.Series(getattr(self._optimiser._model, variable).get_values())
-        results["objective_function"] = pd.Series(self._optimiser._model.objective_eqn.expr())
+        results = SimulationResults()
+        if self._optimiser._solution is not None:
+            for variable in self.inputs.variables:
+                results[variable] = np.asarray(self._optimiser._solution[variable], dtype=float)
+            results["objective_function"] = float(self._optimiser._solution["objective_function"])
+
+            return results
+
+        n_steps = len(self.inputs.horizon)
+        for variable in dict.fromkeys([*self.inputs.variables, "power_heater"]):
+            model_variable = getattr(self._optimiser._model, variable)
+            results[variable] = np.fromiter(
+                (np.nan if var.value is None else var.value for var in model_variable.values()),
+                dtype=float,
+                count=n_steps
+            )
+        # Same expression as the objective function of the model, evaluated on the arrays
+        is_kept = "power_heater" in self.inputs.variables
+        power_heater = results["power_heater"] if is_kept else results.pop("power_heater")
+        results["objective_function"] = float(
+            np.dot(self.inputs.cost_electricity, power_heater) * self.inputs.step_size * self.inputs.conversion_factor
+        )
 
         return results
 
-    def __save_results(self, results: dict[str, pd.Series]) -> None:
-        """Saves the results in a csv
+    def write_results(self, results: SimulationResults) -> None:
+        """Saves the results in a csv per variable, or in a single npz or parquet file
+
+        Parameters
+        ----------
+        results : SimulationResults
+            results of the simulation
         """
-        for key, val in results.items():
+        if self._output_format != "csv":
+            save_results(
+                results=results,
+                output_path=self._output_path,
+                output_format=self._output_format,
+                metadata=self.__metadata(),
+                compression=self._compression
+            )
+            return
+
+        for key, val in results.to_pandas().items():
             val.to_csv(f"{osp.join(self._output_path, key)}.csv")
+
+    def __metadata(self) -> dict:
+        """Describes the run
+
+        Returns
+        -------
+        metadata : dict
+            inputs, solver, optimiser and creation time of the run
+        """
+        return {
+            "inputs": {field.name: getattr(self.inputs, field.name) for field in fields(self.inputs) if field.init},
+            "solver": self._solver,
+            "optimiser": repr(self._optimiser),
+            "created": datetime.now(timezone.utc).isoformat()
+        }
@@ -0,0 +1,137 @@
+import json
+import os.path as osp
+import struct
+import zipfile
+
+import numpy as np
+import numpy.typing as npt
+
+from .constants import OUTPUT_FORMATS
+
+RESULTS_FILE = "results"
+METADATA_KEY = "metadata"
+
+
+def save_results(
+        results: dict[str, npt.NDArray | float],
+        output_path: str,
+        output_format: str,
+        metadata: dict,
+        compression: str | None = None
+) -> str:
+    """Saves all the results and the metadata of a run in a single npz or parquet file
+
+    Parameters
+    ----------
+    results : dict[str, npt.NDArray | float]
+        schedules (one value per time-step) and objective of the simulation
+    output_path : str
+        folder to store the results of the simulation
+    output_format : str
+        format of the file (npz or parquet)
+    metadata : dict
+        json-serialisable description of the run
+    compression : str | None
+        compression of the file (any value compresses npz files, parquet files take the name of the codec)
+
+    Returns
+    -------
+    path : str
+        path to the file
+    """
+    schedules = {key: np.asarray(val) for key, val in results.items() if key != "objective_function"}
+    metadata = {**metadata, "objective_function": float(results["objective_function"])}
+    path = osp.join(output_path, f"{RESULTS_FILE}.{output_format}")
+
+    if output_format == "npz":
+        save = np.savez_compressed if compression else np.savez
+        save(path, **schedules, **{METADATA_KEY: np.array(json.dumps(metadata))})
+    elif output_format == "parquet":
+        pa, pq = _import_pyarrow()
+        table = pa.table(schedules).replace_schema_metadata({METADATA_KEY: json.dumps(metadata)})
+        pq.write_table(table, path, compression=compression or "none")
+    else:
+        raise ValueError(f"Unsupported output format '{output_format}', choose one of {OUTPUT_FORMATS[1:]}.")
+
+    return path
+
+
+def read_results(
+        path: str,
+        columns: list[str] | None = None,
+        mmap: bool = False
+) -> tuple[dict[str, npt.NDArray], dict]:
+    """Reads the schedules and the metadata written by save_results
+
+    Parameters
+    ----------
+    path : str
+        path to the npz or parquet file
+    columns : list[str] | None
+        schedules to read (all if None)
+    mmap : bool
+        flag to memory-map the schedules instead of reading them (uncompressed npz files only)
+
+    Returns
+    -------
+    schedules, metadata : tuple[dict[str, npt.NDArray], dict]
+        schedules and description of the run (objective included)
+    """
+    if path.endswith(".parquet"):
+        pa, pq = _import_pyarrow()
+        table = pq.read_table(path, columns=columns)
+        metadata = json.loads(table.schema.metadata[METADATA_KEY.encode()])
+        return {name: table.column(name).to_numpy() for name in table.column_names}, metadata
+
+    with np.load(path) as data:
+        metadata = json.loads(data[METADATA_KEY].item())
+        names = [name for name in data.files if name != METADATA_KEY] if columns is None else columns
+        if not mmap:
+            return {name: data[name] for name in names}, metadata
+
+    with zipfile.ZipFile(path) as archive:
+        return {name: _memmap_member(path, archive.getinfo(f"{name}.npy")) for name in names}, metadata
+
+
+def _memmap_member(path: str, info: zipfile.ZipInfo) -> np.memmap:
+    """Memory-maps an array stored (uncompressed) in a npz file
+
+    Parameters
+    ----------
+    path : str
+        path to the npz file
+    info : zipfile.ZipInfo
+        zip entry of the array
+
+    Returns
+    -------
+    array : np.memmap
+        read-only memory-mapped array
+    """
+    if info.compress_type != zipfile.ZIP_STORED:
+        raise ValueError(f"Arrays of compressed npz files cannot be memory-mapped ({path}).")
+    with open(path, "rb") as npz_file:
+        # Local file header: 30 bytes, whose last 4 are the lengths of the file name and the extra field
+        npz_file.seek(info.header_offset + 26)
+        name_length, extra_length = struct.unpack("<HH", npz_file.read(4))
+        npz_file.seek(info.header_offset + 30 + name_length + extra_length)
+        version = np.lib.format.read_magic(npz_file)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(npz_file)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(npz_file)
+        offset = npz_file.tell()
+
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape, order="F" if fortran_order else "C", offset=offset)
+
+
+def _import_pyarrow():
+    """Imports pyarrow, which is only needed for parquet files
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as error:
+        raise ImportError("Parquet files require pyarrow (pip install pyarrow).") from error
+
+    return pa, pq
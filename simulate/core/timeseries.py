@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import os
+import os.path as osp
+from functools import lru_cache
+
+import numpy as np
+import numpy.typing as npt
+
+from .lazy import lazy_import
+
+pd = lazy_import("pandas")
+pq = lazy_import("pyarrow.parquet")
+
+
+def load_series(source: str | dict, name: str, step_size: float, n_steps: int) -> npt.NDArray:
+    """Loads an external time series and resamples it to the time-steps of the simulation
+
+    The series are read-only and shared between all the inputs objects of the process that use the same file with the
+    same resolution. NumPy (.npy) files are memory-mapped, so they are not even copied in memory unless resampled.
+
+    Parameters
+    ----------
+    source : str | dict
+        path to the file (.npy, .csv or .parquet) or table with the keys "path", "column" (name of the column in
+        csv and parquet files, defaults to the only column or to the name of the series) and "step_size" (resolution
+        of the series in hours, defaults to the step size of the simulation)
+    name : str
+        name of the series
+    step_size : float
+        step size of the simulation in hours
+    n_steps : int
+        number of time-steps of the simulation
+
+    Returns
+    -------
+    series : npt.NDArray
+        read-only series with one value per time-step of the simulation
+    """
+    if isinstance(source, str):
+        source = {"path": source}
+    path = osp.abspath(source["path"])
+
+    return _resample(
+        path=path,
+        modified=os.stat(path).st_mtime_ns,
+        column=source.get("column", name),
+        source_step_size=source.get("step_size", step_size),
+        step_size=step_size,
+        n_steps=n_steps
+    )
+
+
+@lru_cache(maxsize=32)
+def _read(path: str, modified: int, column: str) -> npt.NDArray:
+    """Reads a series from disk (cached while the file is not modified)
+
+    Parameters
+    ----------
+    path : str
+        absolute path to the file
+    modified : int
+        modification time of the file, only part of the cache key
+    column : str
+        column to read from csv and parquet files with more than one column
+
+    Returns
+    -------
+    series : npt.NDArray
+        read-only series
+    """
+    extension = osp.splitext(path)[1].lower()
+    if extension == ".npy":
+        series = np.load(path, mmap_mode="r")
+    elif extension == ".csv":
+        label = _select_column(pd.read_csv(path, nrows=0).columns, column, path)
+        series = pd.read_csv(path, usecols=[label])[label].to_numpy(dtype=float)
+    elif extension == ".parquet":
+        # Only the column of the series is read, the index of the frame written by pandas is not a candidate
+        names = [name for name in pq.read_schema(path).names if not name.startswith("__index_level_")]
+        label = _select_column(pd.Index(names), column, path)
+        series = pd.read_parquet(path, columns=[label])[label].to_numpy(dtype=float)
+    else:
+        raise ValueError(f"Unsupported time series format '{extension}' ({path}).")
+    if series.ndim != 1:
+        raise ValueError(f"Time series in {path} must be one-dimensional, found shape {series.shape}.")
+    series.setflags(write=False)
+
+    return series
+
+
+@lru_cache(maxsize=32)
+def _resample(
+        path: str,
+        modified: int,
+        column: str,
+        source_step_size: float,
+        step_size: float,
+        n_steps: int
+) -> npt.NDArray:
+    """Resamples a series to the step size of the simulation (cached per file and resolution)
+
+    Averages blocks of values when the step size is an integer multiple of the resolution of the series, and
+    interpolates linearly otherwise.
+
+    Parameters
+    ----------
+    path : str
+        absolute path to the file
+    modified : int
+        modification time of the file, only part of the cache key
+    column : str
+        column to read from csv and parquet files
+    source_step_size : float
+        resolution of the series in hours
+    step_size : float
+        step size of the simulation in hours
+    n_steps : int
+        number of time-steps of the simulation
+
+    Returns
+    -------
+    series : npt.NDArray
+        read-only series with n_steps values
+    """
+    series = _read(path, modified, column)
+    ratio = step_size / source_step_size
+    if np.isclose(ratio, 1):
+        resampled = series[:n_steps]
+    elif ratio > 1 and np.isclose(ratio, round(ratio)):
+        factor = round(ratio)
+        resampled = series[:n_steps * factor]
+        resampled = resampled[:len(resampled) // factor * factor].reshape(-1, factor).mean(axis=1)
+    else:
+        time_set = np.arange(n_steps) * step_size
+        source_time_set = np.arange(len(series)) * source_step_size
+        is_covered = time_set[-1] <= source_time_set[-1]
+        resampled = np.interp(time_set, source_time_set, series) if is_covered else series[:0]
+    if len(resampled) < n_steps:
+        raise ValueError(
+            f"Time series in {path} is too short: {n_steps} time-steps of {step_size} h are needed, "
+            f"found {len(series)} values of {source_step_size} h."
+        )
+    if resampled.flags.writeable:
+        resampled.setflags(write=False)
+
+    return resampled
+
+
+def _select_column(columns: pd.Index, column: str, path: str) -> str:
+    """Selects the column with the series: the given one, or the only one (ignoring unnamed index columns)
+
+    Parameters
+    ----------
+    columns : pd.Index
+        columns of the file
+    column : str
+        name of the column with the series
+    path : str
+        path to the file
+
+    Returns
+    -------
+    label : str
+        label of the column with the series
+    """
+    if column in columns:
+        return column
+    named = [label for label in columns if not str(label).startswith("Unnamed")]
+    if len(named) != 1:
+        raise ValueError(f"Column '{column}' not found in {path}.")
+
+    return named[0]
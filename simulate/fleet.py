@@ -0,0 +1,556 @@
+import glob
+import json
+import os
+import os.path as osp
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import numpy.typing as npt
+
+from simulate.core import Inputs
+from simulate.core.lazy import lazy_import
+from simulate.core.optimiser.errors import SolverError
+from simulate.core.optimiser.vectorised import VectorisedSolver
+from simulate.core.shared import SharedSeriesStore
+from simulate.core.storage import save_results
+from simulate.core.timeseries import load_series
+from .utils import read_input_file, resolve_series_paths
+
+pd = lazy_import("pandas")
+
+
+@dataclass(slots=True)
+class FleetResults:
+    """Coordinated schedules of the buildings of a feeder, and the convergence of their coordination
+    """
+    names: list[str]
+    temperature_house: npt.NDArray
+    power_heater: npt.NDArray
+    objective_function: npt.NDArray
+    uncoordinated_cost: npt.NDArray
+    feeder_capacity: npt.NDArray
+    feeder_price: npt.NDArray
+    congestion_payment: npt.NDArray
+    lower_bound: float
+    convergence: dict[str, npt.NDArray]
+    building_convergence: dict[str, npt.NDArray]
+
+    def summary(self) -> dict:
+        """Aggregates the results of all the buildings
+
+        Returns
+        -------
+        summary : dict
+            json-serialisable summary
+        """
+        objective = float(self.objective_function.sum())
+        load = self.power_heater.sum(axis=0)
+
+        return {
+            "n_buildings": len(self.names),
+            "n_iterations": int(self.convergence["iteration"][-1]),
+            "objective_function": objective,
+            "lower_bound": self.lower_bound,
+            "relative_gap": float(self.convergence["relative_gap"][-1]),
+            "uncoordinated_cost": float(self.uncoordinated_cost.sum()),
+            "congested_steps": int((self.feeder_price > 0).sum()),
+            "peak_load": float(load.max(initial=0)),
+            "max_overload": float(np.maximum(load - self.feeder_capacity, 0).max(initial=0))
+        }
+
+    def to_pandas(self) -> "pd.DataFrame":
+        """Diagnostics of every building as a table
+
+        Returns
+        -------
+        table : pd.DataFrame
+            one row per building
+        """
+        return pd.DataFrame({
+            "name": self.names,
+            "objective_function": self.objective_function,
+            "uncoordinated_cost": self.uncoordinated_cost,
+            "energy": self.power_heater.sum(axis=1),
+            "congestion_payment": self.congestion_payment,
+            "final_change": self.building_convergence["change"][:, -1]
+        })
+
+    def save(self, output_path: str, output_format: str = "csv", compression: str | None = None) -> None:
+        """Writes the schedules and the convergence of every building in a folder of its own, and the feeder, the
+        convergence of the coordination and the diagnostics of the buildings at the root of output_path
+
+        Parameters
+        ----------
+        output_path : str
+            folder to store the results of the fleet
+        output_format : str
+            format of the schedules: one csv per variable, or a single npz/parquet file
+        compression : str | None
+            compression of npz (any value) or parquet (name of the codec) files
+        """
+        os.makedirs(output_path, exist_ok=True)
+        pd.DataFrame({
+            "feeder_capacity": self.feeder_capacity,
+            "feeder_load": self.power_heater.sum(axis=0),
+            "feeder_price": self.feeder_price
+        }).to_csv(osp.join(output_path, "feeder.csv"))
+        pd.DataFrame(self.convergence).to_csv(osp.join(output_path, "convergence.csv"), index=False)
+        self.to_pandas().to_csv(osp.join(output_path, "buildings.csv"), index=False)
+        with open(osp.join(output_path, "fleet_summary.json"), "w") as summary_file:
+            json.dump(self.summary(), summary_file, indent=2)
+
+        for index, name in enumerate(self.names):
+            path = osp.join(output_path, name)
+            os.makedirs(path, exist_ok=True)
+            results = {
+                "temperature_house": self.temperature_house[index],
+                "power_heater": self.power_heater[index],
+                "objective_function": float(self.objective_function[index])
+            }
+            if output_format == "csv":
+                for key, val in results.items():
+                    pd.Series(val).to_csv(f"{osp.join(path, key)}.csv")
+            else:
+                save_results(results, path, output_format, {"building": name}, compression)
+            pd.DataFrame({
+                "iteration": self.convergence["iteration"],
+                **{key: val[index] for key, val in self.building_convergence.items()}
+            }).to_csv(osp.join(path, "convergence.csv"), index=False)
+
+
+class FleetCoordinator:
+    """Schedules the heaters of buildings whose total power must stay under the capacity of their feeder
+
+    The buildings only share the capacity constraint, which is priced by the alternating direction method of
+    multipliers (ADMM, in its sharing form): every iteration, each building re-solves its own problem with the price
+    of the feeder added to its cost of electricity and a proximal term around its previous schedule, then the price
+    rises where the feeder is overloaded. The problem of a building is separable over the time-steps, so it is solved
+    in closed form over the power range of VectorisedSolver, and the buildings are split into one chunk per worker
+    process. Every iteration, the schedules are scaled down towards their minimum power where the feeder is still
+    overloaded, which gives a feasible fleet schedule (an upper bound), and the prices give the Lagrangian lower bound
+    of the coordinated problem: the iterations stop when the relative gap between both is at most `tolerance`.
+    """
+    tolerance_feasibility: float = 1e-9
+
+    def __init__(
+            self,
+            buildings: dict[str, Inputs],
+            feeder_capacity: npt.ArrayLike,
+            rho: float | None = None,
+            tolerance: float = 1e-4,
+            max_iterations: int = 1000,
+            workers: int | None = None
+    ) -> None:
+        """Constructor
+
+        Parameters
+        ----------
+        buildings : dict[str, Inputs]
+            inputs of every building, all with the same time-steps
+        feeder_capacity : npt.ArrayLike
+            maximum total power of the heaters in kW (a scalar, or one value per time-step)
+        rho : float | None
+            penalty of the proximal terms, in units of cost per kW squared (the average cost of electricity of a kW
+            over a time-step divided by the average width of the power ranges if None)
+        tolerance : float
+            maximum relative gap between the cost of the fleet schedule and the lower bound
+        max_iterations : int
+            maximum number of iterations
+        workers : int | None
+            number of processes updating the schedules of the buildings (number of CPUs if None)
+        """
+        if not buildings:
+            raise ValueError("The fleet has no buildings.")
+        first = next(iter(buildings.values()))
+        for name, inputs in buildings.items():
+            if (len(inputs.horizon), inputs.step_size, inputs.conversion_factor) != (
+                    len(first.horizon), first.step_size, first.conversion_factor
+            ):
+                raise ValueError(
+                    f"Building '{name}' does not have the time-steps and the conversion factor of the fleet."
+                )
+            if inputs.power_levels is not None:
+                raise SolverError(f"The fleet coordinator cannot solve the discrete modes of the heater of '{name}'.")
+        self._buildings = buildings
+        self._names = list(buildings)
+        self._feeder_capacity = np.array(
+            np.broadcast_to(np.asarray(feeder_capacity, dtype=float), first.horizon.shape)
+        )
+        self._scale = first.step_size * first.conversion_factor
+        self._rho = rho
+        self._tolerance = tolerance
+        self._max_iterations = max_iterations
+        self._workers = workers or os.cpu_count() or 1
+        self.statistics: dict = {}
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}(n_buildings={len(self._names)}, rho={self._rho}, tolerance={self._tolerance}, "
+            f"max_iterations={self._max_iterations})"
+        )
+
+    def __call__(self) -> FleetResults:
+        """Coordinates the buildings
+
+        Returns
+        -------
+        results : FleetResults
+            coordinated schedules and convergence
+        """
+        start = time.perf_counter()
+        cost, lower, upper = self.__building_problems()
+        capacity = self._feeder_capacity
+        n_buildings = len(self._names)
+        rho = self._rho or np.abs(cost).mean() / max(float((upper - lower).mean()), self.tolerance_feasibility)
+
+        # Uncoordinated optimum of every building, the first schedules of the iterations
+        power_heater = np.where(cost >= 0, lower, upper)
+        uncoordinated_cost = (cost * power_heater).sum(axis=1)
+        average = power_heater.mean(axis=0)
+        share = np.minimum(average, capacity / n_buildings)
+        price = np.zeros_like(capacity)
+        feasible = self.__scale_down(power_heater, lower, capacity)
+        history = {key: [] for key in ("iteration", "overload", "price_change", "objective", "lower_bound")}
+        building_history = {"change": [], "cost": []}
+        self.__record(history, 0, feasible, cost, lower, upper, price, capacity, power_heater, np.zeros_like(price))
+        building_history["change"].append(np.zeros(n_buildings))
+        building_history["cost"].append(uncoordinated_cost)
+
+        chunks = np.array_split(np.arange(n_buildings), min(self._workers, n_buildings))
+        iteration = 0
+        with SharedSeriesStore() as store, ProcessPoolExecutor(max_workers=self._workers) as executor:
+            # The problems of the buildings are sent once to the shared memory, only the schedules are sent every
+            # iteration
+            problems = [
+                tuple(store.put(matrix[chunk].ravel()) for matrix in (cost, lower, upper)) for chunk in chunks
+            ]
+            while not self.__is_converged(history) and iteration < self._max_iterations:
+                iteration += 1
+                # Scaled form: the price of the feeder is rho times the running sum of the average overloads
+                offset = share - average - price / rho
+                previous = power_heater
+                power_heater = np.concatenate(list(executor.map(
+                    update_schedules,
+                    *zip(*problems),
+                    [previous[chunk] for chunk in chunks],
+                    [offset] * len(chunks),
+                    [rho] * len(chunks)
+                )))
+                average = power_heater.mean(axis=0)
+                share = np.minimum(average + price / rho, capacity / n_buildings)
+                previous_price, price = price, price + rho * (average - share)
+                feasible = self.__scale_down(power_heater, lower, capacity)
+                self.__record(
+                    history, iteration, feasible, cost, lower, upper, price, capacity, power_heater,
+                    price - previous_price
+                )
+                building_history["change"].append(np.abs(power_heater - previous).max(axis=1))
+                building_history["cost"].append((cost * power_heater).sum(axis=1))
+
+        convergence = {key: np.asarray(val) for key, val in history.items()}
+        convergence["relative_gap"] = self.__relative_gap(convergence["objective"], convergence["lower_bound"])
+        temperature_house = np.stack([
+            inputs.temperature_ambient + inputs.coefficient_heat_div_cool * feasible[index]
+            for index, inputs in enumerate(self._buildings.values())
+        ])
+        temperature_house[:, 0] = [inputs.initial_temperature for inputs in self._buildings.values()]
+        self.statistics = {
+            "solver": "admm",
+            "Number of buildings": n_buildings,
+            "Number of iterations": iteration,
+            "Penalty": float(rho),
+            "Relative gap": float(convergence["relative_gap"][-1]),
+            "Time": time.perf_counter() - start
+        }
+
+        return FleetResults(
+            names=self._names,
+            temperature_house=temperature_house,
+            power_heater=feasible,
+            objective_function=(cost * feasible).sum(axis=1),
+            uncoordinated_cost=uncoordinated_cost,
+            feeder_capacity=capacity,
+            feeder_price=price / self._scale,
+            congestion_payment=feasible @ price,
+            lower_bound=float(convergence["lower_bound"][-1]),
+            convergence=convergence,
+            building_convergence={key: np.stack(val, axis=1) for key, val in building_history.items()}
+        )
+
+    def __building_problems(self) -> tuple[npt.NDArray, npt.NDArray, npt.NDArray]:
+        """Gathers the cost and the feasible power range of every building, and checks that the fleet is feasible
+
+        Returns
+        -------
+        cost, lower, upper : tuple[npt.NDArray, npt.NDArray, npt.NDArray]
+            (buildings x time-steps) cost of a kW, and minimum and maximum power of the heaters
+        """
+        cost, lower, upper = [], [], []
+        infeasible = []
+        for name, inputs in self._buildings.items():
+            minimum, maximum = VectorisedSolver(inputs)._feasible_power_range()
+            temperature_min, temperature_max = inputs.temperature_bounds
+            if (minimum > maximum + self.tolerance_feasibility).any() or not (
+                    temperature_min <= inputs.initial_temperature <= temperature_max
+            ):
+                infeasible.append(name)
+            cost.append(inputs.cost_electricity * self._scale)
+            lower.append(minimum)
+            upper.append(np.maximum(minimum, maximum))
+        if infeasible:
+            raise SolverError(
+                f"Problem not properly solved.\nStatus: infeasible\nInfeasible buildings: {infeasible}."
+            )
+
+        lower = np.stack(lower)
+        overloaded = np.flatnonzero(lower.sum(axis=0) > self._feeder_capacity + self.tolerance_feasibility)
+        if len(overloaded):
+            raise SolverError(
+                f"Problem not properly solved.\nStatus: infeasible\n"
+                f"The minimum power of the buildings exceeds the feeder capacity at {len(overloaded)} time-steps: "
+                f"{overloaded[:10].tolist()}{' ...' if len(overloaded) > 10 else ''}."
+            )
+
+        return np.stack(cost), lower, np.stack(upper)
+
+    @staticmethod
+    def __scale_down(power_heater: npt.NDArray, lower: npt.NDArray, capacity: npt.NDArray) -> npt.NDArray:
+        """Scales the schedules towards the minimum power of the buildings where the feeder is overloaded
+
+        Parameters
+        ----------
+        power_heater : npt.NDArray
+            (buildings x time-steps) power of the heaters
+        lower : npt.NDArray
+            (buildings x time-steps) minimum power of the heaters
+        capacity : npt.NDArray
+            capacity of the feeder at every time-step
+
+        Returns
+        -------
+        power_heater : npt.NDArray
+            schedules within the capacity of the feeder
+        """
+        load = power_heater.sum(axis=0)
+        minimum = lower.sum(axis=0)
+        overloaded = load > capacity
+        factor = np.ones_like(capacity)
+        factor[overloaded] = (capacity[overloaded] - minimum[overloaded]) / (load[overloaded] - minimum[overloaded])
+
+        return lower + (power_heater - lower) * factor
+
+    def __record(
+            self,
+            history: dict[str, list],
+            iteration: int,
+            feasible: npt.NDArray,
+            cost: npt.NDArray,
+            lower: npt.NDArray,
+            upper: npt.NDArray,
+            price: npt.NDArray,
+            capacity: npt.NDArray,
+            power_heater: npt.NDArray,
+            price_change: npt.NDArray
+    ) -> None:
+        """Records the convergence indicators of an iteration
+
+        The lower bound is the Lagrangian of the coordinated problem with the prices of the feeder, minimised over the
+        power ranges of the buildings independently.
+
+        Parameters
+        ----------
+        history : dict[str, list]
+            indicators of the previous iterations
+        iteration : int
+            number of the iteration
+        feasible : npt.NDArray
+            schedules scaled down within the capacity of the feeder
+        cost : npt.NDArray
+            cost of a kW of every building
+        lower : npt.NDArray
+            minimum power of the heaters
+        upper : npt.NDArray
+            maximum power of the heaters
+        price : npt.NDArray
+            price of a kW of the feeder capacity, in the units of cost
+        capacity : npt.NDArray
+            capacity of the feeder
+        power_heater : npt.NDArray
+            schedules of the iteration
+        price_change : npt.NDArray
+            change of the price of the feeder over the iteration
+        """
+        priced = cost + price
+        history["iteration"].append(iteration)
+        history["overload"].append(float(np.maximum(power_heater.sum(axis=0) - capacity, 0).max(initial=0)))
+        history["price_change"].append(float(np.abs(price_change).max(initial=0) / self._scale))
+        history["objective"].append(float((cost * feasible).sum()))
+        history["lower_bound"].append(float(np.minimum(priced * lower, priced * upper).sum() - price @ capacity))
+
+    def __is_converged(self, history: dict[str, list]) -> bool:
+        """Checks the relative gap of the last iteration
+
+        Parameters
+        ----------
+        history : dict[str, list]
+            indicators of the iterations
+
+        Returns
+        -------
+        is_converged : bool
+            flag of convergence
+        """
+        return self.__relative_gap(history["objective"][-1], history["lower_bound"][-1]) <= self._tolerance
+
+    @staticmethod
+    def __relative_gap(objective: npt.ArrayLike, lower_bound: npt.ArrayLike) -> npt.NDArray:
+        """Gap between the cost of the fleet and the lower bound, relative to the cost
+
+        Parameters
+        ----------
+        objective : npt.ArrayLike
+            cost of the fleet schedule
+        lower_bound : npt.ArrayLike
+            lower bound of the optimum
+
+        Returns
+        -------
+        gap : npt.NDArray
+            relative gap (zero when both are zero)
+        """
+        objective, lower_bound = np.asarray(objective), np.asarray(lower_bound)
+        scale = np.maximum(np.abs(objective), np.abs(lower_bound))
+
+        return np.divide(
+            objective - lower_bound, scale, out=np.zeros_like(scale, dtype=float), where=scale > 0
+        )
+
+
+def update_schedules(
+        cost: npt.NDArray,
+        lower: npt.NDArray,
+        upper: npt.NDArray,
+        previous: npt.NDArray,
+        offset: npt.NDArray,
+        rho: float
+) -> npt.NDArray:
+    """Minimises the cost plus the proximal term of every building of a chunk (in a worker process)
+
+    The problem of every building and time-step is a one-dimensional quadratic over the power range, whose minimum is
+    the unconstrained minimum clipped to the range.
+
+    Parameters
+    ----------
+    cost : npt.NDArray
+        flattened cost of a kW of the buildings of the chunk
+    lower : npt.NDArray
+        flattened minimum power of the heaters
+    upper : npt.NDArray
+        flattened maximum power of the heaters
+    previous : npt.NDArray
+        (buildings x time-steps) schedules of the previous iteration
+    offset : npt.NDArray
+        shift of the proximal centre at every time-step, common to all the buildings
+    rho : float
+        penalty of the proximal terms
+
+    Returns
+    -------
+    power_heater : npt.NDArray
+        (buildings x time-steps) schedules of the iteration
+    """
+    shape = previous.shape
+
+    return np.clip(
+        previous + offset - cost.reshape(shape) / rho, lower.reshape(shape), upper.reshape(shape)
+    )
+
+
+def read_fleet_file(fleet_file_path: str) -> tuple[dict[str, Inputs], float | npt.NDArray]:
+    """Reads TOML file describing the buildings of a feeder
+
+    The file lists the inputs files of the buildings in "buildings" (paths, directories or glob patterns relative to
+    the fleet file), and the capacity of the feeder in kW, either as a number in "feeder_capacity" or as a series in
+    "feeder_capacity_file" (as the series of the inputs files). Every building is named after its inputs file.
+
+    Parameters
+    ----------
+    fleet_file_path : str
+        path to the TOML fleet file
+
+    Returns
+    -------
+    buildings, feeder_capacity : tuple[dict[str, Inputs], float | npt.NDArray]
+        inputs of every building and capacity of the feeder
+    """
+    directory = osp.dirname(fleet_file_path)
+    data = read_input_file(fleet_file_path)
+    paths = set()
+    for pattern in data["buildings"]:
+        pattern = osp.join(directory, pattern)
+        paths.update(glob.glob(osp.join(pattern, "*.toml")) if osp.isdir(pattern) else glob.glob(pattern))
+    if not paths:
+        raise ValueError(f"No inputs file matches the buildings of {fleet_file_path}.")
+
+    root = osp.commonpath([osp.dirname(osp.abspath(path)) for path in paths])
+    buildings = {}
+    for path in sorted(paths):
+        inputs = Inputs(**resolve_series_paths(read_input_file(path), osp.dirname(path)))
+        buildings[osp.splitext(osp.relpath(osp.abspath(path), root))[0]] = inputs
+
+    if "feeder_capacity_file" in data:
+        first = next(iter(buildings.values()))
+        source = resolve_series_paths(
+            {"cost_electricity_file": data["feeder_capacity_file"]}, directory
+        )["cost_electricity_file"]
+        feeder_capacity = load_series(source, "feeder_capacity", first.step_size, len(first.horizon))
+    else:
+        feeder_capacity = float(data["feeder_capacity"])
+
+    return buildings, feeder_capacity
+
+
+def run_fleet(
+        fleet_file: str,
+        output_path: str,
+        rho: float | None = None,
+        tolerance: float = 1e-4,
+        max_iterations: int = 1000,
+        workers: int | None = None,
+        output_format: str = "csv",
+        compression: str | None = None
+) -> FleetResults:
+    """Coordinates the buildings of a feeder and writes their schedules
+
+    Parameters
+    ----------
+    fleet_file : str
+        path to TOML fleet file
+    output_path : str
+        folder to store the results of the fleet
+    rho : float | None
+        penalty of the proximal terms (derived from the costs and power ranges if None)
+    tolerance : float
+        maximum relative gap between the cost of the fleet schedule and the lower bound
+    max_iterations : int
+        maximum number of iterations
+    workers : int | None
+        number of worker processes (number of CPUs if None)
+    output_format : str
+        format of the schedules: one csv per variable, or a single npz/parquet file
+    compression : str | None
+        compression of npz (any value) or parquet (name of the codec) files
+
+    Returns
+    -------
+    results : FleetResults
+        coordinated schedules and convergence
+    """
+    buildings, feeder_capacity = read_fleet_file(fleet_file)
+    coordinator = FleetCoordinator(buildings, feeder_capacity, rho, tolerance, max_iterations, workers)
+    results = coordinator()
+    results.save(output_path, output_format, compression)
+
+    return results
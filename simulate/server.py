@@ -0,0 +1,511 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from http import HTTPStatus
+
+import numpy as np
+import toml
+
+from simulate.core import Inputs, Optimiser, Simulator
+
+MAX_BODY_SIZE = 2**24
+MAX_TIME_STEPS = 10**6
+# Inputs read from local files, which clients must not choose
+FILE_KEYS = ("temperature_ambient_file", "cost_electricity_file")
+# Small instance solved by every worker when it starts, to load pyomo, the solver and their caches before any request
+WARM_UP_INPUTS = {
+    "initial_temperature": 22,
+    "temperature_bounds": [21, 25],
+    "power_bounds": [0, 8],
+    "cooling_coefficient": 0.2,
+    "heating_coefficient": 0.25,
+    "cardinality_horizon": 1,
+    "step_size": 0.25,
+    "conversion_factor": 1e-3,
+    "variables": ["temperature_house", "power_heater"]
+}
+
+
+class BadRequestError(Exception):
+    """Raised when a request cannot be parsed
+    """
+
+
+@dataclass
+class PendingRequest:
+    """Inputs of a simulation waiting for a worker, and the future receiving its results
+    """
+    payload: dict
+    future: asyncio.Future
+    received: float = field(default_factory=time.perf_counter)
+
+
+class ServerMetrics:
+    """Counters and latency percentiles over the most recent requests
+    """
+    percentiles = (50, 90, 95, 99)
+
+    def __init__(self, window: int = 10000) -> None:
+        """Constructor
+
+        Parameters
+        ----------
+        window : int
+            number of most recent requests the percentiles are computed on
+        """
+        self.started = time.time()
+        self.counts = {"requests": 0, "ok": 0, "errors": 0, "rejected": 0, "pool_restarts": 0}
+        self.batches = 0
+        self._latencies = {name: deque(maxlen=window) for name in ("total", "queue", "solve")}
+        self._batch_sizes = deque(maxlen=window)
+
+    def record(self, total: float, queue: float, solve: float) -> None:
+        """Records the latencies of a request, in seconds
+
+        Parameters
+        ----------
+        total : float
+            time from the reception of the request to its response
+        queue : float
+            time waiting for a worker
+        solve : float
+            time solving the simulation in the worker
+        """
+        for name, latency in zip(("total", "queue", "solve"), (total, queue, solve)):
+            self._latencies[name].append(latency)
+
+    def record_batch(self, size: int) -> None:
+        """Records the size of a batch sent to the workers
+        """
+        self.batches += 1
+        self._batch_sizes.append(size)
+
+    def to_dict(self, **gauges: int) -> dict:
+        """Summarises the metrics
+
+        Parameters
+        ----------
+        gauges : int
+            current values to report along with the counters (queued requests, busy workers ...)
+
+        Returns
+        -------
+        metrics : dict
+            counters, gauges, and percentiles of the latencies (in milliseconds) and of the sizes of the batches
+        """
+        latencies = {}
+        for name, values in self._latencies.items():
+            if not values:
+                continue
+            values = 1e3 * np.fromiter(values, dtype=float, count=len(values))
+            latencies[name] = {
+                **{f"p{q}": float(val) for q, val in zip(self.percentiles, np.percentile(values, self.percentiles))},
+                "mean": float(values.mean()),
+                "max": float(values.max())
+            }
+
+        return {
+            "uptime": time.time() - self.started,
+            **self.counts,
+            **gauges,
+            "batches": self.batches,
+            "mean_batch_size": float(np.mean(self._batch_sizes)) if self._batch_sizes else None,
+            "latency_ms": latencies
+        }
+
+
+class SimulationServer:
+    """Resident HTTP server solving simulations on a pool of warm worker processes
+
+    Requests are queued (up to `max_pending`, beyond which they are rejected), grouped into batches of up to
+    `max_batch_size` requests arriving within `batch_wait` seconds, and every batch is solved by one worker. At most
+    one batch per worker is in flight, so the requests wait in the queue, where they can still be batched, rather than
+    in the pool. If a worker dies, the pool is replaced and the requests of the batches it broke get 503.
+
+    Endpoints:
+        POST /simulate: inputs in the schema of the TOML files, as JSON or TOML, returns the schedules as JSON
+        GET /metrics: counters and latency percentiles
+        GET /health: liveness
+    """
+    def __init__(
+            self,
+            solver: str = "cbc",
+            workers: int | None = None,
+            max_batch_size: int = 8,
+            batch_wait: float = 0.0,
+            max_pending: int = 1024
+    ) -> None:
+        """Constructor
+
+        Parameters
+        ----------
+        solver : str
+            solver name
+        workers : int | None
+            number of worker processes (number of CPUs if None)
+        max_batch_size : int
+            maximum number of requests solved by a worker at once
+        batch_wait : float
+            maximum time, in seconds, to wait for more requests to fill a batch
+        max_pending : int
+            maximum number of queued requests, beyond which requests are rejected with 503
+        """
+        self._solver = solver
+        self._workers = workers or os.cpu_count() or 1
+        self._max_batch_size = max_batch_size
+        self._batch_wait = batch_wait
+        self._max_pending = max_pending
+        self.metrics = ServerMetrics()
+        self._executor: ProcessPoolExecutor | None = None
+        self._queue: asyncio.Queue | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._busy_workers = 0
+        self._tasks: set[asyncio.Task] = set()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8080, socket_path: str | None = None) -> None:
+        """Starts the workers and serves requests until SIGINT or SIGTERM
+
+        Parameters
+        ----------
+        host : str
+            address to listen on
+        port : int
+            port to listen on
+        socket_path : str | None
+            Unix socket to listen on instead of the address and port
+        """
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signal_number, stop.set)
+
+        self._queue = asyncio.Queue(maxsize=self._max_pending)
+        self._slots = asyncio.Semaphore(self._workers)
+        self._executor = self.__create_executor()
+        try:
+            # Spawns (and warms up) all the workers before accepting requests
+            await asyncio.gather(*(loop.run_in_executor(self._executor, os.getpid) for _ in range(self._workers)))
+            dispatcher = asyncio.create_task(self.__dispatch())
+            if socket_path is None:
+                server = await asyncio.start_server(self.__handle, host, port)
+            else:
+                server = await asyncio.start_unix_server(self.__handle, socket_path)
+            async with server:
+                print(f"Listening on {socket_path or f'http://{host}:{port}'} with {self._workers} workers...")
+                await stop.wait()
+            dispatcher.cancel()
+        finally:
+            self._executor.shutdown(cancel_futures=True)
+            if socket_path is not None and os.path.exists(socket_path):
+                os.remove(socket_path)
+
+    def __create_executor(self) -> ProcessPoolExecutor:
+        """Creates the pool of workers, started from a fresh interpreter (forkserver, or spawn where it is missing)
+        rather than forked from the event loop, whose signal handlers they would inherit
+
+        Returns
+        -------
+        executor : ProcessPoolExecutor
+            pool of warm workers
+        """
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+        return ProcessPoolExecutor(
+            max_workers=self._workers, mp_context=multiprocessing.get_context(method), initializer=_warm_up,
+            initargs=(self._solver,)
+        )
+
+    async def __dispatch(self) -> None:
+        """Groups the queued requests into batches and sends them to the free workers
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self._batch_wait
+            while len(batch) < self._max_batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+            task = asyncio.create_task(self.__run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def __run_batch(self, batch: list[PendingRequest]) -> None:
+        """Solves a batch of requests on a worker and resolves their futures
+
+        Parameters
+        ----------
+        batch : list[PendingRequest]
+            requests of the batch
+        """
+        self.metrics.record_batch(len(batch))
+        self._busy_workers += 1
+        sent = time.perf_counter()
+        executor = self._executor
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                executor, solve_payloads, [request.payload for request in batch], self._solver
+            )
+        except BrokenProcessPool:
+            # Replaced once, by the first of the batches the dead worker broke
+            if self._executor is executor:
+                self.metrics.counts["pool_restarts"] += 1
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = self.__create_executor()
+            results = [
+                {"error": "A worker process died, the request was not solved.", "status": 503, "solve_time": 0.0}
+                for _ in batch
+            ]
+        except Exception as error:
+            results = [{"error": f"{type(error).__name__}: {error}", "solve_time": 0.0} for _ in batch]
+        finally:
+            self._busy_workers -= 1
+            self._slots.release()
+
+        for request, result in zip(batch, results):
+            if not request.future.done():
+                request.future.set_result((result, sent - request.received))
+
+    async def __handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serves the requests of a (keep-alive) connection
+
+        Parameters
+        ----------
+        reader : asyncio.StreamReader
+            stream of the requests
+        writer : asyncio.StreamWriter
+            stream of the responses
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                is_keep_alive = True
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                    headers = await self.__read_headers(reader)
+                    is_keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                    size = int(headers.get("content-length", 0))
+                    if size > MAX_BODY_SIZE:
+                        status, response = HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Request body too large."}
+                        is_keep_alive = False
+                    else:
+                        body = await reader.readexactly(size)
+                        status, response = await self.__route(method, target.split("?")[0], headers, body)
+                except (BadRequestError, ValueError) as error:
+                    status, response = HTTPStatus.BAD_REQUEST, {"error": str(error)}
+                    is_keep_alive = False
+                await self.__respond(writer, status, response, is_keep_alive)
+                if not is_keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def __read_headers(reader: asyncio.StreamReader) -> dict[str, str]:
+        """Reads the headers of a request
+
+        Returns
+        -------
+        headers : dict[str, str]
+            headers, with lower case names
+        """
+        headers = {}
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, separator, value = line.decode("latin-1").partition(":")
+            if not separator:
+                raise BadRequestError(f"Malformed header: {line!r}.")
+            headers[name.strip().lower()] = value.strip()
+
+        return headers
+
+    async def __route(self, method: str, path: str, headers: dict[str, str], body: bytes) -> tuple[HTTPStatus, dict]:
+        """Dispatches a request to its endpoint
+
+        Returns
+        -------
+        status, response : tuple[HTTPStatus, dict]
+            status and JSON body of the response
+        """
+        if path == "/simulate" and method == "POST":
+            return await self.__simulate(self.__parse_payload(headers, body))
+        if path == "/metrics" and method == "GET":
+            return HTTPStatus.OK, self.metrics.to_dict(
+                queued=self._queue.qsize(), busy_workers=self._busy_workers, workers=self._workers
+            )
+        if path == "/health" and method == "GET":
+            return HTTPStatus.OK, {"status": "ok"}
+        if path in ("/simulate", "/metrics", "/health"):
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": f"Method {method} not allowed on {path}."}
+
+        return HTTPStatus.NOT_FOUND, {"error": f"Unknown endpoint {path}."}
+
+    async def __simulate(self, payload: dict) -> tuple[HTTPStatus, dict]:
+        """Queues a simulation and waits for its results
+
+        Parameters
+        ----------
+        payload : dict
+            inputs of the simulation, in the schema of the TOML files
+
+        Returns
+        -------
+        status, response : tuple[HTTPStatus, dict]
+            status and JSON body of the response
+        """
+        self.metrics.counts["requests"] += 1
+        request = PendingRequest(payload, asyncio.get_running_loop().create_future())
+        try:
+            self._queue.put_nowait(request)
+        except asyncio.QueueFull:
+            self.metrics.counts["rejected"] += 1
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"error": "Too many pending requests."}
+
+        result, queue_time = await request.future
+        solve_time = result.pop("solve_time")
+        self.metrics.record(time.perf_counter() - request.received, queue_time, solve_time)
+        if "error" in result:
+            self.metrics.counts["errors"] += 1
+            return HTTPStatus(result.pop("status", HTTPStatus.UNPROCESSABLE_ENTITY)), result
+        self.metrics.counts["ok"] += 1
+
+        return HTTPStatus.OK, result
+
+    @staticmethod
+    def __parse_payload(headers: dict[str, str], body: bytes) -> dict:
+        """Parses the inputs of a simulation, as JSON or TOML (with a TOML content type)
+
+        The series cannot be read from files of the server, and the number of time-steps is at most MAX_TIME_STEPS.
+
+        Returns
+        -------
+        payload : dict
+            inputs of the simulation
+        """
+        try:
+            text = body.decode()
+            payload = toml.loads(text) if "toml" in headers.get("content-type", "") else json.loads(text)
+        except (UnicodeDecodeError, json.JSONDecodeError, toml.TomlDecodeError) as error:
+            raise BadRequestError(f"Invalid payload: {error}.") from error
+        if not isinstance(payload, dict):
+            raise BadRequestError("The payload must be an object with the inputs of the simulation.")
+        if forbidden := [key for key in FILE_KEYS if key in payload]:
+            raise BadRequestError(f"The series cannot be read from files: remove {', '.join(forbidden)}.")
+        try:
+            n_steps = float(payload.get("cardinality_horizon", 0)) / float(payload.get("step_size", 1))
+        except (TypeError, ValueError, ZeroDivisionError) as error:
+            raise BadRequestError(f"Invalid horizon: {error}.") from error
+        if not n_steps <= MAX_TIME_STEPS:
+            raise BadRequestError(f"The horizon has {n_steps:.0f} time-steps, more than {MAX_TIME_STEPS}.")
+
+        return payload
+
+    @staticmethod
+    async def __respond(
+            writer: asyncio.StreamWriter, status: HTTPStatus, response: dict, is_keep_alive: bool
+    ) -> None:
+        """Writes a JSON response
+        """
+        body = json.dumps(response).encode()
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if is_keep_alive else 'close'}\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+
+
+def solve_payloads(payloads: list[dict], solver: str) -> list[dict]:
+    """Solves a batch of simulations (in a worker process)
+
+    Parameters
+    ----------
+    payloads : list[dict]
+        inputs of the simulations, in the schema of the TOML files
+    solver : str
+        solver name
+
+    Returns
+    -------
+    results : list[dict]
+        schedules and objective of every simulation, or its error, and the time spent solving it
+    """
+    results = []
+    for payload in payloads:
+        start = time.perf_counter()
+        try:
+            inputs = Inputs(**payload)
+            simulation = Simulator(inputs=inputs, optimiser=Optimiser(), output_path=None, solver=solver).simulate()
+            result = {key: val.tolist() if key in inputs.variables else val for key, val in simulation.items()}
+        except Exception as error:
+            result = {"error": f"{type(error).__name__}: {' '.join(str(error).split())}"}
+        result["solve_time"] = time.perf_counter() - start
+        results.append(result)
+
+    return results
+
+
+def _warm_up(solver: str) -> None:
+    """Solves a small instance when a worker starts, so the first requests do not pay for imports and solver startup
+    """
+    solve_payloads([WARM_UP_INPUTS], solver)
+
+
+def run_server(
+        host: str,
+        port: int,
+        socket_path: str | None,
+        solver: str,
+        workers: int | None,
+        max_batch_size: int,
+        batch_wait: float,
+        max_pending: int
+) -> None:
+    """Runs the simulation server until it is interrupted
+
+    Parameters
+    ----------
+    host : str
+        address to listen on
+    port : int
+        port to listen on
+    socket_path : str | None
+        Unix socket to listen on instead of the address and port
+    solver : str
+        solver name
+    workers : int | None
+        number of worker processes (number of CPUs if None)
+    max_batch_size : int
+        maximum number of requests solved by a worker at once
+    batch_wait : float
+        maximum time, in seconds, to wait for more requests to fill a batch
+    max_pending : int
+        maximum number of queued requests, beyond which requests are rejected
+    """
+    server = SimulationServer(
+        solver=solver,
+        workers=workers,
+        max_batch_size=max_batch_size,
+        batch_wait=batch_wait,
+        max_pending=max_pending
+    )
+    asyncio.run(server.serve(host=host, port=port, socket_path=socket_path))
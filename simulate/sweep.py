@@ -0,0 +1,310 @@
+import hashlib
+import itertools
+import json
+import os
+import os.path as osp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import fields
+
+import numpy as np
+import numpy.typing as npt
+
+from simulate.core import Inputs, Optimiser, Simulator
+from simulate.core.shared import SharedSeriesStore
+from .utils import read_input_file, resolve_series_paths
+
+RESULTS_FILE = "sweep_results.npz"
+
+
+def read_sweep_file(sweep_file_path: str) -> tuple[dict, dict[str, list]]:
+    """Reads TOML file describing a parameter sweep
+
+    The file contains the fields of a regular inputs file (or a "base" entry with the path, relative to the sweep
+    file, of an inputs file) and a [sweep] table mapping the name of each swept field to either a list of values or
+    a {start, stop, num} table of evenly spaced values.
+
+    Parameters
+    ----------
+    sweep_file_path : str
+        Path to the TOML sweep file
+
+    Returns
+    -------
+    base, grid : tuple[dict, dict[str, list]]
+        base inputs and values taken by each swept field
+    """
+    directory = osp.dirname(sweep_file_path)
+    data = resolve_series_paths(read_input_file(sweep_file_path), directory)
+    sweep = data.pop("sweep")
+    base = {}
+    if "base" in data:
+        base_file_path = osp.join(directory, data.pop("base"))
+        base = resolve_series_paths(read_input_file(base_file_path), osp.dirname(base_file_path))
+    base.update(data)
+
+    grid = {}
+    for key, values in sweep.items():
+        if isinstance(values, dict):
+            values = np.linspace(values["start"], values["stop"], values["num"]).tolist()
+        grid[key] = list(values)
+
+    return base, grid
+
+
+def expand_grid(base: dict, grid: dict[str, list]) -> list[Inputs]:
+    """Expands the cartesian product of the swept values into inputs objects
+
+    Parameters
+    ----------
+    base : dict
+        base inputs
+    grid : dict[str, list]
+        values taken by each swept field
+
+    Returns
+    -------
+    points : list[Inputs]
+        inputs object of every point of the sweep
+    """
+    points = []
+    for values in itertools.product(*grid.values()):
+        points.append(Inputs(**{**base, **dict(zip(grid.keys(), values))}))
+
+    return points
+
+
+def point_key(inputs: Inputs, solver: str, dtype: npt.DTypeLike | None = None) -> str:
+    """Identifies a point of the sweep by the hash of its inputs, the solver and the type of the series
+
+    Parameters
+    ----------
+    inputs : Inputs
+        inputs of the point
+    solver : str
+        solver name
+    dtype : npt.DTypeLike | None
+        type of the time series (unchanged if None)
+
+    Returns
+    -------
+    key : str
+        hexadecimal digest
+    """
+    data = input_fields(inputs)
+    data["solver"] = solver
+    if dtype is not None:
+        data["dtype"] = str(np.dtype(dtype))
+
+    return hashlib.sha1(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def input_fields(inputs: Inputs) -> dict:
+    """Gets the fields needed to create an inputs object
+
+    Parameters
+    ----------
+    inputs : Inputs
+        inputs object
+
+    Returns
+    -------
+    data : dict
+        fields of the inputs object
+    """
+    return {field.name: getattr(inputs, field.name) for field in fields(inputs) if field.init}
+
+
+def solve_point(inputs: Inputs, solver: str) -> dict[str, npt.NDArray | float]:
+    """Solves one point of the sweep without writing any file
+
+    The inputs are attached to the shared-memory store of the sweep, so the worker process maps their time series
+    instead of receiving or loading a copy.
+
+    Parameters
+    ----------
+    inputs : Inputs
+        inputs of the point
+    solver : str
+        solver name
+
+    Returns
+    -------
+    results : dict[str, npt.NDArray | float]
+        schedules and objective of the point
+    """
+    results = Simulator(inputs=inputs, optimiser=Optimiser(), output_path=None, solver=solver).simulate()
+
+    return dict(results)
+
+
+class SweepStore:
+    """Columnar store (single npz file) with the results of all the points of a sweep
+
+    The schedules of the points, whose horizons differ when the step size or the horizon is swept, are concatenated
+    into one flat array per variable, and the schedule of point i is at offsets[i]:offsets[i + 1]. Failed points are
+    stored with their error (status "failed", NaN objective and empty schedules), so that a resumed sweep does not
+    solve them again.
+    """
+    def __init__(self, output_path: str, swept: list[str], variables: list[str]) -> None:
+        """Constructor, loads the results already in output_path (if any)
+
+        Parameters
+        ----------
+        output_path : str
+            folder to store the results of the sweep
+        swept : list[str]
+            names of the swept fields
+        variables : list[str]
+            names of the variables whose schedules are stored
+        """
+        self._path = osp.join(output_path, RESULTS_FILE)
+        self._swept = swept
+        self._variables = variables
+        self._columns: dict[str, list] = {
+            name: [] for name in ["key", "status", "message", *swept, "objective_function", *variables]
+        }
+        if osp.exists(self._path):
+            with np.load(self._path) as data:
+                for name in ["key", "status", "message", *swept, "objective_function"]:
+                    self._columns[name] = list(data[name])
+                for name in variables:
+                    self._columns[name] = np.split(data[name], data["offsets"][1:-1]) if len(data["key"]) else []
+        self._keys = set(self._columns["key"])
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys
+
+    def __len__(self) -> int:
+        return len(self._columns["key"])
+
+    def append(self, key: str, inputs: Inputs, results: dict[str, npt.NDArray | float]) -> None:
+        """Adds the results of one point
+
+        Parameters
+        ----------
+        key : str
+            identifier of the point
+        inputs : Inputs
+            inputs of the point
+        results : dict[str, npt.NDArray | float]
+            schedules and objective of the point
+        """
+        schedules = [results[name] for name in self._variables]
+        self.__append(key, inputs, "ok", "", results["objective_function"], schedules)
+
+    def append_failure(self, key: str, inputs: Inputs, message: str) -> None:
+        """Adds a point whose solve failed
+
+        Parameters
+        ----------
+        key : str
+            identifier of the point
+        inputs : Inputs
+            inputs of the point
+        message : str
+            error of the solve
+        """
+        self.__append(key, inputs, "failed", message, np.nan, [np.empty(0) for _ in self._variables])
+
+    def drop_failures(self) -> None:
+        """Removes the failed points, so that they are solved again
+        """
+        is_kept = [status != "failed" for status in self._columns["status"]]
+        for name, values in self._columns.items():
+            self._columns[name] = [value for value, keep in zip(values, is_kept) if keep]
+        self._keys = set(self._columns["key"])
+
+    def save(self) -> None:
+        """Writes the store atomically, so a killed sweep always leaves a readable checkpoint
+        """
+        schedules = self._columns[self._variables[0]] if self._variables else []
+        offsets = np.cumsum([0, *(len(schedule) for schedule in schedules)], dtype=np.int64)
+        columns = {
+            name: (
+                np.concatenate([np.asarray(value, dtype=float) for value in values]) if values else np.empty(0)
+            ) if name in self._variables else np.asarray(values)
+            for name, values in self._columns.items()
+        }
+        tmp_path = f"{self._path}.tmp.npz"
+        np.savez(tmp_path, **columns, offsets=offsets)
+        os.replace(tmp_path, self._path)
+
+    def __append(
+            self, key: str, inputs: Inputs, status: str, message: str, objective: float, schedules: list[npt.NDArray]
+    ) -> None:
+        """Adds one point to the columns
+        """
+        self._keys.add(key)
+        self._columns["key"].append(key)
+        self._columns["status"].append(status)
+        self._columns["message"].append(message)
+        for name in self._swept:
+            self._columns[name].append(getattr(inputs, name))
+        self._columns["objective_function"].append(objective)
+        for name, schedule in zip(self._variables, schedules):
+            self._columns[name].append(schedule)
+
+
+def run_sweep(
+        sweep_file: str,
+        output_path: str,
+        solver: str = "cbc",
+        workers: int | None = None,
+        checkpoint_every: int = 50,
+        dtype: npt.DTypeLike | None = None,
+        retry_failed: bool = False
+) -> SweepStore:
+    """Solves all the points of a sweep that are not in the results store yet, in parallel
+
+    Parameters
+    ----------
+    sweep_file : str
+        path to TOML sweep file
+    output_path : str
+        folder to store the results of the sweep
+    solver : str
+        solver to perform the matrix multiplication
+    workers : int | None
+        number of worker processes (number of CPUs if None)
+    checkpoint_every : int
+        number of solved points between two writes of the results store (at least 1)
+    dtype : npt.DTypeLike | None
+        type of the time series shared with the worker processes, e.g. np.float32 (unchanged if None)
+    retry_failed : bool
+        solve again the points that failed in a previous run (they are skipped otherwise)
+
+    Returns
+    -------
+    store : SweepStore
+        results of all the points of the sweep
+    """
+    if checkpoint_every < 1:
+        raise ValueError(f"The number of points between checkpoints must be at least 1, found {checkpoint_every}.")
+    os.makedirs(output_path, exist_ok=True)
+    base, grid = read_sweep_file(sweep_file)
+    points = expand_grid(base, grid)
+    store = SweepStore(output_path, swept=list(grid), variables=points[0].variables)
+    if retry_failed:
+        store.drop_failures()
+    pending = {point_key(inputs, solver, dtype): inputs for inputs in points}
+    pending = {key: inputs for key, inputs in pending.items() if key not in store}
+    print(f"{len(points)} points, {len(points) - len(pending)} already solved or failed.")
+
+    # Points with the same series share one copy of them
+    with SharedSeriesStore() as series, ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(solve_point, inputs.attach(series, dtype), solver): key for key, inputs in pending.items()
+        }
+        for n_done, future in enumerate(as_completed(futures), start=1):
+            key = futures[future]
+            try:
+                store.append(key, pending[key], future.result())
+            except Exception as error:
+                message = f"{type(error).__name__}: {' '.join(str(error).split())}"
+                print(f"[failed] {key}: {message}")
+                store.append_failure(key, pending[key], message)
+            if n_done % checkpoint_every == 0:
+                store.save()
+    store.save()
+
+    return store
@@ -1,3 +1,5 @@
+import os.path as osp
+
 import toml
 
 from simulate.core import Inputs
@@ -34,6 +36,31 @@ def create_inputs(inputs_file: str) -> Inputs:
     inputs : Inputs
         inputs object
     """
-    inputs = read_input_file(inputs_file)
+    inputs = resolve_series_paths(read_input_file(inputs_file), osp.dirname(inputs_file))
 
     return Inputs(**inputs)
+
+
+def resolve_series_paths(data: dict, directory: str) -> dict:
+    """Makes the paths to external time series relative to the directory of the file that references them
+
+    Parameters
+    ----------
+    data : dict
+        dictionary with the input data
+    directory : str
+        directory of the inputs file
+
+    Returns
+    -------
+    data : dict
+        dictionary with the input data, with resolved paths
+    """
+    for key in ("temperature_ambient_file", "cost_electricity_file"):
+        source = data.get(key)
+        if isinstance(source, str):
+            data[key] = osp.join(directory, source)
+        elif isinstance(source, dict):
+            data[key] = {**source, "path": osp.join(directory, source["path"])}
+
+    return data
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from benchmarks.discrete import discrete_inputs
+from simulate import create_inputs
+from simulate.core import Optimiser, Simulator
+from simulate.core.optimiser.discrete import RoundingHeuristic
+
+pyo = pytest.importorskip("pyomo.environ")
+
+SOLVER = "appsi_highs"
+LEVELS = [0, 1.5, 3, 5]
+
+
+@pytest.fixture(scope="module")
+def inputs():
+    if not pyo.SolverFactory(SOLVER).available(exception_flag=False):
+        pytest.skip(f"{SOLVER} is not available")
+    args = type("Args", (), {
+        "initial_temperature": 17, "temperature_bounds": [14, 19], "levels": LEVELS, "minimum_up_time": 3,
+        "minimum_down_time": 2
+    })()
+
+    return discrete_inputs(create_inputs("instances/example_bounds.toml"), args, 24)
+
+
+@pytest.mark.parametrize("time_limit", [None, 0.1])
+def test_discrete_solve_runs_on_levels_and_is_no_worse_than_heuristic(inputs, time_limit):
+    schedule = RoundingHeuristic(inputs)()
+    optimiser = Optimiser(time_limit=time_limit)
+
+    results = Simulator(inputs=inputs, optimiser=optimiser, output_path=None, solver=SOLVER).simulate()
+
+    power = np.asarray(results["power_heater"])
+    assert np.all(np.min(np.abs(power[:, None] - np.asarray(LEVELS)), axis=1) <= 1e-6)
+    assert np.isfinite(results["objective_function"])
+    assert 0 <= optimiser.relative_gap
+    if schedule is not None:
+        assert results["objective_function"] <= schedule["objective_function"] + 1e-6
+
+
+def test_discrete_solve_without_warm_start_capable(inputs, monkeypatch):
+    # The legacy interface of the appsi solvers in older versions of pyomo has no warm_start_capable
+    for cls in type(pyo.SolverFactory(SOLVER)).__mro__:
+        if "warm_start_capable" in vars(cls):
+            monkeypatch.delattr(cls, "warm_start_capable")
+    optimiser = Optimiser()
+
+    results = Simulator(inputs=inputs, optimiser=optimiser, output_path=None, solver=SOLVER).simulate()
+
+    assert np.isfinite(results["objective_function"])
+    assert optimiser.relative_gap == pytest.approx(0, abs=1e-4)
@@ -0,0 +1,10 @@
+from benchmarks.import_time import BUDGET, check_imports
+
+
+def test_cli_imports_within_budget_without_heavy_modules():
+    total, heavy = check_imports()
+
+    assert not heavy, f"Heavy modules imported by `python -m simulate -h`: {', '.join(heavy)}"
+    assert total <= BUDGET, (
+        f"Imports of `python -m simulate -h` took {total * 1e3:.1f} ms (budget {BUDGET * 1e3:.0f} ms)"
+    )